@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class PersonalProfileBase(BaseModel):
     name: str
@@ -31,6 +31,21 @@ class SearchQuery(BaseModel):
     num_results: Optional[int] = 5
     profile_id: Optional[str] = None  # Required for cofounder search
     role_filter: Optional[str] = None  # 'founder' or 'investor'
+    field_weights: Optional[Dict[str, float]] = None  # Overrides the default per-field weights
+    page_size: Optional[int] = None  # Results per page; defaults to num_results
+    cursor: Optional[str] = None  # next_cursor from the previous page
+    hybrid: Optional[bool] = None  # Fuse keyword (BM25) and vector rankings; defaults to settings
+
+    @validator('num_results', pre=True)
+    def default_num_results(cls, v):
+        # An explicit null means the default, not an unbounded search
+        return 5 if v is None else v
+
+    @validator('num_results', 'page_size')
+    def validate_positive(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("must be at least 1")
+        return v
 
     @validator('role_filter')
     def validate_role_filter(cls, v, values):
@@ -42,4 +57,13 @@ class SearchQuery(BaseModel):
     def validate_profile_id(cls, v, values):
         if v is not None and values.get('search_type') == 'company':
             raise ValueError("profile_id cannot be used with company search")
-        return v 
\ No newline at end of file
+        return v
+
+    @validator('field_weights')
+    def validate_field_weights(cls, v):
+        if v is not None:
+            if any(weight < 0 for weight in v.values()):
+                raise ValueError("field_weights cannot be negative")
+            if not any(weight > 0 for weight in v.values()):
+                raise ValueError("field_weights must give some field a positive weight")
+        return v
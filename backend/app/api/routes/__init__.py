@@ -1 +1 @@
-from . import profiles, companies, search
+from . import profiles, companies, search, jobs
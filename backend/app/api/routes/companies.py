@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
-from app.core.config import settings
-from app.services.embeddings import get_embedding, update_single_company_embeddings
-from supabase import create_client
+from app.services.db import supabase
+from app.services.embeddings import aembed_fields, aupdate_single_company_embeddings, company_field_texts
+from app.services.index_sync import companies_changed
+from app.services.vectors import to_wire_row
 
 router = APIRouter()
-supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 class CompanyProfileBase(BaseModel):
     name: str
@@ -22,23 +23,26 @@ async def create_company(company: CompanyProfileBase):
         # Store company data in Supabase
         company_dict = company.dict()
         
-        # Generate embedding for company description if available
-        if company.description:
-            description_embedding = get_embedding(company.description)
-            if description_embedding:
-                company_dict['description_vector'] = description_embedding
+        # Generate embeddings for all company fields in one batch call
+        company_dict.update(to_wire_row(await aembed_fields(company_field_texts(company_dict))))
         
-        result = supabase.table("CompanyProfile").insert(company_dict).execute()
+        result = await run_in_threadpool(
+            supabase.table("CompanyProfile").insert(company_dict).execute
+        )
+        if result.data:
+            await run_in_threadpool(companies_changed, [result.data[0]['id']], result.data)
         return {"message": "Company created successfully", "data": result.data}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{company_id}/embeddings")
-async def update_company_embeddings(company_id: str):
-    """Update embeddings for a specific company"""
+async def update_company_embeddings(company_id: str, force: bool = False):
+    """Update embeddings for a specific company, re-embedding only fields whose text changed"""
     try:
-        embeddings = update_single_company_embeddings(company_id)
+        embeddings = await aupdate_single_company_embeddings(company_id, force=force)
+        if embeddings:
+            await run_in_threadpool(companies_changed, [company_id])
         return {
             "message": "Company embeddings updated successfully",
             "data": embeddings
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.services.jobs import job_queue
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Report the status and progress of a background job"""
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -1,12 +1,21 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from typing import List, Optional
 from app.core.config import settings
-from app.services.embeddings import update_single_profile_embeddings, update_single_profile_ai_bio
-from supabase import create_client
+from app.services.db import supabase
+from app.services.embeddings import (
+    aembed_fields,
+    aupdate_single_profile_embeddings,
+    aupdate_single_profile_ai_bio,
+    profile_field_texts
+)
+from app.services.jobs import job_queue
+from app.services.index_sync import profiles_changed
+from app.services.vectors import to_wire_row
 
 router = APIRouter()
-supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 class PersonalProfileBase(BaseModel):
     name: str
@@ -22,37 +31,53 @@ class PersonalProfileBase(BaseModel):
 @router.post("/")
 async def create_profile(profile: PersonalProfileBase):
     try:
-        # First create the profile without embeddings
+        # Embed the submitted fields first so the row and its vectors are
+        # written in a single insert, but never wait long on the provider:
+        # on timeout the row goes in without vectors and the job embeds it
         profile_dict = profile.dict()
-        result = supabase.table("PersonalProfile").insert(profile_dict).execute()
+        try:
+            embeddings = await asyncio.wait_for(
+                aembed_fields(profile_field_texts(profile_dict)),
+                settings.PROFILE_CREATE_EMBED_TIMEOUT_SECONDS
+            )
+            profile_dict.update(to_wire_row(embeddings))
+        except asyncio.TimeoutError:
+            print("Embedding a new profile timed out; the enrichment job will embed it")
+        result = await run_in_threadpool(
+            supabase.table("PersonalProfile").insert(profile_dict).execute
+        )
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create profile")
             
         # Get the created profile's ID
         profile_id = result.data[0]['id']
+        await run_in_threadpool(profiles_changed, [profile_id], result.data)
         
-        # Generate embeddings for the new profile
-        embeddings = update_single_profile_embeddings(profile_id)
-        
-        # Generate AI bio
-        ai_bio = update_single_profile_ai_bio(profile_id)
+        # The AI bio, and any embedding that failed above, is generated by the
+        # background job workers from the inserted row without reading it back
+        created = {column: value for column, value in result.data[0].items() if not column.endswith('_vector')}
+        job_id = await run_in_threadpool(
+            job_queue.enqueue, "profile_enrichment", {"profile_id": profile_id, "profile": created}
+        )
         
         return {
-            "message": "Profile created successfully with embeddings and AI bio",
-            "data": result.data[0],
-            "embeddings": embeddings,
-            "ai_bio": ai_bio
+            "message": "Profile created successfully; its AI bio is being generated",
+            "data": created,
+            "job_id": job_id,
+            "job_url": f"/jobs/{job_id}"
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{profile_id}/embeddings")
-async def update_profile_embeddings(profile_id: str):
-    """Update embeddings for a specific profile"""
+async def update_profile_embeddings(profile_id: str, force: bool = False):
+    """Update embeddings for a specific profile, re-embedding only fields whose text changed"""
     try:
-        embeddings = update_single_profile_embeddings(profile_id)
+        embeddings = await aupdate_single_profile_embeddings(profile_id, force=force)
+        if embeddings:
+            await run_in_threadpool(profiles_changed, [profile_id])
         return {
             "message": "Profile embeddings updated successfully",
             "embeddings": embeddings
@@ -61,10 +86,13 @@ async def update_profile_embeddings(profile_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put("/{profile_id}/ai-bio")
-async def update_profile_ai_bio(profile_id: str):
-    """Update AI bio and its embedding for a specific profile"""
+async def update_profile_ai_bio(profile_id: str, force: bool = False):
+    """Update AI bio and its embedding for a specific profile if its inputs changed"""
     try:
-        ai_bio = update_single_profile_ai_bio(profile_id)
+        ai_bio = await aupdate_single_profile_ai_bio(profile_id, force=force)
+        # A current bio comes back without the input hash because nothing was written
+        if ai_bio and 'ai_bio_input_hash' in ai_bio:
+            await run_in_threadpool(profiles_changed, [profile_id])
         return {
             "message": "Profile AI bio updated successfully",
             "ai_bio": ai_bio
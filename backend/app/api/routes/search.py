@@ -1,87 +1,381 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Dict, List
+import base64
+import bisect
+import json
+import logging
+import numpy as np
 from app.api.models.profile import SearchQuery
 from app.core.config import settings
-from app.services.embeddings import get_embedding
-from app.utils.explanations import generate_match_explanation, generate_company_explanation
-from supabase import create_client
+from app.services.cofounders import cofounder_graph
+from app.services.db import supabase
+from app.services.embeddings import aget_query_embedding, aget_query_embeddings
+from app.services.hybrid import hybrid_search_many
+from app.services.lexical_index import company_lexical_index, profile_lexical_index
+from app.services.metrics import sampled_debug, stage
+from app.services.search_cache import search_cache, search_cache_key, search_corpus
+from app.services.vector_index import company_index, profile_index
+from app.services.vectors import to_wire
+from app.utils.explanations import (
+    generate_match_explanation,
+    generate_company_explanation,
+    generate_cofounder_explanation
+)
 
 router = APIRouter()
-supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-
-class SearchQuery(BaseModel):
-    query: str
-    search_type: str  # 'profile', 'company', or 'cofounder'
-    num_results: Optional[int] = 5
-    profile_id: Optional[str] = None  # Required for cofounder search
-    role_filter: Optional[str] = None  # 'founder' or 'investor'
+logger = logging.getLogger(__name__)
 
 @router.post("/")
 async def search_profiles(query: SearchQuery):
+    # The ranked candidates of identical searches are served from the result
+    # cache until a write to the corpus they search invalidates it, and
+    # every page is cut from that list
+    corpus = search_corpus(query.search_type)
+    cache_key = search_cache_key(query)
+    candidates, generation = search_cache.get(corpus, cache_key)
+    if candidates is None:
+        candidates = rank_candidates((await run_search(query))["results"])
+        search_cache.put(corpus, cache_key, generation, candidates)
+    return paginate(candidates, query)
+
+def _result_id(result: Dict) -> str:
+    return str((result.get('profile') or result.get('company'))['id'])
+
+def rank_candidates(results: List[Dict]) -> List[Dict]:
+    """Order formatted results by relevance, breaking ties by id so cursors are stable"""
+    return sorted(results, key=lambda result: (-result['relevance_score'], _result_id(result)))
+
+def encode_cursor(result: Dict) -> str:
+    """Opaque cursor pointing just past a result"""
+    payload = json.dumps([result['relevance_score'], _result_id(result)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        score, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return -float(score), str(result_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(candidates: List[Dict], query: SearchQuery) -> Dict:
+    """Return the page of ranked candidates after the query's cursor"""
+    start = 0
+    if query.cursor:
+        # Position by score and id rather than offset, so a page still lines
+        # up if the candidate list was recomputed since the previous one
+        after = decode_cursor(query.cursor)
+        start = bisect.bisect_right(
+            [(-result['relevance_score'], _result_id(result)) for result in candidates],
+            after
+        )
+    page = candidates[start:start + (query.page_size or query.num_results)]
+    has_more = start + len(page) < len(candidates)
+    return {
+        "results": page,
+        "next_cursor": encode_cursor(page[-1]) if page and has_more else None,
+        "total": len(candidates)
+    }
+
+def format_profile_results(query: SearchQuery, results: List[Dict], explain: bool = True) -> List[Dict]:
+    """Shape profile matches for the response, with similarity explanations unless explain is False"""
+    return [
+        {
+            'profile': {
+                'id': result['id'],
+                'name': result['name'],
+                'role': result['role'],
+                'education': result['education'],
+                'bio': result['bio'],
+                'ai_bio': result['ai_bio'],
+                'interests': result['interests'],
+                'image_url': result['image_url']
+            },
+            'similarity_score': result['combined_similarity'],
+            'relevance_score': result.get('relevance_score', result['combined_similarity']),
+            'match_explanation': generate_match_explanation(
+                query.query,
+                result
+            ) if explain else None
+        }
+        for result in results
+    ]
+
+def format_company_results(query: SearchQuery, results: List[Dict], explain: bool = True) -> List[Dict]:
+    """Shape company matches for the response, with similarity explanations unless explain is False"""
+    return [
+        {
+            'company': {
+                'id': result['id'],
+                'name': result['name'],
+                'description': result['description'],
+                'industry': result['industry'],
+                'location': result['location'],
+                'website': result['website'],
+                'founded_year': result['founded_year'],
+                'image_url': result['image_url']
+            },
+            'similarity_score': result['combined_similarity'],
+            'relevance_score': result.get('relevance_score', result['combined_similarity']),
+            'match_explanation': generate_company_explanation(
+                query.query,
+                result
+            ) if explain else None
+        }
+        for result in results
+    ]
+
+def search_indexed(queries: List[SearchQuery], embeddings: np.ndarray) -> List[List[Dict]]:
+    """Search the in-process indexes for queries sharing type, role filter, weights and hybrid setting"""
+    first = queries[0]
+    if first.search_type == 'profile':
+        index, lexical_index = profile_index, profile_lexical_index
+    else:
+        index, lexical_index = company_index, company_lexical_index
+    k = max(query.num_results for query in queries)
+    hybrid = settings.SEARCH_HYBRID if first.hybrid is None else first.hybrid
+    if hybrid and lexical_index.ready:
+        return hybrid_search_many(
+            index,
+            lexical_index,
+            [query.query for query in queries],
+            embeddings,
+            k,
+            weights=first.field_weights,
+            role_filter=first.role_filter
+        )
+    return index.search_many(embeddings, k, weights=first.field_weights, role_filter=first.role_filter)
+
+def explain_result(query: SearchQuery, result: Dict) -> str:
+    """Explanation of why a formatted result matched a query"""
+    if 'company' in result:
+        return generate_company_explanation(query.query, result['company'])
+    profile = result['profile']
+    if query.search_type == 'cofounder':
+        return generate_cofounder_explanation(
+            profile['interests'],
+            profile['role'],
+            cofounder_graph.interest_similarity(query.profile_id, profile['id'])
+        )
+    return generate_match_explanation(query.query, profile)
+
+def explain_results(query: SearchQuery, results: List[Dict]):
+    """Fill in match_explanation wherever it was deferred"""
+    for result in results:
+        if result['match_explanation'] is None:
+            result['match_explanation'] = explain_result(query, result)
+
+def stream_event(format: str, event: str, data: Dict) -> str:
+    """Frame one stream event as an NDJSON line or a server-sent event"""
+    if format == 'sse':
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+@router.post("/stream")
+async def search_stream(query: SearchQuery, format: str = "ndjson"):
+    """Stream a page of results: ranked hits first, then their explanations.
+
+    Emits one "hit" event per result (without match_explanation) as soon as
+    scoring finishes, an "explanation" event per result as each is written,
+    and a final "done" event with next_cursor and total. format is "ndjson"
+    (one JSON object per line) or "sse" (text/event-stream).
+    """
+    if format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    # Search before the response starts so failures still get a status code
+    corpus = search_corpus(query.search_type)
+    cache_key = search_cache_key(query)
+    candidates, generation = search_cache.get(corpus, cache_key)
+    cached = candidates is not None
+    if not cached:
+        candidates = rank_candidates((await run_search(query, explain=False))["results"])
+    page = paginate(candidates, query)
+    
+    async def events():
+        for rank, result in enumerate(page["results"], start=1):
+            hit = {key: value for key, value in result.items() if key != 'match_explanation'}
+            yield stream_event(format, "hit", {"rank": rank, **hit})
+        for rank, result in enumerate(page["results"], start=1):
+            if result['match_explanation'] is None:
+                with stage("explain", query.search_type):
+                    result['match_explanation'] = await run_in_threadpool(explain_result, query, result)
+            yield stream_event(format, "explanation", {
+                "rank": rank,
+                "id": _result_id(result),
+                "match_explanation": result['match_explanation']
+            })
+        if not cached:
+            # Cache once every candidate has an explanation, so plain searches
+            # served from the cache look the same as computed ones
+            await run_in_threadpool(explain_results, query, candidates)
+            search_cache.put(corpus, cache_key, generation, candidates)
+        yield stream_event(format, "done", {"next_cursor": page["next_cursor"], "total": page["total"]})
+    
+    media_type = "text/event-stream" if format == 'sse' else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+@router.post("/batch")
+async def search_batch(queries: List[SearchQuery]):
+    """Run many searches at once, embedding every query text in one provider call.
+
+    Searches answered by an in-process index are grouped by type, role
+    filter and field weights, and each group is scored as one query matrix
+    against the corpus. Each entry of "results" is what POST /search would
+    return for that query, or {"error": ...} if it failed.
+    """
+    if len(queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can hold at most {settings.SEARCH_BATCH_MAX_QUERIES} queries"
+        )
+    
+    # Ranked candidate lists, or an error response, per query
+    candidates = [None] * len(queries)
+    errors = {}
+    cache_entries = []
+    indexed = []
+    for i, query in enumerate(queries):
+        corpus = search_corpus(query.search_type)
+        cache_key = search_cache_key(query)
+        cached, generation = search_cache.get(corpus, cache_key)
+        cache_entries.append((corpus, cache_key, generation))
+        if cached is not None:
+            candidates[i] = cached
+        elif query.num_results > settings.SEARCH_MAX_RESULTS:
+            errors[i] = f"num_results cannot exceed {settings.SEARCH_MAX_RESULTS}"
+        elif (query.search_type == 'profile' and profile_index.ready) or \
+                (query.search_type == 'company' and company_index.ready):
+            indexed.append(i)
+    
+    # One embedding call for every uncached query text
+    with stage("embed", "batch"):
+        embeddings = await aget_query_embeddings([queries[i].query for i in indexed])
+    groups = {}
+    for i, embedding in zip(indexed, embeddings):
+        if embedding is None:
+            errors[i] = "Failed to generate query embedding"
+            continue
+        query = queries[i]
+        weights = tuple(sorted((query.field_weights or {}).items()))
+        hybrid = settings.SEARCH_HYBRID if query.hybrid is None else query.hybrid
+        group_key = (query.search_type, (query.role_filter or '').lower(), weights, hybrid)
+        groups.setdefault(group_key, []).append((i, embedding))
+    
+    for (search_type, _, _, _), members in groups.items():
+        format_results = format_profile_results if search_type == 'profile' else format_company_results
+        try:
+            with stage("retrieve", search_type):
+                results = await run_in_threadpool(
+                    search_indexed,
+                    [queries[i] for i, _ in members],
+                    np.stack([embedding for _, embedding in members])
+                )
+        except ValueError as e:
+            for i, _ in members:
+                errors[i] = str(e)
+            continue
+        for (i, _), query_results in zip(members, results):
+            query = queries[i]
+            with stage("format", search_type):
+                formatted_results = format_results(query, query_results[:query.num_results], explain=False)
+            with stage("explain", search_type):
+                explain_results(query, formatted_results)
+            candidates[i] = rank_candidates(formatted_results)
+    
+    # Cofounder searches and searches without a loaded index run one by one
+    for i, query in enumerate(queries):
+        if candidates[i] is None and i not in errors:
+            try:
+                candidates[i] = rank_candidates((await run_search(query))["results"])
+            except HTTPException as e:
+                errors[i] = e.detail
+    
+    responses = []
+    for i, query in enumerate(queries):
+        if i in errors:
+            responses.append({"error": errors[i]})
+            continue
+        corpus, cache_key, generation = cache_entries[i]
+        search_cache.put(corpus, cache_key, generation, candidates[i])
+        try:
+            responses.append(paginate(candidates[i], query))
+        except HTTPException as e:
+            responses.append({"error": e.detail})
+    
+    return {"results": responses}
+
+async def run_search(query: SearchQuery, explain: bool = True):
+    if query.num_results > settings.SEARCH_MAX_RESULTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"num_results cannot exceed {settings.SEARCH_MAX_RESULTS}"
+        )
     try:
+        # Cofounder matches come from the requester's stored vectors, no embedding needed
+        if query.search_type == 'cofounder':
+            return await run_cofounder_search(query, explain)
+        
         # Generate embedding for the search query
-        query_embedding = get_embedding(query.query)
+        with stage("embed", query.search_type):
+            query_embedding = await aget_query_embedding(query.query)
         if query_embedding is None:
             raise HTTPException(status_code=400, detail="Failed to generate query embedding")
         
-        # Convert embedding to list if it's numpy array
-        if hasattr(query_embedding, 'tolist'):
-            query_embedding = query_embedding.tolist()
-        
-        print(f"Generated embedding type: {type(query_embedding)}")
-        print(f"Generated embedding length: {len(query_embedding)}")
+        sampled_debug(logger, "Generated embedding type: %s, length: %d", type(query_embedding), len(query_embedding))
         
         # Perform vector similarity search based on search type
         if query.search_type == 'profile':
             try:
-                # Prepare RPC parameters
-                rpc_params = {
-                    'query_embedding': query_embedding,
-                    'match_count': query.num_results
-                }
-                
-                # Add role filter if provided
-                if query.role_filter:
-                    rpc_params['role_filter'] = query.role_filter
-                
-                print(f"Calling RPC with params: {rpc_params}")
-                
-                # Use weighted similarity search for profiles with role filter
-                rpc_response = supabase.rpc(
-                    'match_profiles_weighted',
-                    rpc_params
-                ).execute()
-                
-                print(f"RPC Response: {rpc_response}")
-                results = rpc_response.data
+                if profile_index.ready:
+                    # Answer from the in-process index loaded at startup
+                    with stage("retrieve", query.search_type):
+                        results = (await run_in_threadpool(
+                            search_indexed, [query], query_embedding[np.newaxis]
+                        ))[0]
+                else:
+                    # The database RPCs only support their built-in field weights
+                    # Prepare RPC parameters
+                    rpc_params = {
+                        'query_embedding': to_wire(query_embedding),
+                        'match_count': query.num_results
+                    }
+                    
+                    # Add role filter if provided
+                    if query.role_filter:
+                        rpc_params['role_filter'] = query.role_filter
+                    
+                    # Log the parameters without the embedding itself
+                    sampled_debug(
+                        logger,
+                        "Calling match_profiles_weighted with match_count=%d role_filter=%r",
+                        query.num_results,
+                        query.role_filter
+                    )
+                    
+                    # Use weighted similarity search for profiles with role filter
+                    with stage("retrieve", query.search_type):
+                        rpc_response = await run_in_threadpool(
+                            supabase.rpc('match_profiles_weighted', rpc_params).execute
+                        )
+                    
+                    sampled_debug(logger, "match_profiles_weighted returned %d rows", len(rpc_response.data or []))
+                    results = rpc_response.data
                 
                 if not results:
                     return {"results": []}
                 
                 # Format response with similarity explanations
-                formatted_results = []
-                for result in results[:3]:
-                    formatted_result = {
-                        'profile': {
-                            'id': result['id'],
-                            'name': result['name'],
-                            'role': result['role'],
-                            'education': result['education'],
-                            'bio': result['bio'],
-                            'ai_bio': result['ai_bio'],
-                            'interests': result['interests'],
-                            'image_url': result['image_url']
-                        },
-                        'similarity_score': result['combined_similarity'],
-                        'match_explanation': generate_match_explanation(
-                            query.query,
-                            result
-                        )
-                    }
-                    formatted_results.append(formatted_result)
+                with stage("format", query.search_type):
+                    formatted_results = format_profile_results(query, results, explain=False)
+                if explain:
+                    with stage("explain", query.search_type):
+                        explain_results(query, formatted_results)
                 
                 return {"results": formatted_results}
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             except Exception as e:
                 print(f"Error in profile search: {str(e)}")
                 raise HTTPException(
@@ -91,46 +385,39 @@ async def search_profiles(query: SearchQuery):
                 
         elif query.search_type == 'company':
             try:
-                # Prepare RPC parameters for company search
-                rpc_params = {
-                    'query_embedding': query_embedding,
-                    'match_count': query.num_results
-                }
-                
-                # Use company matching function
-                rpc_response = supabase.rpc(
-                    'match_companies_weighted',
-                    rpc_params
-                ).execute()
-                
-                results = rpc_response.data
+                if company_index.ready:
+                    with stage("retrieve", query.search_type):
+                        results = (await run_in_threadpool(
+                            search_indexed, [query], query_embedding[np.newaxis]
+                        ))[0]
+                else:
+                    # Prepare RPC parameters for company search
+                    rpc_params = {
+                        'query_embedding': to_wire(query_embedding),
+                        'match_count': query.num_results
+                    }
+                    
+                    # Use company matching function
+                    with stage("retrieve", query.search_type):
+                        rpc_response = await run_in_threadpool(
+                            supabase.rpc('match_companies_weighted', rpc_params).execute
+                        )
+                    
+                    results = rpc_response.data
                 
                 if not results:
                     return {"results": []}
                 
                 # Format company results
-                formatted_results = []
-                for result in results[:3]:
-                    formatted_result = {
-                        'company': {
-                            'id': result['id'],
-                            'name': result['name'],
-                            'description': result['description'],
-                            'industry': result['industry'],
-                            'location': result['location'],
-                            'website': result['website'],
-                            'founded_year': result['founded_year'],
-                            'image_url': result['image_url']
-                        },
-                        'similarity_score': result['combined_similarity'],
-                        'match_explanation': generate_company_explanation(
-                            query.query,
-                            result
-                        )
-                    }
-                    formatted_results.append(formatted_result)
+                with stage("format", query.search_type):
+                    formatted_results = format_company_results(query, results, explain=False)
+                if explain:
+                    with stage("explain", query.search_type):
+                        explain_results(query, formatted_results)
                 
                 return {"results": formatted_results}
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             except Exception as e:
                 print(f"Error in company search: {str(e)}")
                 raise HTTPException(
@@ -140,6 +427,8 @@ async def search_profiles(query: SearchQuery):
         else:
             raise HTTPException(status_code=400, detail="Invalid search type")
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in search: {str(e)}")
         raise HTTPException(
@@ -147,25 +436,66 @@ async def search_profiles(query: SearchQuery):
             detail=f"Error in search: {str(e)}\nFull error: {repr(e)}"
         )
 
-def generate_match_explanation(query: str, result: Dict) -> str:
-    """Generate a human-readable explanation of why this profile matched"""
-    explanation = f"This profile matches your search '{query}' based on "
-    reasons = []
+async def run_cofounder_search(query: SearchQuery, explain: bool = True):
+    """Find potential cofounders for a profile from the precomputed neighbor graph"""
+    if not query.profile_id:
+        raise HTTPException(status_code=400, detail="profile_id is required for cofounder search")
+    if not profile_index.ready:
+        raise HTTPException(status_code=503, detail="Cofounder search is unavailable until the profile index loads")
     
-    if result['role']:
-        reasons.append(f"their role as {result['role']}")
-    if result['education']:
-        reasons.append(f"their education background in {result['education']}")
-    if result['bio']:
-        reasons.append("their professional experience")
-    if result.get('interests'):
-        reasons.append(f"their interests in {', '.join(result['interests'][:3])}")
+    try:
+        with stage("retrieve", query.search_type):
+            neighbors = await run_in_threadpool(cofounder_graph.neighbors, query.profile_id)
+        with stage("format", query.search_type):
+            formatted_results = format_cofounder_results(query, neighbors)
+        # A full stored list may have left out matches the request needs:
+        # more results than it holds, or ones the role filter would keep
+        if len(formatted_results) < query.num_results and len(neighbors) >= cofounder_graph.k:
+            with stage("retrieve", query.search_type):
+                neighbors = await run_in_threadpool(
+                    cofounder_graph.search, query.profile_id, query.num_results, query.role_filter
+                )
+            with stage("format", query.search_type):
+                formatted_results = format_cofounder_results(query, neighbors)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if explain:
+        with stage("explain", query.search_type):
+            explain_results(query, formatted_results)
     
-    if reasons:
-        explanation += ", ".join(reasons[:-1])
-        if len(reasons) > 1:
-            explanation += f" and {reasons[-1]}"
-        elif len(reasons) == 1:
-            explanation += reasons[0]
+    return {"results": formatted_results}
+
+def format_cofounder_results(query: SearchQuery, neighbors: List) -> List[Dict]:
+    """Shape neighbor graph matches for the response, leaving explanations to explain_results"""
+    state = profile_index.state
+    formatted_results = []
+    for score, neighbor_id in neighbors:
+        position = state.positions.get(neighbor_id)
+        if position is None:
+            # Deleted since the list was read
+            continue
+        result = state.records[position]
+        if query.role_filter and (result['role'] or '').lower() != query.role_filter.lower():
+            continue
+        formatted_results.append({
+            'profile': {
+                'id': result['id'],
+                'name': result['name'],
+                'role': result['role'],
+                'education': result['education'],
+                'bio': result['bio'],
+                'ai_bio': result['ai_bio'],
+                'interests': result['interests'],
+                'image_url': result['image_url']
+            },
+            'similarity_score': score,
+            'relevance_score': score,
+            'match_explanation': None
+        })
+        if len(formatted_results) >= query.num_results:
+            break
     
-    return explanation
\ No newline at end of file
+    return formatted_results
@@ -0,0 +1,52 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.index_sync import (
+    change_feed,
+    companies_changed,
+    companies_deleted,
+    profiles_changed,
+    profiles_deleted
+)
+
+router = APIRouter()
+
+# Tables whose webhook events are applied, and how: (on insert or update, on delete)
+TABLE_HANDLERS = {
+    "personalprofile": (profiles_changed, profiles_deleted),
+    "companyprofile": (companies_changed, companies_deleted)
+}
+
+LOCAL_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+@router.post("/webhook")
+async def sync_webhook(request: Request):
+    """Apply a Supabase database webhook event to this worker's indexes.
+
+    The changed row is re-read, so vector columns arrive in the same form
+    as every other read, and the change feed is woken so other writes
+    waiting past the watermark are applied too. A deleted row, read from
+    old_record, is dropped from the indexes at once.
+    """
+    if settings.SYNC_WEBHOOK_SECRET:
+        secret = request.headers.get("x-webhook-secret", "")
+        if not hmac.compare_digest(secret, settings.SYNC_WEBHOOK_SECRET):
+            raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail="Webhooks are only accepted from local callers")
+    
+    event = await request.json()
+    handlers = TABLE_HANDLERS.get(event.get("table"))
+    if handlers is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported table: {event.get('table')}")
+    changed, deleted = handlers
+    if event.get("type") == "DELETE":
+        handler, record = deleted, event.get("old_record") or {}
+    else:
+        handler, record = changed, event.get("record") or {}
+    applied = event.get("type") in ("INSERT", "UPDATE", "DELETE") and record.get("id") is not None
+    if applied:
+        await run_in_threadpool(handler, [record["id"]])
+    change_feed.notify()
+    return {"status": "applied" if applied else "ignored"}
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+import json
 import os
 from dotenv import load_dotenv
 
@@ -23,6 +24,157 @@ class Settings(BaseSettings):
     # Supabase settings
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
+    # Connection pool of the shared client in app.services.db
+    SUPABASE_MAX_CONNECTIONS: int = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+    SUPABASE_KEEPALIVE_SECONDS: float = float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "60"))
+    SUPABASE_TIMEOUT_SECONDS: float = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30"))
+    
+    # Embedding provider: "gemini" or "hashing" (offline, deterministic)
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "gemini")
+    
+    # Async AI client settings
+    AI_TIMEOUT_SECONDS: float = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+    AI_MAX_RETRIES: int = int(os.getenv("AI_MAX_RETRIES", "3"))
+    AI_MAX_IN_FLIGHT: int = int(os.getenv("AI_MAX_IN_FLIGHT", "16"))
+    AI_BACKOFF_SECONDS: float = float(os.getenv("AI_BACKOFF_SECONDS", "0.5"))
+    
+    # Embedding cache settings
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MEMORY_SIZE: int = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+    EMBEDDING_CACHE_DISK_SIZE: int = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "500000"))
+    
+    # Search query embedding cache
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "5000"))
+    QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+    
+    # Search result cache; corpus generations are shared through this file so
+    # writes from any process invalidate every worker's cached results, and
+    # each worker re-reads it at most every SEARCH_CACHE_GENERATION_REFRESH_SECONDS
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+    SEARCH_CACHE_TTL_SECONDS: float = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    SEARCH_CACHE_GENERATIONS_PATH: str = os.getenv("SEARCH_CACHE_GENERATIONS_PATH", ".cache/search_generations.sqlite3")
+    SEARCH_CACHE_GENERATION_REFRESH_SECONDS: float = float(os.getenv("SEARCH_CACHE_GENERATION_REFRESH_SECONDS", "0.25"))
+    
+    # Hybrid retrieval: fuse vector and BM25 rankings with reciprocal rank
+    # fusion, taking the top HYBRID_DEPTH of each ranking
+    SEARCH_HYBRID: bool = os.getenv("SEARCH_HYBRID", "true").lower() == "true"
+    HYBRID_DEPTH: int = int(os.getenv("HYBRID_DEPTH", "100"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # Query terms in more than LEXICAL_MAX_DF of documents are skipped; idf
+    # already down-weights common terms, so the default of 1.0 keeps them all
+    LEXICAL_MAX_DF: float = float(os.getenv("LEXICAL_MAX_DF", "1.0"))
+    
+    # Most ranked candidates one search keeps for paging through
+    SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "200"))
+    
+    # Largest number of queries accepted by POST /search/batch
+    SEARCH_BATCH_MAX_QUERIES: int = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "100"))
+    
+    # Logging: set LOG_LEVEL=DEBUG to see the search debug logs, which are
+    # only written for DEBUG_LOG_SAMPLE_RATE of requests
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "WARNING")
+    DEBUG_LOG_SAMPLE_RATE: float = float(os.getenv("DEBUG_LOG_SAMPLE_RATE", "0.01"))
+    
+    # Bulk backfill settings
+    BACKFILL_PAGE_SIZE: int = int(os.getenv("BACKFILL_PAGE_SIZE", "500"))
+    BACKFILL_BATCH_SIZE: int = int(os.getenv("BACKFILL_BATCH_SIZE", "25"))
+    BACKFILL_WORKERS: int = int(os.getenv("BACKFILL_WORKERS", "4"))
+    BACKFILL_REQUESTS_PER_MINUTE: int = int(os.getenv("BACKFILL_REQUESTS_PER_MINUTE", "600"))
+    BACKFILL_CHECKPOINT_PATH: str = os.getenv("BACKFILL_CHECKPOINT_PATH", ".cache/backfill_checkpoint.json")
+    
+    # Background job queue settings; set JOB_WORKERS=0 to serve the queue
+    # only from a separate `python -m app.services.jobs` process
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", ".cache/jobs.sqlite3")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    
+    # Longest POST /profiles waits to embed a new profile before inserting it
+    # without vectors, leaving them to the enrichment job
+    PROFILE_CREATE_EMBED_TIMEOUT_SECONDS: float = float(os.getenv("PROFILE_CREATE_EMBED_TIMEOUT_SECONDS", "1.5"))
+    
+    # Profiles packed into one AI bio generation request during bulk refreshes
+    AI_BIO_BATCH_SIZE: int = int(os.getenv("AI_BIO_BATCH_SIZE", "10"))
+    
+    # In-process search index: "int8" or "pq" (quantized codes re-ranked
+    # exactly), "hnsw", "ivf", "exact" (NumPy scan of every record), or "off"
+    # to use the database RPCs. int8 and pq codes are shared between workers
+    # through the vector store; hnsw and ivf keep a full private copy of the
+    # vectors in every worker. Measure a mode's recall with
+    # `python -m app.services.vector_index --mode <mode>`.
+    SEARCH_INDEX_MODE: str = os.getenv("SEARCH_INDEX_MODE", "int8")
+    SEARCH_INDEX_HNSW_M: int = int(os.getenv("SEARCH_INDEX_HNSW_M", "32"))
+    SEARCH_INDEX_EF_SEARCH: int = int(os.getenv("SEARCH_INDEX_EF_SEARCH", "128"))
+    SEARCH_INDEX_NPROBE: int = int(os.getenv("SEARCH_INDEX_NPROBE", "16"))
+    # Quantized modes re-rank SEARCH_INDEX_RERANK times k candidates; pq
+    # stores SEARCH_INDEX_PQ_M bytes per row
+    SEARCH_INDEX_RERANK: int = int(os.getenv("SEARCH_INDEX_RERANK", "4"))
+    SEARCH_INDEX_PQ_M: int = int(os.getenv("SEARCH_INDEX_PQ_M", "96"))
+    
+    # Shared memory-mapped vector store and index snapshots: every worker on
+    # the host maps the same generation of each table. At boot the snapshot
+    # is reused and only rows changed since it are replayed, unless it is
+    # older than VECTOR_STORE_MAX_AGE_SECONDS (then the table is re-fetched,
+    # dropping deleted rows). Snapshots without an updated_at watermark are
+    # only shared by workers booting within VECTOR_STORE_BOOT_WINDOW_SECONDS.
+    # Set VECTOR_STORE_PATH to "" to give each worker its own copy.
+    VECTOR_STORE_PATH: str = os.getenv("VECTOR_STORE_PATH", ".cache/vector_store")
+    VECTOR_STORE_MAX_AGE_SECONDS: float = float(os.getenv("VECTOR_STORE_MAX_AGE_SECONDS", "86400"))
+    VECTOR_STORE_BOOT_WINDOW_SECONDS: float = float(os.getenv("VECTOR_STORE_BOOT_WINDOW_SECONDS", "300"))
+    
+    # Change feed: every SYNC_POLL_SECONDS (0 disables polling) each worker
+    # applies rows modified past its (updated_at, id) watermark to its
+    # indexes, caches and cofounder graph. POST /sync/webhook triggers a poll
+    # at once; it requires the X-Webhook-Secret header when
+    # SYNC_WEBHOOK_SECRET is set and only accepts local callers otherwise.
+    # updated_at is stamped when a write's transaction starts, so each poll
+    # also re-reads the SYNC_OVERLAP_SECONDS before the watermark to catch
+    # rows committed late; keep it above the longest write transaction.
+    # Deleted rows leave nothing to poll for, so every
+    # SYNC_DELETE_SWEEP_SECONDS (0 disables it) the feed also reads the
+    # table's ids and drops indexed records that are gone; the webhook
+    # drops them at once on DELETE events.
+    SYNC_POLL_SECONDS: float = float(os.getenv("SYNC_POLL_SECONDS", "5"))
+    SYNC_OVERLAP_SECONDS: float = float(os.getenv("SYNC_OVERLAP_SECONDS", "60"))
+    SYNC_DELETE_SWEEP_SECONDS: float = float(os.getenv("SYNC_DELETE_SWEEP_SECONDS", "300"))
+    SYNC_WEBHOOK_SECRET: str = os.getenv("SYNC_WEBHOOK_SECRET", "")
+    
+    # Warm start: query embeddings computed before /health reports ready,
+    # from SEARCH_WARM_QUERIES (comma-separated) and the most recent queries
+    # each worker saves to WARM_QUERIES_PATH on shutdown
+    SEARCH_WARM_QUERIES: str = os.getenv("SEARCH_WARM_QUERIES", "")
+    WARM_QUERIES_PATH: str = os.getenv("WARM_QUERIES_PATH", ".cache/warm_queries.json")
+    WARM_QUERIES_COUNT: int = int(os.getenv("WARM_QUERIES_COUNT", "200"))
+    
+    # Per-field weights of combined_similarity for in-process profile search.
+    # These defaults are our own assumption: the match_profiles_weighted SQL
+    # is not in this repo, so they may differ from the RPC's weights and rank
+    # differently from it. Set PROFILE_FIELD_WEIGHTS to a JSON object (e.g.
+    # {"role": 0.2, "bio": 0.3, ...}) to match the deployed function.
+    PROFILE_FIELD_WEIGHTS: dict = json.loads(os.getenv("PROFILE_FIELD_WEIGHTS", json.dumps({
+        "role": 0.15,
+        "bio": 0.25,
+        "interests": 0.25,
+        "education": 0.1,
+        "ai_bio": 0.25
+    })))
+    
+    # Per-field weights of combined_similarity for in-process company search;
+    # also an assumption standing in for match_companies_weighted's weights,
+    # overridable the same way through COMPANY_FIELD_WEIGHTS
+    COMPANY_FIELD_WEIGHTS: dict = json.loads(os.getenv("COMPANY_FIELD_WEIGHTS", json.dumps({
+        "description": 0.6,
+        "industry": 0.25,
+        "location": 0.15
+    })))
+    
+    # Cofounder matching: field weights between two profiles' own vectors, and
+    # neighbors kept per profile. Precomputing scans every pair once at startup.
+    COFOUNDER_FIELD_WEIGHTS: dict = {
+        "interests": 0.7,
+        "role": 0.3
+    }
+    COFOUNDER_NEIGHBORS: int = int(os.getenv("COFOUNDER_NEIGHBORS", "50"))
+    COFOUNDER_PRECOMPUTE: bool = os.getenv("COFOUNDER_PRECOMPUTE", "true").lower() == "true"
     
     # Server settings
     PORT: int = int(os.getenv("PORT", "8000"))
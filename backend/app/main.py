@@ -1,8 +1,32 @@
+import asyncio
+import logging
+import threading
+from functools import partial
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.api.routes import profiles, companies, search
-from supabase import create_client
+from app.api.routes import profiles, companies, search, jobs, sync
+from app.services.cofounders import cofounder_graph
+from app.services.embedding_cache import read_warm_queries, save_warm_queries
+from app.services.embeddings import aget_query_embeddings, query_embedding_cache
+from app.services.backfill import latest_watermark
+from app.services.index_sync import (
+    change_feed,
+    companies_changed,
+    companies_deleted,
+    profiles_changed,
+    profiles_deleted
+)
+from app.services.jobs import job_queue
+from app.services.lexical_index import company_lexical_index, profile_lexical_index
+from app.services.metrics import render_metrics
+from app.services.vector_index import company_index, profile_index
+from app.services.vector_store import load_index
+from app.services.db import supabase
+
+logging.basicConfig(level=settings.LOG_LEVEL)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -19,17 +43,125 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
-# Initialize Supabase client
-supabase = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_KEY
-)
-
 # Include routers
 app.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
 app.include_router(companies.router, prefix="/companies", tags=["companies"])
 app.include_router(search.router, prefix="/search", tags=["search"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+app.include_router(sync.router, prefix="/sync", tags=["sync"])
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+# Set once the indexes are loaded and connections warmed; /health reports
+# 503 until then so deploys only route traffic to warm workers
+app.state.ready = False
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Keep a reference so the task is not garbage collected while it runs
+    app.state.warm_up = asyncio.create_task(warm_up())
+
+async def warm_up():
+    try:
+        await load_search_indexes()
+        await run_in_threadpool(warm_clients)
+        await warm_query_embeddings()
+    except Exception as e:
+        print(f"Error warming up: {str(e)}")
+    app.state.ready = True
+
+async def load_search_indexes():
+    if settings.SEARCH_INDEX_MODE == "off":
+        return
+    # Searches fall back to the database RPCs until an index is loaded
+    indexes = (
+        ("profile", profile_index, profile_lexical_index, profiles_changed, profiles_deleted),
+        ("company", company_index, company_lexical_index, companies_changed, companies_deleted)
+    )
+    # Every worker's feed applies each change, so each invalidates only its own cache
+    for name, index, lexical_index, on_change, on_delete in indexes:
+        try:
+            if settings.VECTOR_STORE_PATH:
+                # Map the snapshot shared by every worker on the host and
+                # replay the rows changed since it was taken
+                watermark = await run_in_threadpool(load_index, index, supabase)
+            else:
+                # Read the watermark first so rows written during the load are replayed
+                watermark = await run_in_threadpool(latest_watermark, supabase, index.table)
+                await run_in_threadpool(index.load, supabase)
+            # The keyword index is built from the same records
+            await run_in_threadpool(lexical_index.build, index.records())
+        except Exception as e:
+            print(f"Error loading {name} search index: {str(e)}")
+            continue
+        try:
+            # Follow writes made anywhere from the point the index is current to
+            await run_in_threadpool(
+                change_feed.watch,
+                index,
+                partial(on_change, broadcast=False),
+                watermark,
+                partial(on_delete, broadcast=False)
+            )
+        except Exception as e:
+            print(f"Change feed disabled for the {name} index: {str(e)}")
+    if settings.SYNC_POLL_SECONDS > 0:
+        change_feed.start()
+    
+    # Cofounder lists are computed on demand until the full build finishes
+    if settings.COFOUNDER_PRECOMPUTE and profile_index.ready:
+        threading.Thread(target=build_cofounder_graph, name="cofounder-graph", daemon=True).start()
+
+def warm_clients():
+    """Open a pooled Supabase connection before the first request"""
+    try:
+        supabase.table("personalprofile").select("id").limit(1).execute()
+    except Exception as e:
+        print(f"Error warming Supabase client: {str(e)}")
+
+async def warm_query_embeddings():
+    """Embed common queries, which also opens the embedding provider's connection"""
+    configured = [query.strip() for query in settings.SEARCH_WARM_QUERIES.split(",") if query.strip()]
+    queries = list(dict.fromkeys(configured + read_warm_queries(settings.WARM_QUERIES_PATH)))
+    queries = queries[:settings.WARM_QUERIES_COUNT] or ["warm up"]
+    await aget_query_embeddings(queries)
+    print(f"Warmed {len(queries)} query embeddings")
+
+def build_cofounder_graph():
+    try:
+        cofounder_graph.build()
+    except Exception as e:
+        print(f"Error building cofounder neighbor graph: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    job_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_change_feed():
+    change_feed.stop()
+
+@app.on_event("shutdown")
+async def save_recent_queries():
+    # The next boot warms the queries this worker served most recently
+    try:
+        save_warm_queries(
+            settings.WARM_QUERIES_PATH,
+            query_embedding_cache.recent(settings.WARM_QUERIES_COUNT),
+            settings.WARM_QUERIES_COUNT
+        )
+    except Exception as e:
+        print(f"Error saving warm queries: {str(e)}")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Search stage latency histograms in Prometheus text format"""
+    return render_metrics()
 
 @app.get("/health")
 async def health_check():
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
     return {"status": "healthy"} 
\ No newline at end of file
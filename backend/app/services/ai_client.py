@@ -0,0 +1,52 @@
+import asyncio
+import random
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+# Errors worth retrying: throttling, transient server faults and timeouts
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+
+class AsyncAIClient:
+    """asyncio-native Gemini client with an in-flight cap, per-call timeouts and retries.
+
+    All calls go through the SDK's shared async gRPC channel, so concurrent
+    requests multiplex over one pooled connection instead of blocking the
+    event loop on the synchronous client.
+    """
+
+    def __init__(self, timeout=20.0, max_retries=3, max_in_flight=16, backoff=0.5):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def embed_content(self, **kwargs):
+        """Call genai.embed_content_async with the client's resilience policy"""
+        return await self._call(genai.embed_content_async, **kwargs)
+
+    async def generate_content(self, model, prompt):
+        """Call model.generate_content_async with the client's resilience policy"""
+        return await self._call(model.generate_content_async, prompt)
+
+    async def _call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                async with self._in_flight:
+                    return await asyncio.wait_for(fn(*args, **kwargs), self.timeout)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter keeps retrying callers from hitting the API in lockstep
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                print(f"Retrying {fn.__name__} in {delay:.2f}s after {type(e).__name__}")
+                attempt += 1
+                await asyncio.sleep(delay)
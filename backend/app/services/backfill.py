@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting calls per minute"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """JSON file recording the last id written by each named backfill"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, key):
+        return self.state.get(key, {})
+
+    def save(self, key, last_id, processed):
+        self.state[key] = {"last_id": last_id, "processed": processed}
+        self._write()
+
+    def clear(self, key):
+        if self.state.pop(key, None) is not None:
+            self._write()
+
+    def _write(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename so a crash never leaves a truncated checkpoint
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+def write_updates(client, table, updates):
+    """Bulk-update existing rows by id, one update_rows call per distinct column set.
+
+    Rows deleted since they were read are skipped rather than re-inserted.
+    """
+    # update_rows sets the same columns on every row it is given, so a row
+    # missing a column would have it nulled; group rows by the columns they carry.
+    groups = {}
+    for update in updates:
+        groups.setdefault(tuple(sorted(update.keys())), []).append(update)
+    for rows in groups.values():
+        client.rpc("update_rows", {"target_table": table, "updates": rows}).execute()
+
+
+def iter_pages(client, table, columns, page_size=500, after_id=None):
+    """Yield pages of rows ordered by id, using keyset pagination"""
+    last_id = after_id
+    while True:
+        query = client.table(table).select(columns).order("id").limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+def latest_watermark(client, table):
+    """(updated_at, id) of the most recently modified row, or None for an empty table"""
+    rows = (
+        client.table(table)
+        .select("id, updated_at")
+        .order("updated_at", desc=True)
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+        .data
+    )
+    return [rows[0]["updated_at"], rows[0]["id"]] if rows else None
+
+
+def iter_changed(client, table, columns, watermark, page_size=500, overlap_seconds=0):
+    """Yield pages of rows modified after an (updated_at, id) watermark, oldest first.
+
+    Rows are paged by (updated_at, id), so rows sharing a timestamp are
+    neither skipped nor repeated. Each row includes updated_at. A None
+    watermark starts from the first row. updated_at is set when a write's
+    transaction starts, so a long transaction can commit rows older than a
+    watermark already read past; with overlap_seconds, rows modified up to
+    that long before the watermark are read again, and callers drop the
+    ones they already applied.
+    """
+    since = None
+    if watermark is not None and overlap_seconds:
+        since = shift_timestamp(watermark[0], -overlap_seconds)
+        watermark = None
+    while True:
+        query = client.table(table).select(f"{columns}, updated_at")
+        if watermark is not None:
+            updated_at, last_id = watermark
+            query = query.or_(f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{last_id})')
+        elif since is not None:
+            query = query.gte("updated_at", since)
+        rows = (
+            query
+            .order("updated_at")
+            .order("id")
+            .limit(page_size)
+            .execute()
+            .data
+        )
+        if not rows:
+            return
+        yield rows
+        watermark = (rows[-1]["updated_at"], rows[-1]["id"])
+
+
+def parse_timestamp(value):
+    """Seconds since the epoch of an ISO 8601 timestamp as PostgREST returns them"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def watermark_position(value):
+    """Sort key of an [updated_at, id] watermark or of a row with both columns"""
+    if isinstance(value, dict):
+        return (parse_timestamp(value["updated_at"]), value["id"])
+    return (parse_timestamp(value[0]), value[1])
+
+
+def shift_timestamp(value, seconds):
+    """Move an ISO 8601 timestamp by a number of seconds, keeping its offset"""
+    return (datetime.fromisoformat(value) + timedelta(seconds=seconds)).isoformat()
+
+
+def run_backfill(
+    client,
+    table,
+    columns,
+    build_updates,
+    page_size=500,
+    batch_size=25,
+    workers=4,
+    requests_per_minute=600,
+    checkpoint_path=None,
+    checkpoint_key=None,
+    restart=False,
+    retries=3,
+    backoff=0.5
+):
+    """Stream a table by keyset pages, compute updates concurrently and bulk-write them.
+
+    A batch whose build_updates raises is retried with exponential
+    backoff. If it still fails, the page's successful updates are written
+    and the run stops with an exception before checkpointing the page, so
+    the next run resumes from it.
+    """
+    checkpoint_key = checkpoint_key or table
+    checkpoint = Checkpoint(checkpoint_path)
+    if restart:
+        checkpoint.clear(checkpoint_key)
+    state = checkpoint.get(checkpoint_key)
+    last_id = state.get("last_id")
+    processed = state.get("processed", 0)
+    if last_id is not None:
+        print(f"Resuming {checkpoint_key} backfill after id {last_id} ({processed} already processed)")
+
+    limiter = RateLimiter(requests_per_minute)
+
+    def process_batch(batch):
+        for attempt in range(retries + 1):
+            limiter.acquire()
+            try:
+                return build_updates(batch)
+            except Exception as e:
+                print(f"Error processing batch of {len(batch)} {table} rows (attempt {attempt + 1}): {str(e)}")
+                if attempt < retries:
+                    time.sleep(backoff * 2 ** attempt)
+        # Failed batches are None so the page is not checkpointed
+        return None
+
+    started = time.monotonic()
+    run_processed = 0
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in iter_pages(client, table, columns, page_size, after_id=last_id):
+            batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            results = list(pool.map(process_batch, batches))
+            updates = [update for result in results if result for update in result]
+            if updates:
+                write_updates(client, table, updates)
+                written += len(updates)
+            failed = [row["id"] for batch, result in zip(batches, results) if result is None for row in batch]
+            if failed:
+                raise Exception(
+                    f"{table} backfill stopped: {len(failed)} rows failed after {retries} retries "
+                    f"(first id {failed[0]}); rerun to resume from this page"
+                )
+
+            last_id = rows[-1]["id"]
+            processed += len(rows)
+            run_processed += len(rows)
+            checkpoint.save(checkpoint_key, last_id, processed)
+
+            elapsed = time.monotonic() - started
+            rate = run_processed / elapsed if elapsed else 0.0
+            print(f"{table}: {processed} records processed, {written} updated ({rate:.1f} records/s)")
+
+    # A finished run starts from the beginning next time
+    checkpoint.clear(checkpoint_key)
+    elapsed = time.monotonic() - started
+    return {
+        "table": table,
+        "processed": run_processed,
+        "updated": written,
+        "seconds": elapsed,
+        "records_per_second": run_processed / elapsed if elapsed else 0.0
+    }
@@ -0,0 +1,276 @@
+import bisect
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.scoring import field_query_scores, top_k, weight_vector
+from app.services.vector_index import profile_index
+
+
+class NeighborGraph:
+    """Top-k most compatible profiles for every profile, kept current incrementally.
+
+    Compatibility is sum(weight * cosine similarity) between two profiles'
+    own stored field vectors, so it is symmetric and needs no query
+    embedding. A profile's list is computed with one exact scan the first
+    time it is asked for (or by build()), and answering from it afterwards
+    is a dictionary lookup. When a profile changes, update() rescans it once
+    and uses the same scores to fix up only the lists it now enters (its
+    score beats the list's lowest) or already appears in, found through a
+    per-position array of each list's lowest score and a reverse map.
+    """
+
+    def __init__(self, index, weights, k=50):
+        self.index = index
+        self.weights = dict(weights)
+        self.k = k
+        self._neighbors = {}
+        # neighbor id -> ids of the profiles whose lists contain it
+        self._reverse = {}
+        # Lowest score a newcomer must beat to enter each position's list:
+        # -inf while a list has room, +inf for profiles without a list
+        self._thresholds = np.empty(0, dtype=np.float32)
+        self._layout = None
+        self._lock = threading.Lock()
+        # Profiles updated or removed while build() runs, replayed once it finishes
+        self._updated_during_build = None
+
+    def __len__(self):
+        return len(self._neighbors)
+
+    def neighbors(self, profile_id, limit=None):
+        """Return [(score, neighbor_id)] for a profile, best first"""
+        profile_id = str(profile_id)
+        neighbors = self._neighbors.get(profile_id)
+        if neighbors is None:
+            state = self.index.state
+            scores = self._scores(state, profile_id)
+            neighbors = self._top(state, profile_id, scores)
+            with self._lock:
+                self._sync(state)
+                if self._layout == state.layout:
+                    self._store(state, profile_id, neighbors)
+        return neighbors[:limit] if limit else list(neighbors)
+
+    def search(self, profile_id, k, role_filter=None):
+        """Exact top-k [(score, neighbor_id)] for a profile, optionally among one role.
+
+        Scans every profile, for requests the stored list cannot answer:
+        more than its k results, or a role filter it holds too few of.
+        """
+        profile_id = str(profile_id)
+        state = self.index.state
+        scores = np.array(self._scores(state, profile_id), dtype=np.float32)
+        scores[state.positions[profile_id]] = -np.inf
+        scores[state.removed_positions] = -np.inf
+        if role_filter:
+            candidates = state.partitions.get(role_filter.lower(), np.empty(0, dtype=np.int64))
+        else:
+            candidates = np.arange(len(scores))
+        candidate_scores = scores[candidates]
+        return [
+            (float(candidate_scores[i]), state.ids[candidates[i]])
+            for i in top_k(candidate_scores, k)
+            if np.isfinite(candidate_scores[i])
+        ]
+
+    def field_vectors(self, profile_ids):
+        """Copies of the vectors compatibility is scored from, for profiles in the index"""
+        state = self.index.state
+        fields = [self.index.fields.index(field) for field in self.weights]
+        vectors = {}
+        for profile_id in profile_ids:
+            position = state.positions.get(str(profile_id))
+            if position is not None:
+                vectors[str(profile_id)] = state.vectors[position, fields].copy()
+        return vectors
+
+    def update(self, profile_id, previous=None):
+        """Refresh a profile's own list and its place in everyone else's.
+
+        previous is the profile's field_vectors() from before the change;
+        when they are unchanged the graph is already current and nothing is
+        rescanned.
+        """
+        profile_id = str(profile_id)
+        if previous is not None and np.array_equal(previous, self.field_vectors([profile_id]).get(profile_id)):
+            return
+        state = self.index.state
+        scores = self._scores(state, profile_id)
+        neighbors = self._top(state, profile_id, scores)
+        with self._lock:
+            self._sync(state)
+            moved = self._layout != state.layout
+            if not moved:
+                self._fix_up(state, profile_id, neighbors, scores)
+        if moved:
+            # The index was reloaded while this profile was scored; rescore it
+            self.update(profile_id)
+
+    def _fix_up(self, state, profile_id, neighbors, scores):
+        # Store a rescanned list and move the profile within every list it
+        # enters or already appears in; call under _lock
+        if self._updated_during_build is not None:
+            self._updated_during_build.add(profile_id)
+        self._store(state, profile_id, neighbors)
+        entering = np.flatnonzero(scores > self._thresholds[:len(scores)])
+        touched = {state.ids[position] for position in entering}
+        touched.update(self._reverse.get(profile_id, ()))
+        touched.discard(profile_id)
+        for other_id in touched:
+            other = self._neighbors.get(other_id)
+            position = state.positions.get(other_id)
+            if other is None or position is None:
+                continue
+            score = float(scores[position])
+            was_full = len(other) >= self.k
+            entries = [entry for entry in other if entry[1] != profile_id]
+            if len(entries) < len(other) and was_full and entries and score < entries[-1][0]:
+                # It dropped out of a full list and something unseen may
+                # now belong there; rescan that profile when next asked
+                self._drop(state, other_id)
+                continue
+            if len(entries) < self.k or score > entries[-1][0]:
+                # Lists are sorted best first, so insert by negated score
+                keys = [-entry[0] for entry in entries]
+                entries.insert(bisect.bisect_right(keys, -score), (score, profile_id))
+                entries = entries[:self.k]
+            self._store(state, other_id, entries)
+
+    def remove(self, profile_ids):
+        """Drop deleted profiles from the graph; call after removing them from the index.
+
+        A full list that loses an entry may now be missing a profile it
+        never saw, so it is forgotten and rescanned when next asked for.
+        """
+        state = self.index.state
+        with self._lock:
+            self._sync(state)
+            for profile_id in map(str, profile_ids):
+                if self._updated_during_build is not None:
+                    self._updated_during_build.add(profile_id)
+                self._drop(state, profile_id)
+                for owner_id in self._reverse.pop(profile_id, set()):
+                    entries = self._neighbors.get(owner_id)
+                    if entries is None:
+                        continue
+                    if len(entries) >= self.k:
+                        self._drop(state, owner_id)
+                    else:
+                        self._store(state, owner_id, [entry for entry in entries if entry[1] != profile_id])
+
+    def build(self, block_size=256):
+        """Precompute every profile's list with blocked matrix products"""
+        with self._lock:
+            self._updated_during_build = set()
+        state = self.index.state
+        n = len(state.ids)
+        fields = [self.index.fields.index(field) for field in self.weights]
+        weights = weight_vector(tuple(self.weights), self.weights)
+        vectors = state.vectors[:, fields]
+        neighbors = {}
+        for start in range(0, n, block_size):
+            block = vectors[start:start + block_size]
+            scores = sum(
+                weight * (block[:, j] @ vectors[:, j].T) for j, weight in enumerate(weights)
+            )
+            for offset, row in enumerate(scores):
+                if start + offset in state.removed:
+                    continue
+                profile_id = state.ids[start + offset]
+                neighbors[profile_id] = self._top(state, profile_id, row)
+        with self._lock:
+            self._neighbors = neighbors
+            self._layout = None
+            self._sync(state)
+            updated, self._updated_during_build = self._updated_during_build, None
+        for profile_id in updated:
+            if profile_id not in self.index.state.positions:
+                self.remove([profile_id])
+                continue
+            try:
+                self.update(profile_id)
+            except (KeyError, ValueError):
+                pass
+        print(f"Built cofounder neighbor lists for {n} profiles")
+
+    def _sync(self, state):
+        # Size the thresholds to the index, and rebuild them and the reverse
+        # map from the lists when records may have moved; call under _lock
+        if self._layout is None or state.layout > self._layout:
+            self._layout = state.layout
+            self._thresholds = np.full(len(state.ids), np.inf, dtype=np.float32)
+            self._reverse = {}
+            for owner_id, entries in self._neighbors.items():
+                position = state.positions.get(owner_id)
+                if position is not None:
+                    self._thresholds[position] = self._threshold(entries)
+                for _, neighbor_id in entries:
+                    self._reverse.setdefault(neighbor_id, set()).add(owner_id)
+        elif len(self._thresholds) < len(state.ids):
+            grown = np.full(len(state.ids), np.inf, dtype=np.float32)
+            grown[:len(self._thresholds)] = self._thresholds
+            self._thresholds = grown
+
+    def _store(self, state, owner_id, entries):
+        # Replace a list, keeping the reverse map and thresholds in step; call under _lock
+        for _, neighbor_id in self._neighbors.get(owner_id, ()):
+            owners = self._reverse.get(neighbor_id)
+            if owners is not None:
+                owners.discard(owner_id)
+        self._neighbors[owner_id] = entries
+        for _, neighbor_id in entries:
+            self._reverse.setdefault(neighbor_id, set()).add(owner_id)
+        position = state.positions.get(owner_id)
+        if position is not None:
+            self._thresholds[position] = self._threshold(entries)
+
+    def _drop(self, state, owner_id):
+        # Forget a list so it is rescanned on next use; call under _lock
+        for _, neighbor_id in self._neighbors.pop(owner_id, ()):
+            owners = self._reverse.get(neighbor_id)
+            if owners is not None:
+                owners.discard(owner_id)
+        position = state.positions.get(owner_id)
+        if position is not None:
+            self._thresholds[position] = np.inf
+
+    def _threshold(self, entries):
+        return entries[-1][0] if len(entries) >= self.k else -np.inf
+
+    def interest_similarity(self, profile_id, other_id):
+        """Cosine similarity of two profiles' interests vectors"""
+        state = self.index.state
+        column = self.index.fields.index("interests")
+        first = state.vectors[state.positions[str(profile_id)], column]
+        second = state.vectors[state.positions[str(other_id)], column]
+        return float(first @ second)
+
+    def _scores(self, state, profile_id):
+        position = state.positions.get(profile_id)
+        if position is None:
+            raise KeyError(f"Profile {profile_id} is not in the search index")
+        weights = weight_vector(self.index.fields, self.weights)
+        queries = state.vectors[position]
+        if not np.any(queries[weights > 0]):
+            raise ValueError(f"Profile {profile_id} has no {' or '.join(self.weights)} embeddings yet")
+        return field_query_scores(state.vectors, queries, weights)
+
+    def _top(self, state, profile_id, scores):
+        scores = np.array(scores, dtype=np.float32)
+        # Never match a profile with itself or with a deleted one
+        scores[state.positions[profile_id]] = -np.inf
+        scores[state.removed_positions] = -np.inf
+        return [
+            (float(scores[position]), state.ids[position])
+            for position in top_k(scores, self.k)
+            if np.isfinite(scores[position])
+        ]
+
+
+cofounder_graph = NeighborGraph(
+    profile_index,
+    settings.COFOUNDER_FIELD_WEIGHTS,
+    k=settings.COFOUNDER_NEIGHBORS
+)
@@ -0,0 +1,26 @@
+import httpx
+from supabase import ClientOptions, create_client
+
+from app.core.config import settings
+
+
+def create_pooled_client():
+    """Supabase client whose PostgREST calls share one keep-alive connection pool"""
+    http_client = httpx.Client(
+        timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_MAX_CONNECTIONS,
+            keepalive_expiry=settings.SUPABASE_KEEPALIVE_SECONDS
+        )
+    )
+    return create_client(
+        settings.SUPABASE_URL,
+        settings.SUPABASE_KEY,
+        options=ClientOptions(httpx_client=http_client)
+    )
+
+
+# Shared by every route, service and background job in the process; the
+# pool is sized for the threadpool and job workers that call it concurrently
+supabase = create_pooled_client()
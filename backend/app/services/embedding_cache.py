@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def content_hash(text):
+    """Return the sha256 hex digest used to address a piece of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier (in-process LRU + SQLite) cache of embeddings keyed by content.
+
+    Disk hits refresh last_used, which orders eviction, only when it is
+    older than touch_seconds, so reads rarely write to the shared file. A
+    disk error is logged and treated as a miss rather than raised.
+    """
+
+    def __init__(self, path=None, memory_size=10000, disk_size=500000, touch_seconds=3600):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.touch_seconds = touch_seconds
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_count = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, task_type, text):
+        return f"{model}:{task_type}:{content_hash(text)}"
+
+    def get_many(self, keys):
+        """Look up keys, returning a list with None for every miss"""
+        results = [None] * len(keys)
+        disk_lookups = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    disk_lookups.append(i)
+
+            if disk_lookups and self._db is not None:
+                try:
+                    self._get_disk(keys, disk_lookups, results)
+                except sqlite3.Error as e:
+                    print(f"Error reading the embedding cache: {str(e)}")
+
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def put_many(self, items):
+        """Store (key, vector) pairs in both tiers"""
+        if not items:
+            return
+        with self._lock:
+            # Copy so cached rows never pin a caller's larger batch matrix
+            items = [(key, np.array(vector, dtype=np.float32)) for key, vector in items]
+            for key, vector in items:
+                self._remember(key, vector)
+            if self._db is not None:
+                try:
+                    self._put_disk(items)
+                except sqlite3.Error as e:
+                    print(f"Error writing the embedding cache: {str(e)}")
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count,
+            }
+
+    def _get_disk(self, keys, lookups, results):
+        # Call under _lock
+        now = time.time()
+        touched = []
+        for i in lookups:
+            row = self._db.execute(
+                "SELECT vector, last_used FROM embeddings WHERE key = ?", (keys[i],)
+            ).fetchone()
+            if row is None:
+                continue
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            results[i] = vector
+            self._remember(keys[i], vector)
+            if now - row[1] > self.touch_seconds:
+                touched.append((now, keys[i]))
+            self.hits += 1
+            self.disk_hits += 1
+        if touched:
+            self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", touched)
+            self._db.commit()
+
+    def _put_disk(self, items):
+        # Call under _lock; the connection context rolls back a failed write
+        with self._db:
+            self._write_disk(items)
+
+    def _write_disk(self, items):
+        now = time.time()
+        keys = [key for key, _ in items]
+        existing = set()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            existing.update(
+                row[0] for row in self._db.execute(
+                    f"SELECT key FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                )
+            )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, vector.tobytes(), now) for key, vector in items],
+        )
+        # Count only new keys, so the count stays exact for this process's writes
+        self._disk_count += len(set(keys) - existing)
+        if self._disk_count > self.disk_size:
+            self._evict_disk()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        # Other processes sharing the file add rows this one did not count,
+        # so recount before evicting. Trimming to 90% of the bound means
+        # this runs once per tenth of the bound inserted, not on every put.
+        count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.disk_size:
+            self._disk_count = count
+            return
+        overflow = count - int(self.disk_size * 0.9)
+        if overflow > 0:
+            self._db.execute(
+                """
+                DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+        self._disk_count = count - overflow
+
+
+def normalize_query(text):
+    """Case- and whitespace-insensitive form of a search query"""
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """In-process TTL + LRU cache of search query embeddings.
+
+    Queries are keyed by their normalized text. Concurrent misses for the
+    same query share one in-flight embedding call instead of each calling
+    the provider, and the misses of a batch are embedded in one call. Used from the event loop only, so it needs no lock.
+    """
+
+    def __init__(self, size=5000, ttl_seconds=3600):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+
+    def get(self, text):
+        """Return the cached embedding for a query, or None"""
+        key = normalize_query(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def put(self, text, vector):
+        key = normalize_query(text)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    async def get_or_embed_many(self, texts, embed_many):
+        """Return a list of embeddings for queries, with one embed_many(normalized_texts) call for all misses.
+
+        embed_many returns a (len(texts), dim) matrix, or None on failure.
+        """
+        keys = [normalize_query(text) for text in texts]
+        tasks = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            vector = self.get(key)
+            if vector is not None:
+                self.hits += 1
+                tasks[key] = vector
+            elif key in self._pending:
+                self.coalesced += 1
+                tasks[key] = self._pending[key]
+            else:
+                self.misses += 1
+                misses.append(key)
+
+        if misses:
+            batch = asyncio.ensure_future(embed_many(misses))
+            for i, key in enumerate(misses):
+                task = asyncio.ensure_future(self._pick(batch, i))
+                self._pending[key] = task
+                task.add_done_callback(lambda done, key=key: self._finish(key, done))
+                tasks[key] = task
+
+        # Shield so a cancelled request does not cancel calls others await
+        results = {}
+        for key, value in tasks.items():
+            results[key] = await asyncio.shield(value) if asyncio.isfuture(value) else value
+        return [results[key] for key in keys]
+
+    @staticmethod
+    async def _pick(batch, i):
+        embeddings = await batch
+        return None if embeddings is None else embeddings[i]
+
+    def recent(self, n):
+        """The n most recently used normalized queries, newest first"""
+        return list(reversed(self._entries))[:n]
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached queries"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _finish(self, key, task):
+        self._pending.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        # Failed embeddings come back as None and are retried on the next request
+        if task.result() is not None:
+            self.put(key, task.result())
+
+
+def read_warm_queries(path):
+    """Queries saved by save_warm_queries, newest first"""
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_warm_queries(path, queries, count):
+    """Merge queries into the warm-start file, keeping the newest count of them"""
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    merged = list(dict.fromkeys(list(queries) + read_warm_queries(path)))[:count]
+    # Write then rename so workers shutting down together never leave a torn file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(merged, f)
+    os.replace(temporary, path)
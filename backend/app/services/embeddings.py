@@ -1,141 +1,445 @@
-import os
+import asyncio
+import json
+from functools import partial
 from dotenv import load_dotenv
-import google.generativeai as genai
 import numpy as np
-from supabase import create_client
+from app.core.config import settings
+from app.services.ai_client import AsyncAIClient
+from app.services.backfill import run_backfill
+from app.services.db import supabase
+from app.services.embedding_cache import EmbeddingCache, QueryEmbeddingCache, content_hash
+from app.services.providers import configure_gemini, get_embedding_provider
+from app.services.vectors import EMBEDDING_DIM, as_matrix, normalize_rows, to_wire_row
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
+# Shared async client used by the FastAPI routes
+ai_client = AsyncAIClient(
+    timeout=settings.AI_TIMEOUT_SECONDS,
+    max_retries=settings.AI_MAX_RETRIES,
+    max_in_flight=settings.AI_MAX_IN_FLIGHT,
+    backoff=settings.AI_BACKOFF_SECONDS
 )
 
-# Initialize Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Embedding backend selected by settings.EMBEDDING_PROVIDER
+embedding_provider = get_embedding_provider(settings.EMBEDDING_PROVIDER, ai_client)
+
+EMBEDDING_TASK_TYPE = "retrieval_document"
+QUERY_TASK_TYPE = "retrieval_query"
+
+_generation_model = None
+
+def get_generation_model():
+    """Return the Gemini model used for AI bios, configuring Gemini on first use"""
+    global _generation_model
+    if _generation_model is None:
+        _generation_model = configure_gemini().GenerativeModel('gemini-1.5-flash')
+    return _generation_model
+
+# Columns read by the single-record updaters
+PROFILE_EMBEDDING_COLUMNS = (
+    "id, name, role, bio, interests, ai_bio, education, linkedin_url, "
+    "role_hash, bio_hash, interests_hash, education_hash"
+)
+PROFILE_AI_BIO_COLUMNS = (
+    "id, name, role, bio, interests, education, linkedin_url, "
+    "ai_bio, ai_bio_hash, ai_bio_input_hash"
+)
+PROFILE_ENRICHMENT_COLUMNS = (
+    "id, name, role, bio, interests, ai_bio, education, linkedin_url, "
+    "role_hash, bio_hash, interests_hash, education_hash, ai_bio_hash, ai_bio_input_hash"
+)
+COMPANY_EMBEDDING_COLUMNS = (
+    "id, name, description, industry, location, "
+    "description_hash, industry_hash, location_hash"
+)
+
+# Columns read per page by the bulk backfills
+PROFILE_BACKFILL_COLUMNS = (
+    "id, role, bio, interests, education, "
+    "role_hash, bio_hash, interests_hash, education_hash"
+)
+COMPANY_BACKFILL_COLUMNS = (
+    "id, description, industry, location, "
+    "description_hash, industry_hash, location_hash"
+)
+PROFILE_AI_BIO_BACKFILL_COLUMNS = (
+    "id, name, role, bio, interests, education, linkedin_url, "
+    "ai_bio_hash, ai_bio_input_hash"
+)
+
+# Bump whenever the AI bio prompt changes so every bio is regenerated once
+AI_BIO_PROMPT_VERSION = "1"
+AI_BIO_INPUT_FIELDS = ("name", "role", "bio", "education", "interests", "linkedin_url")
+
+# Content-addressed cache so repeated text never goes back to the API
+embedding_cache = EmbeddingCache(
+    settings.EMBEDDING_CACHE_PATH,
+    memory_size=settings.EMBEDDING_CACHE_MEMORY_SIZE,
+    disk_size=settings.EMBEDDING_CACHE_DISK_SIZE
+)
+
+# Short-lived cache for search queries, which repeat far more than documents
+query_embedding_cache = QueryEmbeddingCache(
+    size=settings.QUERY_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS
+)
 
 def normalize_embedding(embedding):
     """Normalize embedding vector using L2 normalization"""
-    embedding_array = np.array(embedding)
-    norm = np.linalg.norm(embedding_array)
-    if norm == 0:
-        return embedding_array.tolist()
-    return (embedding_array / norm).tolist()
+    return normalize_rows(np.asarray(embedding, dtype=np.float32)[np.newaxis])[0]
 
 def get_embedding(text):
-    """Get embedding for text using Gemini API"""
+    """Get embedding for text using the configured embedding provider"""
+    embeddings = get_embeddings([text])
+    if embeddings is None:
+        return None
+    return embeddings[0]
+
+def _cache_key(text):
+    return EmbeddingCache.make_key(embedding_provider.model_name, EMBEDDING_TASK_TYPE, text)
+
+def _cached_embeddings(texts):
+    """Look texts up in the cache, returning the hits and the distinct misses"""
+    embeddings = embedding_cache.get_many([_cache_key(text) for text in texts])
+    missing = list(dict.fromkeys(
+        text for text, embedding in zip(texts, embeddings) if embedding is None
+    ))
+    return embeddings, missing
+
+def _merge_fetched(texts, embeddings, missing, fetched_embeddings):
+    """Cache freshly fetched embeddings and fill them into the result matrix"""
+    fetched = dict(zip(missing, as_matrix(fetched_embeddings)))
+    embedding_cache.put_many([(_cache_key(text), embedding) for text, embedding in fetched.items()])
+    return as_matrix([
+        embedding if embedding is not None else fetched[text]
+        for text, embedding in zip(texts, embeddings)
+    ])
+
+def get_embeddings(texts):
+    """Get a float32 (n, dim) matrix of embeddings, batching cache misses into one provider call"""
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    texts = list(texts)
+    embeddings, missing = _cached_embeddings(texts)
+    if not missing:
+        return as_matrix(embeddings)
+    
     try:
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
-            task_type="retrieval_document",
-            title="Embedding of text"
-        )
-        return result['embedding']
+        fetched = embedding_provider.embed(missing, EMBEDDING_TASK_TYPE)
     except Exception as e:
-        print(f"Error getting embedding: {str(e)}")
+        print(f"Error getting embeddings for {len(missing)} texts: {str(e)}")
         return None
+    
+    return _merge_fetched(texts, embeddings, missing, fetched)
 
-def generate_ai_bio(profile):
-    """Generate AI bio from profile attributes"""
-    prompt = f"""
-    Create a comprehensive professional bio based on the following information:
+async def aget_embedding(text):
+    """Async variant of get_embedding for use on the event loop"""
+    embeddings = await aget_embeddings([text])
+    if embeddings is None:
+        return None
+    return embeddings[0]
+
+async def aget_embeddings(texts):
+    """Async variant of get_embeddings"""
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    texts = list(texts)
+    # The cache reads and writes SQLite under a lock job workers also hold,
+    # so keep it off the event loop
+    embeddings, missing = await asyncio.to_thread(_cached_embeddings, texts)
+    if not missing:
+        return as_matrix(embeddings)
+    
+    try:
+        fetched = await embedding_provider.aembed(missing, EMBEDDING_TASK_TYPE)
+    except Exception as e:
+        print(f"Error getting embeddings for {len(missing)} texts: {str(e)}")
+        return None
+    
+    return await asyncio.to_thread(_merge_fetched, texts, embeddings, missing, fetched)
+
+async def _aembed_queries(texts):
+    try:
+        return await embedding_provider.aembed(texts, QUERY_TASK_TYPE)
+    except Exception as e:
+        print(f"Error getting embeddings for {len(texts)} queries: {str(e)}")
+        return None
+
+async def aget_query_embedding(text):
+    """Embed a search query for retrieval, served from the query cache when possible"""
+    return (await aget_query_embeddings([text]))[0]
+
+async def aget_query_embeddings(texts):
+    """Embed several search queries, fetching every uncached one in a single provider call.
+
+    Returns a list with None for queries whose embedding failed.
+    """
+    return await query_embedding_cache.get_or_embed_many(list(texts), _aembed_queries)
+
+# Vector columns embedded from a record's own text, as keyed by *_field_texts
+PROFILE_TEXT_VECTOR_COLUMNS = ('role_vector', 'bio_vector', 'interests_vector', 'education_vector')
+COMPANY_TEXT_VECTOR_COLUMNS = ('description_vector', 'industry_vector', 'location_vector')
+
+def profile_field_texts(profile):
+    """Map each profile vector column to the text it is embedded from"""
+    texts = {}
+    if profile.get('role'):
+        texts['role_vector'] = profile['role']
+    if profile.get('bio'):
+        texts['bio_vector'] = profile['bio']
+    if profile.get('interests'):
+        texts['interests_vector'] = ' '.join(profile['interests'])
+    if profile.get('education'):
+        texts['education_vector'] = profile['education']
+    return texts
+
+def company_field_texts(company):
+    """Map each company vector column to the text it is embedded from"""
+    texts = {}
+    if company.get('description'):
+        texts['description_vector'] = company['description']
+    if company.get('industry'):
+        texts['industry_vector'] = company['industry']
+    if company.get('location'):
+        texts['location_vector'] = company['location']
+    return texts
+
+def hash_column(vector_column):
+    """Name of the column storing the source-text hash for a vector column"""
+    return vector_column[:-len('_vector')] + '_hash'
+
+def changed_field_texts(field_texts, record):
+    """Keep only the fields whose text no longer matches the stored hash"""
+    return {
+        column: text
+        for column, text in field_texts.items()
+        if record.get(hash_column(column)) != content_hash(text)
+    }
+
+def cleared_fields(field_texts, record, vector_columns):
+    """Null the vector and hash of every field whose text is now empty but still has a stored hash"""
+    updates = {}
+    for column in vector_columns:
+        if column not in field_texts and record.get(hash_column(column)):
+            updates[column] = None
+            updates[hash_column(column)] = None
+    return updates
+
+def embed_fields(field_texts):
+    """Embed all fields of a record with one provider call and normalize them"""
+    return embed_records([field_texts])[0]
+
+def embed_records(records_field_texts, required=False):
+    """Embed the fields of many records with one provider call, with their source hashes.
+
+    Vectors are returned as rows of one normalized float32 matrix; convert
+    them with to_wire_row only when writing to Supabase. A provider error
+    leaves every record without vectors, or raises if required is set.
+    """
+    texts = [text for field_texts in records_field_texts for text in field_texts.values()]
+    vectors = get_embeddings(texts)
+    if vectors is None and required:
+        raise Exception(f"Embedding provider failed for {len(texts)} texts")
+    return _assign_vectors(records_field_texts, vectors)
+
+async def aembed_fields(field_texts):
+    """Async variant of embed_fields"""
+    texts = list(field_texts.values())
+    return _assign_vectors([field_texts], await aget_embeddings(texts))[0]
+
+def _assign_vectors(records_field_texts, vectors):
+    """Normalize a batch of vectors and split it back into per-record column dicts"""
+    if vectors is None:
+        return [{} for _ in records_field_texts]
+    vectors = normalize_rows(vectors)
+    
+    results = []
+    position = 0
+    for field_texts in records_field_texts:
+        embeddings = {}
+        for column, text in field_texts.items():
+            embeddings[column] = vectors[position]
+            embeddings[hash_column(column)] = content_hash(text)
+            position += 1
+        results.append(embeddings)
+    return results
+
+def ai_bio_input_hash(profile):
+    """Hash of everything that feeds the AI bio prompt, including the prompt version"""
+    inputs = {field: profile.get(field) for field in AI_BIO_INPUT_FIELDS}
+    return content_hash(AI_BIO_PROMPT_VERSION + json.dumps(inputs, sort_keys=True))
+
+def ai_bio_is_current(profile):
+    """True when the stored AI bio was generated from the profile's current inputs"""
+    return profile.get('ai_bio_input_hash') == ai_bio_input_hash(profile)
+
+def _ai_bio_details(profile):
+    return f"""
     Name: {profile['name']}
     Role: {profile['role']}
     Current Bio: {profile['bio'] if profile['bio'] else 'Not provided'}
     Education: {profile['education'] if profile['education'] else 'Not provided'}
     Interests: {', '.join(profile['interests']) if profile['interests'] else 'Not provided'}
     LinkedIn: {profile.get('linkedin_url', 'Not provided')}
-    
+    """
+
+AI_BIO_INSTRUCTIONS = """
     Please write a concise but detailed professional biography that highlights their expertise, 
     background, and professional focus. The bio should be in third person and maintain a 
     professional tone.
     """
-    
+
+def ai_bio_prompt(profile):
+    """Build the AI bio prompt from profile attributes"""
+    return (
+        "\n    Create a comprehensive professional bio based on the following information:"
+        + _ai_bio_details(profile)
+        + AI_BIO_INSTRUCTIONS
+    )
+
+def ai_bios_prompt(profiles):
+    """Build one prompt asking for the AI bios of several profiles"""
+    sections = "".join(
+        f"\n    Profile ID: {profile['id']}" + _ai_bio_details(profile)
+        for profile in profiles
+    )
+    return (
+        "\n    Create a comprehensive professional bio for each of the following profiles:"
+        + sections
+        + AI_BIO_INSTRUCTIONS
+        + "Return one entry per profile ID.\n"
+    )
+
+AI_BIOS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "ai_bio": {"type": "string"}
+        },
+        "required": ["id", "ai_bio"]
+    }
+}
+
+def generate_ai_bio(profile):
+    """Generate AI bio from profile attributes"""
     try:
-        response = model.generate_content(prompt)
+        # A hung call must not outlive the job lease and run twice
+        response = get_generation_model().generate_content(
+            ai_bio_prompt(profile),
+            request_options={"timeout": settings.AI_TIMEOUT_SECONDS}
+        )
         return response.text
     except Exception as e:
         print(f"Error generating AI bio for {profile['name']}: {str(e)}")
         return None
 
-def update_single_profile_embeddings(profile_id):
-    """Update embeddings for a single profile"""
+def generate_ai_bios(profiles):
+    """Generate AI bios for many profiles in one structured-output request, keyed by id"""
+    if not profiles:
+        return {}
+    genai = configure_gemini()
     try:
-        response = supabase.table("personalprofile").select(
-            "id, name, role, bio, interests, ai_bio, education, linkedin_url"
-        ).eq("id", profile_id).execute()
-        
-        if not response.data:
-            raise Exception(f"Profile with ID {profile_id} not found")
-            
-        profile = response.data[0]
-        embeddings = {}
-        
-        # Generate role embedding
-        if profile['role']:
-            role_embedding = get_embedding(profile['role'])
-            if role_embedding:
-                embeddings['role_vector'] = normalize_embedding(role_embedding)
-        
-        # Generate bio embedding
-        if profile['bio']:
-            bio_embedding = get_embedding(profile['bio'])
-            if bio_embedding:
-                embeddings['bio_vector'] = normalize_embedding(bio_embedding)
-        
-        # Generate interests embedding
-        if profile['interests']:
-            interests_text = ' '.join(profile['interests'])
-            interests_embedding = get_embedding(interests_text)
-            if interests_embedding:
-                embeddings['interests_vector'] = normalize_embedding(interests_embedding)
+        response = get_generation_model().generate_content(
+            ai_bios_prompt(profiles),
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=AI_BIOS_SCHEMA
+            ),
+            request_options={"timeout": settings.AI_TIMEOUT_SECONDS}
+        )
+        requested = {str(profile['id']) for profile in profiles}
+        return {
+            entry['id']: entry['ai_bio']
+            for entry in json.loads(response.text)
+            if entry.get('id') in requested and entry.get('ai_bio')
+        }
+    except Exception as e:
+        print(f"Error generating AI bios for {len(profiles)} profiles: {str(e)}")
+        return {}
+
+async def agenerate_ai_bio(profile):
+    """Async variant of generate_ai_bio using the shared pooled client"""
+    try:
+        response = await ai_client.generate_content(get_generation_model(), ai_bio_prompt(profile))
+        return response.text
+    except Exception as e:
+        print(f"Error generating AI bio for {profile['name']}: {str(e)}")
+        return None
+
+def _fetch_record(table, columns, record_id, label):
+    response = supabase.table(table).select(columns).eq("id", record_id).execute()
+    if not response.data:
+        raise Exception(f"{label} with ID {record_id} not found")
+    return response.data[0]
+
+def _write_record(table, record_id, updates):
+    """Apply updates to a record and return the updated rows, in one round trip"""
+    if not updates:
+        return []
+    return supabase.table(table).update(updates).eq("id", record_id).execute().data
+
+def _fields_to_embed(field_texts, record, force):
+    return field_texts if force else changed_field_texts(field_texts, record)
+
+def update_single_profile_embeddings(profile_id, force=False):
+    """Update embeddings for a single profile, skipping fields whose text is unchanged"""
+    try:
+        profile = _fetch_record("personalprofile", PROFILE_EMBEDDING_COLUMNS, profile_id, "Profile")
         
-        # Generate education embedding
-        if profile['education']:
-            education_embedding = get_embedding(profile['education'])
-            if education_embedding:
-                embeddings['education_vector'] = normalize_embedding(education_embedding)
+        # Generate embeddings for the changed fields in one batch call
+        all_texts = profile_field_texts(profile)
+        embeddings = to_wire_row(embed_fields(_fields_to_embed(all_texts, profile, force)))
+        embeddings.update(cleared_fields(all_texts, profile, PROFILE_TEXT_VECTOR_COLUMNS))
         
         # Update profile with new embeddings
-        if embeddings:
-            supabase.table("personalprofile").update(
-                embeddings
-            ).eq("id", profile_id).execute()
-            
+        _write_record("personalprofile", profile_id, embeddings)
         return embeddings
             
     except Exception as e:
         print(f"Error updating embeddings for profile {profile_id}: {str(e)}")
         raise e
 
-def update_single_profile_ai_bio(profile_id):
-    """Update AI bio for a single profile"""
+async def aupdate_single_profile_embeddings(profile_id, force=False):
+    """Async variant of update_single_profile_embeddings"""
     try:
-        response = supabase.table("personalprofile").select(
-            "id, name, role, bio, interests, education, linkedin_url"
-        ).eq("id", profile_id).execute()
-        
-        if not response.data:
-            raise Exception(f"Profile with ID {profile_id} not found")
+        profile = await asyncio.to_thread(
+            _fetch_record, "personalprofile", PROFILE_EMBEDDING_COLUMNS, profile_id, "Profile"
+        )
+        all_texts = profile_field_texts(profile)
+        embeddings = to_wire_row(await aembed_fields(_fields_to_embed(all_texts, profile, force)))
+        embeddings.update(cleared_fields(all_texts, profile, PROFILE_TEXT_VECTOR_COLUMNS))
+        await asyncio.to_thread(_write_record, "personalprofile", profile_id, embeddings)
+        return embeddings
             
-        profile = response.data[0]
+    except Exception as e:
+        print(f"Error updating embeddings for profile {profile_id}: {str(e)}")
+        raise e
+
+def _ai_bio_updates(profile, ai_bio, ai_bio_embeddings):
+    return {
+        'ai_bio': ai_bio,
+        'ai_bio_input_hash': ai_bio_input_hash(profile),
+        **to_wire_row(ai_bio_embeddings)
+    }
+
+def update_single_profile_ai_bio(profile_id, force=False):
+    """Update AI bio for a single profile unless its prompt inputs are unchanged"""
+    try:
+        profile = _fetch_record("personalprofile", PROFILE_AI_BIO_COLUMNS, profile_id, "Profile")
+        if not force and profile.get('ai_bio') and ai_bio_is_current(profile):
+            return {'ai_bio': profile['ai_bio']}
         
         # Generate and update AI bio and its embedding
         ai_bio = generate_ai_bio(profile)
         if ai_bio:
-            updates = {'ai_bio': ai_bio}
-            ai_bio_embedding = get_embedding(ai_bio)
-            if ai_bio_embedding:
-                updates['ai_bio_vector'] = normalize_embedding(ai_bio_embedding)
-            
-            supabase.table("personalprofile").update(
-                updates
-            ).eq("id", profile_id).execute()
-            
+            # Only re-embed when the generated text actually differs
+            field_texts = changed_field_texts({'ai_bio_vector': ai_bio}, profile)
+            updates = _ai_bio_updates(profile, ai_bio, embed_fields(field_texts))
+            _write_record("personalprofile", profile_id, updates)
             return updates
         
         return None
@@ -144,100 +448,249 @@ def update_single_profile_ai_bio(profile_id):
         print(f"Error updating AI bio for profile {profile_id}: {str(e)}")
         raise e
 
-def update_profile_embeddings():
-    """Fetch all profiles and update embeddings"""
+async def aupdate_single_profile_ai_bio(profile_id, force=False):
+    """Async variant of update_single_profile_ai_bio"""
     try:
-        response = supabase.table("personalprofile").select(
-            "id, name, role, bio, interests, ai_bio, education, linkedin_url"
-        ).execute()
-        
-        profiles = response.data
+        profile = await asyncio.to_thread(
+            _fetch_record, "personalprofile", PROFILE_AI_BIO_COLUMNS, profile_id, "Profile"
+        )
+        if not force and profile.get('ai_bio') and ai_bio_is_current(profile):
+            return {'ai_bio': profile['ai_bio']}
         
-        for profile in profiles:
-            try:
-                update_single_profile_embeddings(profile["id"])
-                print(f"Updated embeddings for {profile['name']}")
-            except Exception as e:
-                print(f"Error updating profile {profile['id']}: {str(e)}")
-                continue
+        ai_bio = await agenerate_ai_bio(profile)
+        if ai_bio:
+            field_texts = changed_field_texts({'ai_bio_vector': ai_bio}, profile)
+            updates = _ai_bio_updates(profile, ai_bio, await aembed_fields(field_texts))
+            await asyncio.to_thread(_write_record, "personalprofile", profile_id, updates)
+            return updates
         
+        return None
+            
+    except Exception as e:
+        print(f"Error updating AI bio for profile {profile_id}: {str(e)}")
+        raise e
+
+def enrich_profile(profile_id, report=None, profile=None):
+    """Generate the AI bio and any missing embeddings for a profile, reporting progress per step.
+
+    Everything is written in one update. Pass the profile row when the
+    caller has it to skip reading it back. Returns (result, updated rows).
+    """
+    steps = ["ai_bio", "embeddings"]
+    if profile is None:
+        profile = _fetch_record("personalprofile", PROFILE_ENRICHMENT_COLUMNS, profile_id, "Profile")
+    
+    ai_bio = profile.get('ai_bio')
+    all_texts = profile_field_texts(profile)
+    field_texts = changed_field_texts(all_texts, profile)
+    if not (ai_bio and ai_bio_is_current(profile)):
+        generated = generate_ai_bio(profile)
+        if generated:
+            ai_bio = generated
+            field_texts.update(changed_field_texts({'ai_bio_vector': ai_bio}, profile))
+    if report:
+        report({"completed_steps": steps[:1], "total_steps": len(steps)})
+    
+    # One embedding call for the changed fields and the new bio, one write for all of it
+    updates = to_wire_row(embed_fields(field_texts))
+    updates.update(cleared_fields(all_texts, profile, PROFILE_TEXT_VECTOR_COLUMNS))
+    if ai_bio != profile.get('ai_bio'):
+        updates.update(_ai_bio_updates(profile, ai_bio, {}))
+    rows = _write_record("personalprofile", profile_id, updates)
+    if report:
+        report({"completed_steps": steps, "total_steps": len(steps)})
+    
+    result = {
+        "embeddings": sorted(column for column in updates if column not in ('ai_bio', 'ai_bio_input_hash')),
+        "ai_bio": ai_bio
+    }
+    return result, rows
+
+def build_profile_embedding_updates(profiles, force=False):
+    """Embed the changed fields of a batch of profiles in one provider call"""
+    all_texts = [profile_field_texts(profile) for profile in profiles]
+    embeddings = embed_records([
+        _fields_to_embed(texts, profile, force) for texts, profile in zip(all_texts, profiles)
+    ], required=True)
+    updates = [
+        {**to_wire_row(vectors), **cleared_fields(texts, profile, PROFILE_TEXT_VECTOR_COLUMNS)}
+        for texts, profile, vectors in zip(all_texts, profiles, embeddings)
+    ]
+    return [
+        {'id': profile['id'], **update}
+        for profile, update in zip(profiles, updates)
+        if update
+    ]
+
+def update_profile_embeddings(restart=False, force=False):
+    """Stream all profiles through the resumable backfill and update embeddings"""
+    try:
+        stats = run_backfill(
+            supabase,
+            "personalprofile",
+            PROFILE_BACKFILL_COLUMNS,
+            partial(build_profile_embedding_updates, force=force),
+            page_size=settings.BACKFILL_PAGE_SIZE,
+            batch_size=settings.BACKFILL_BATCH_SIZE,
+            workers=settings.BACKFILL_WORKERS,
+            requests_per_minute=settings.BACKFILL_REQUESTS_PER_MINUTE,
+            checkpoint_path=settings.BACKFILL_CHECKPOINT_PATH,
+            restart=restart,
+            retries=settings.AI_MAX_RETRIES,
+            backoff=settings.AI_BACKOFF_SECONDS
+        )
         print("Completed profile embedding updates")
+        return stats
         
     except Exception as e:
         print(f"Error in update_profile_embeddings: {str(e)}")
+        raise e
+
+def build_profile_ai_bio_updates(profiles, force=False):
+    """Generate stale AI bios for a batch of profiles in one request and embed them together"""
+    stale = [profile for profile in profiles if force or not ai_bio_is_current(profile)]
+    ai_bios = generate_ai_bios(stale)
+    if stale and not ai_bios:
+        raise Exception(f"AI bio generation failed for {len(stale)} profiles")
+    generated = [profile for profile in stale if str(profile['id']) in ai_bios]
+    embeddings = embed_records([
+        changed_field_texts({'ai_bio_vector': ai_bios[str(profile['id'])]}, profile)
+        for profile in generated
+    ], required=True)
+    return [
+        {
+            'id': profile['id'],
+            **_ai_bio_updates(profile, ai_bios[str(profile['id'])], vectors)
+        }
+        for profile, vectors in zip(generated, embeddings)
+    ]
 
-def update_single_company_embeddings(company_id):
-    """Update embeddings for a single company"""
+def update_profile_ai_bios(restart=False, force=False):
+    """Regenerate AI bios for every profile whose prompt inputs changed, in batched requests"""
     try:
-        response = supabase.table("companyprofile").select(
-            "id, name, description, industry, location"
-        ).eq("id", company_id).execute()
-        
-        if not response.data:
-            raise Exception(f"Company with ID {company_id} not found")
-            
-        company = response.data[0]
-        embeddings = {}
-        
-        # Generate description embedding
-        if company['description']:
-            description_embedding = get_embedding(company['description'])
-            if description_embedding:
-                embeddings['description_vector'] = normalize_embedding(description_embedding)
+        stats = run_backfill(
+            supabase,
+            "personalprofile",
+            PROFILE_AI_BIO_BACKFILL_COLUMNS,
+            partial(build_profile_ai_bio_updates, force=force),
+            page_size=settings.BACKFILL_PAGE_SIZE,
+            batch_size=settings.AI_BIO_BATCH_SIZE,
+            workers=settings.BACKFILL_WORKERS,
+            requests_per_minute=settings.BACKFILL_REQUESTS_PER_MINUTE,
+            checkpoint_path=settings.BACKFILL_CHECKPOINT_PATH,
+            checkpoint_key="personalprofile_ai_bio",
+            restart=restart,
+            retries=settings.AI_MAX_RETRIES,
+            backoff=settings.AI_BACKOFF_SECONDS
+        )
+        print("Completed profile AI bio updates")
+        return stats
         
-        # Generate industry embedding
-        if company['industry']:
-            industry_embedding = get_embedding(company['industry'])
-            if industry_embedding:
-                embeddings['industry_vector'] = normalize_embedding(industry_embedding)
+    except Exception as e:
+        print(f"Error in update_profile_ai_bios: {str(e)}")
+        raise e
+
+def update_single_company_embeddings(company_id, force=False):
+    """Update embeddings for a single company, skipping fields whose text is unchanged"""
+    try:
+        company = _fetch_record("companyprofile", COMPANY_EMBEDDING_COLUMNS, company_id, "Company")
         
-        # Generate location embedding
-        if company['location']:
-            location_embedding = get_embedding(company['location'])
-            if location_embedding:
-                embeddings['location_vector'] = normalize_embedding(location_embedding)
+        # Generate embeddings for the changed fields in one batch call
+        all_texts = company_field_texts(company)
+        embeddings = to_wire_row(embed_fields(_fields_to_embed(all_texts, company, force)))
+        embeddings.update(cleared_fields(all_texts, company, COMPANY_TEXT_VECTOR_COLUMNS))
         
         # Update company with new embeddings
-        if embeddings:
-            supabase.table("companyprofile").update(
-                embeddings
-            ).eq("id", company_id).execute()
+        _write_record("companyprofile", company_id, embeddings)
+        return embeddings
             
+    except Exception as e:
+        print(f"Error updating embeddings for company {company_id}: {str(e)}")
+        raise e
+
+async def aupdate_single_company_embeddings(company_id, force=False):
+    """Async variant of update_single_company_embeddings"""
+    try:
+        company = await asyncio.to_thread(
+            _fetch_record, "companyprofile", COMPANY_EMBEDDING_COLUMNS, company_id, "Company"
+        )
+        all_texts = company_field_texts(company)
+        embeddings = to_wire_row(await aembed_fields(_fields_to_embed(all_texts, company, force)))
+        embeddings.update(cleared_fields(all_texts, company, COMPANY_TEXT_VECTOR_COLUMNS))
+        await asyncio.to_thread(_write_record, "companyprofile", company_id, embeddings)
         return embeddings
             
     except Exception as e:
         print(f"Error updating embeddings for company {company_id}: {str(e)}")
         raise e
 
-def update_company_embeddings():
-    """Fetch all companies and update embeddings"""
+def build_company_embedding_updates(companies, force=False):
+    """Embed the changed fields of a batch of companies in one provider call"""
+    all_texts = [company_field_texts(company) for company in companies]
+    embeddings = embed_records([
+        _fields_to_embed(texts, company, force) for texts, company in zip(all_texts, companies)
+    ], required=True)
+    updates = [
+        {**to_wire_row(vectors), **cleared_fields(texts, company, COMPANY_TEXT_VECTOR_COLUMNS)}
+        for texts, company, vectors in zip(all_texts, companies, embeddings)
+    ]
+    return [
+        {'id': company['id'], **update}
+        for company, update in zip(companies, updates)
+        if update
+    ]
+
+def update_company_embeddings(restart=False, force=False):
+    """Stream all companies through the resumable backfill and update embeddings"""
     try:
-        response = supabase.table("companyprofile").select(
-            "id, name, description, industry, location"
-        ).execute()
-        
-        companies = response.data
-        print(f"Found {len(companies)} companies to update")
-        
-        for company in companies:
-            try:
-                embeddings = update_single_company_embeddings(company["id"])
-                print(f"Updated embeddings for {company['name']}")
-                print(f"Generated vectors: {list(embeddings.keys())}")
-            except Exception as e:
-                print(f"Error updating company {company['id']}: {str(e)}")
-                continue
-        
+        stats = run_backfill(
+            supabase,
+            "companyprofile",
+            COMPANY_BACKFILL_COLUMNS,
+            partial(build_company_embedding_updates, force=force),
+            page_size=settings.BACKFILL_PAGE_SIZE,
+            batch_size=settings.BACKFILL_BATCH_SIZE,
+            workers=settings.BACKFILL_WORKERS,
+            requests_per_minute=settings.BACKFILL_REQUESTS_PER_MINUTE,
+            checkpoint_path=settings.BACKFILL_CHECKPOINT_PATH,
+            restart=restart,
+            retries=settings.AI_MAX_RETRIES,
+            backoff=settings.AI_BACKOFF_SECONDS
+        )
         print("Completed company embedding updates")
+        return stats
         
     except Exception as e:
         print(f"Error in update_company_embeddings: {str(e)}")
         raise e
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Backfill profile and company embeddings")
+    parser.add_argument("--table", choices=["companies", "profiles", "all"], default="all")
+    parser.add_argument("--ai-bios", action="store_true", help="Also regenerate stale AI bios in batches")
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    parser.add_argument("--force", action="store_true", help="Re-embed fields even if their text is unchanged")
+    args = parser.parse_args()
+    
+    # Results cached by running servers are invalidated through the shared generations file
+    from app.services.search_cache import search_cache
+    
     print("Starting embedding updates...")
     try:
-        update_company_embeddings()
-        print("Successfully updated company embeddings")
+        if args.table in ("companies", "all"):
+            update_company_embeddings(restart=args.restart, force=args.force)
+            search_cache.invalidate("company")
+            print("Successfully updated company embeddings")
+        if args.table in ("profiles", "all"):
+            update_profile_embeddings(restart=args.restart, force=args.force)
+            search_cache.invalidate("profile")
+            print("Successfully updated profile embeddings")
+        if args.ai_bios:
+            update_profile_ai_bios(restart=args.restart, force=args.force)
+            search_cache.invalidate("profile")
+            print("Successfully updated profile AI bios")
     except Exception as e:
         print(f"Error updating embeddings: {str(e)}")
+        raise SystemExit(1)
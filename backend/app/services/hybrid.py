@@ -0,0 +1,47 @@
+from app.core.config import settings
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked id lists: each list contributes 1 / (k + rank) to an id's score"""
+    scores = {}
+    for ranking in rankings:
+        for rank, record_id in enumerate(ranking, start=1):
+            scores[record_id] = scores.get(record_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def hybrid_search_many(index, lexical_index, texts, queries, k, weights=None, role_filter=None):
+    """Rank records for each query by fusing vector and BM25 rankings.
+
+    Each result carries combined_similarity (the vector score, computed
+    exactly even for records only the lexical index found), lexical_score
+    and relevance_score, the fused score results are ordered by.
+    """
+    depth = max(k, settings.HYBRID_DEPTH)
+    vector_results = index.search_many(queries, depth, weights=weights, role_filter=role_filter)
+    partition = role_filter.lower() if role_filter else None
+    hybrid_results = []
+    for text, query, vector_hits in zip(texts, queries, vector_results):
+        lexical_hits = lexical_index.search(text, depth, partition=partition)
+        fused = reciprocal_rank_fusion(
+            [[str(hit["id"]) for hit in vector_hits], [record_id for record_id, _ in lexical_hits]],
+            k=settings.HYBRID_RRF_K
+        )
+        top = sorted(fused, key=lambda record_id: (-fused[record_id], record_id))[:k]
+
+        by_id = {str(hit["id"]): hit for hit in vector_hits}
+        missing = [record_id for record_id in top if record_id not in by_id]
+        if missing:
+            by_id.update((str(hit["id"]), hit) for hit in index.lookup(missing, query, weights))
+        lexical_scores = dict(lexical_hits)
+
+        results = []
+        for record_id in top:
+            if record_id not in by_id:
+                continue
+            result = by_id[record_id]
+            result["lexical_score"] = lexical_scores.get(record_id, 0.0)
+            result["relevance_score"] = fused[record_id]
+            results.append(result)
+        hybrid_results.append(results)
+    return hybrid_results
@@ -0,0 +1,257 @@
+import math
+import threading
+import time
+from functools import partial
+
+from app.core.config import settings
+from app.services.backfill import iter_changed, iter_pages, latest_watermark, parse_timestamp, watermark_position
+from app.services.cofounders import cofounder_graph
+from app.services.db import supabase
+from app.services.lexical_index import company_lexical_index, profile_lexical_index
+from app.services.metrics import index_sync_lag_seconds, index_sync_rows
+from app.services.search_cache import search_cache
+from app.services.vector_index import company_index, profile_index
+
+
+def _reload(index, record_ids):
+    columns = index.select_columns()
+    if change_feed.watching(index.table):
+        # Lets the feed recognize these rows as applied when it reads them
+        columns += ", updated_at"
+    rows = (
+        supabase.table(index.table)
+        .select(columns)
+        .in_("id", list(record_ids))
+        .execute()
+        .data
+    )
+    index.upsert(rows)
+    return rows
+
+
+def profiles_changed(profile_ids, rows=None, broadcast=True):
+    """Bring the in-process profile index, cofounder graph and result cache up to date.
+
+    Pass the written rows when the caller already has them to skip re-reading them.
+    broadcast=False invalidates only this process's cached results, for
+    changes every worker applies itself (see SearchResultCache).
+    """
+    if profile_index.ready:
+        # Profiles whose compatibility vectors are unchanged keep their place in the graph
+        previous = cofounder_graph.field_vectors(row["id"] for row in rows) if rows is not None else {}
+        if rows is not None:
+            profile_index.upsert(rows)
+        else:
+            previous = cofounder_graph.field_vectors(profile_ids)
+            rows = _reload(profile_index, profile_ids)
+        profile_lexical_index.upsert(rows)
+        for row in rows:
+            try:
+                cofounder_graph.update(row["id"], previous.get(str(row["id"])))
+            except ValueError:
+                # Not embedded yet; it joins the graph once its vectors land
+                pass
+        change_feed.mark_applied(profile_index.table, rows)
+    # Invalidate last so no search caches a result computed from the old index
+    search_cache.invalidate("profile", broadcast)
+
+
+def companies_changed(company_ids, rows=None, broadcast=True):
+    """Bring the in-process company index and result cache up to date"""
+    if company_index.ready:
+        if rows is not None:
+            company_index.upsert(rows)
+        else:
+            rows = _reload(company_index, company_ids)
+        company_lexical_index.upsert(rows)
+        change_feed.mark_applied(company_index.table, rows)
+    search_cache.invalidate("company", broadcast)
+
+
+def profiles_deleted(profile_ids, broadcast=True):
+    """Drop deleted profiles from the profile index, cofounder graph and result cache"""
+    if profile_index.ready:
+        profile_index.remove(profile_ids)
+        profile_lexical_index.remove(profile_ids)
+        cofounder_graph.remove(profile_ids)
+    search_cache.invalidate("profile", broadcast)
+
+
+def companies_deleted(company_ids, broadcast=True):
+    """Drop deleted companies from the company index and result cache"""
+    if company_index.ready:
+        company_index.remove(company_ids)
+        company_lexical_index.remove(company_ids)
+    search_cache.invalidate("company", broadcast)
+
+
+class ChangeFeed:
+    """Polls Supabase for rows modified past a per-table (updated_at, id) watermark.
+
+    Changed rows are handed to on_change (profiles_changed /
+    companies_changed with broadcast=False, since every worker polls the
+    same rows), which upserts them into the vector and keyword indexes,
+    updates the cofounder graph and invalidates this worker's cached
+    results, so writes made anywhere (routes, batch jobs, the Supabase
+    dashboard) reach this worker without a reload.
+
+    Each poll also re-reads the overlap_seconds before the watermark, since
+    a row can commit after the watermark has passed its updated_at. Rows
+    already applied at their current updated_at, by an earlier poll or by
+    a route in this worker (mark_applied), are skipped.
+
+    Deletes leave no row to read, so every sweep_seconds a poll also pages
+    through the table's ids and hands the indexed ids that are gone to
+    on_delete.
+    """
+
+    def __init__(self, poll_seconds=5.0, page_size=500, overlap_seconds=60.0, sweep_seconds=300.0):
+        self.poll_seconds = poll_seconds
+        self.page_size = page_size
+        self.overlap_seconds = overlap_seconds
+        self.sweep_seconds = sweep_seconds
+        self._tables = {}
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def watch(self, index, on_change, watermark=None, on_delete=None):
+        """Follow an index's table from a watermark, or from its newest row if None"""
+        if watermark is None:
+            watermark = latest_watermark(supabase, index.table)
+        with self._lock:
+            self._tables[index.table] = {
+                "index": index,
+                "on_change": on_change,
+                "on_delete": on_delete,
+                "watermark": watermark,
+                # id -> updated_at of rows applied within the overlap window
+                "applied": {},
+                # When the last poll that read every pending change started
+                "synced_at": time.time(),
+                # The first poll sweeps, dropping rows deleted since the snapshot
+                "swept_at": -math.inf
+            }
+        index_sync_lag_seconds.track(partial(self.lag, index.table), index.table)
+
+    def watching(self, table):
+        with self._lock:
+            return table in self._tables
+
+    def watermark(self, table):
+        with self._lock:
+            entry = self._tables.get(table)
+            return entry and entry["watermark"]
+
+    def lag(self, table):
+        """Seconds since the table was last known to be applied up to the present"""
+        with self._lock:
+            entry = self._tables.get(table)
+            return time.time() - entry["synced_at"] if entry else 0.0
+
+    def mark_applied(self, table, rows):
+        """Record rows applied to the indexes so polling does not apply them again"""
+        with self._lock:
+            entry = self._tables.get(table)
+            if entry is None:
+                return
+            for row in rows:
+                if row.get("updated_at"):
+                    entry["applied"][str(row["id"])] = parse_timestamp(row["updated_at"])
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        """Poll now instead of waiting for the next interval"""
+        self._wakeup.set()
+
+    def poll(self):
+        """Apply every pending change of each watched table; return the number of rows applied"""
+        applied = 0
+        with self._lock:
+            tables = list(self._tables.items())
+        for table, entry in tables:
+            # An empty table has no watermark yet and is read from its first row
+            watermark = entry["watermark"]
+            started = time.time()
+            pages = iter_changed(
+                supabase, table, entry["index"].select_columns(), watermark,
+                self.page_size, self.overlap_seconds
+            )
+            for rows in pages:
+                with self._lock:
+                    done = entry["applied"]
+                    fresh = [
+                        row for row in rows
+                        if done.get(str(row["id"]), -math.inf) < parse_timestamp(row["updated_at"])
+                    ]
+                if fresh:
+                    entry["on_change"]([row["id"] for row in fresh], fresh)
+                    self.mark_applied(table, fresh)
+                    applied += len(fresh)
+                    index_sync_rows.inc(len(fresh), table)
+                # Re-read rows from before the watermark never move it back
+                last = [rows[-1]["updated_at"], rows[-1]["id"]]
+                if watermark is None or watermark_position(last) > watermark_position(watermark):
+                    watermark = last
+                with self._lock:
+                    entry["watermark"] = watermark
+            if watermark is not None:
+                # Rows older than the overlap window are never read again
+                cutoff = parse_timestamp(watermark[0]) - self.overlap_seconds
+                with self._lock:
+                    entry["applied"] = {
+                        row_id: updated_at for row_id, updated_at in entry["applied"].items() if updated_at >= cutoff
+                    }
+            with self._lock:
+                # Everything committed before the poll started is now applied
+                entry["synced_at"] = started
+            if entry["on_delete"] and self.sweep_seconds and started - entry["swept_at"] >= self.sweep_seconds:
+                applied += self.sweep(table)
+        return applied
+
+    def sweep(self, table):
+        """Drop indexed records whose rows were deleted; return how many"""
+        with self._lock:
+            entry = self._tables[table]
+        started = time.time()
+        # Only records indexed before the read started are candidates: they
+        # were committed by then, so the keyset scan sees them unless deleted
+        indexed = set(entry["index"].state.positions)
+        for rows in iter_pages(supabase, table, "id", self.page_size):
+            indexed.difference_update(str(row["id"]) for row in rows)
+        if indexed:
+            entry["on_delete"](list(indexed))
+            index_sync_rows.inc(len(indexed), table)
+            print(f"Removed {len(indexed)} deleted {table} rows from the index")
+        with self._lock:
+            entry["swept_at"] = started
+        return len(indexed)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling the change feed: {str(e)}")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+change_feed = ChangeFeed(
+    settings.SYNC_POLL_SECONDS,
+    settings.BACKFILL_PAGE_SIZE,
+    settings.SYNC_OVERLAP_SECONDS,
+    settings.SYNC_DELETE_SWEEP_SECONDS
+)
@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.services.embeddings import enrich_profile
+from app.services.index_sync import profiles_changed
+
+
+class JobQueue:
+    """Durable SQLite-backed job queue served by a pool of worker threads.
+
+    Jobs survive restarts. A claimed job holds a lease, and a job whose
+    worker died is picked up again once the lease expires. Several processes
+    can serve the same queue file.
+    """
+
+    def __init__(self, path, workers=2, poll_interval=0.5, lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._handlers = {}
+        self._threads = []
+        self._stopping = threading.Event()
+        # Wakes local workers on enqueue instead of waiting for the next poll
+        self._wakeup = threading.Event()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    locked_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def register(self, job_type, handler):
+        """Register handler(payload, report) for a job type"""
+        self._handlers[job_type] = handler
+
+    def enqueue(self, job_type, payload):
+        """Persist a new job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                """
+                INSERT INTO jobs (id, job_type, payload, status, created_at, updated_at)
+                VALUES (?, ?, ?, 'queued', ?, ?)
+                """,
+                (job_id, job_type, json.dumps(payload), now, now),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job's status, progress and result, or None if unknown"""
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "job_type": row["job_type"],
+            "status": row["status"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def start(self):
+        """Start the worker threads"""
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=10):
+        """Ask the workers to finish their current job and exit"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """Serve the queue from the current process until interrupted"""
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _claim(self):
+        now = time.time()
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            # A job whose worker crashed or hung on every attempt is failed
+            # rather than handed out forever
+            db.execute(
+                """
+                UPDATE jobs
+                SET status = 'failed', error = 'Lease expired on the last attempt', locked_until = NULL, updated_at = ?
+                WHERE status = 'running' AND locked_until < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts),
+            )
+            return db.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1, locked_until = ?, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND locked_until < ? AND attempts < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                )
+                RETURNING id, job_type, payload, attempts
+                """,
+                (now + self.lease_seconds, now, now, self.max_attempts),
+            ).fetchone()
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"Error claiming job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        job_id = job["id"]
+
+        def report(progress):
+            self._update(job_id, progress=json.dumps(progress))
+
+        handler = self._handlers.get(job["job_type"])
+        try:
+            if handler is None:
+                raise Exception(f"No handler registered for job type {job['job_type']}")
+            result = handler(json.loads(job["payload"]), report)
+            self._update(job_id, status="done", result=json.dumps(result), error=None, locked_until=None)
+        except Exception as e:
+            print(f"Error running job {job_id} ({job['job_type']}): {str(e)}")
+            status = "failed" if job["attempts"] >= self.max_attempts else "queued"
+            self._update(job_id, status=status, error=str(e), locked_until=None)
+
+
+job_queue = JobQueue(
+    settings.JOB_QUEUE_PATH,
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
+
+def run_profile_enrichment(payload, report):
+    result, rows = enrich_profile(payload["profile_id"], report, payload.get("profile"))
+    # Apply the rows the update returned instead of reading the profile again
+    if rows:
+        profiles_changed([payload["profile_id"]], rows)
+    return result
+
+job_queue.register("profile_enrichment", run_profile_enrichment)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the background job queue")
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1))
+    args = parser.parse_args()
+
+    job_queue.workers = args.workers
+    print(f"Serving job queue {settings.JOB_QUEUE_PATH} with {job_queue.workers} workers")
+    job_queue.run_forever()
@@ -0,0 +1,134 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from app.core.config import settings
+
+PROFILE_TEXT_FIELDS = ("bio", "ai_bio", "interests", "education")
+COMPANY_TEXT_FIELDS = ("name", "description", "industry")
+
+_token_pattern = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text"""
+    return _token_pattern.findall(text.lower())
+
+
+class LexicalIndex:
+    """In-memory BM25 inverted index over the text fields of a table.
+
+    A record's fields are indexed as one document; list fields such as
+    interests contribute each element. Records are added and replaced
+    incrementally, so the index follows writes without a rebuild.
+    """
+
+    def __init__(self, fields, partition_by=None, k1=1.2, b=0.75, max_df=1.0):
+        self.fields = tuple(fields)
+        self.partition_by = partition_by
+        self.k1 = k1
+        self.b = b
+        # Queries skip terms in more than this share of documents, whose
+        # postings are the longest; off at 1.0, since a common term can be
+        # the only one a query has and idf already gives it little weight
+        self.max_df = max_df
+        self._postings = {}
+        self._terms = {}
+        self._lengths = {}
+        self._partitions = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def build(self, records):
+        """Index records from scratch"""
+        with self._lock:
+            self._postings = {}
+            self._terms = {}
+            self._lengths = {}
+            self._partitions = {}
+            self._total_length = 0
+            for record in records:
+                self._add(record)
+        self.ready = True
+
+    def upsert(self, records):
+        """Add records or replace their previously indexed text"""
+        with self._lock:
+            for record in records:
+                self._remove(str(record["id"]))
+                self._add(record)
+
+    def remove(self, record_ids):
+        """Drop deleted records from the index"""
+        with self._lock:
+            for record_id in record_ids:
+                self._remove(str(record_id))
+
+    def search(self, text, k, partition=None):
+        """Return [(record_id, score)] for the k best BM25 matches, best first"""
+        terms = set(tokenize(text))
+        with self._lock:
+            n = len(self._lengths)
+            if not n or not terms:
+                return []
+            average_length = self._total_length / n
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings or (len(postings) > self.max_df * n and n > 1 / self.max_df):
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for record_id, tf in postings.items():
+                    length_norm = self.k1 * (1 - self.b + self.b * self._lengths[record_id] / average_length)
+                    scores[record_id] = scores.get(record_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + length_norm)
+            if partition is not None:
+                scores = {
+                    record_id: score for record_id, score in scores.items()
+                    if self._partitions.get(record_id) == partition
+                }
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def _document_tokens(self, record):
+        tokens = []
+        for field in self.fields:
+            value = record.get(field)
+            if not value:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(item) for item in value)
+            tokens.extend(tokenize(str(value)))
+        return tokens
+
+    def _add(self, record):
+        record_id = str(record["id"])
+        counts = Counter(self._document_tokens(record))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[record_id] = tf
+        self._terms[record_id] = list(counts)
+        length = sum(counts.values())
+        self._lengths[record_id] = length
+        self._total_length += length
+        if self.partition_by is not None:
+            self._partitions[record_id] = (record.get(self.partition_by) or "").lower()
+
+    def _remove(self, record_id):
+        terms = self._terms.pop(record_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[record_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(record_id)
+        self._partitions.pop(record_id, None)
+
+
+profile_lexical_index = LexicalIndex(PROFILE_TEXT_FIELDS, partition_by="role", max_df=settings.LEXICAL_MAX_DF)
+company_lexical_index = LexicalIndex(COMPANY_TEXT_FIELDS, max_df=settings.LEXICAL_MAX_DF)
@@ -0,0 +1,138 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values per label set"""
+
+    def __init__(self, name, description, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """Return {labels: (bucket_counts, sum, count)}"""
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def render(self):
+        """Prometheus text exposition of the histogram"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return "\n".join(lines)
+
+
+class Gauge:
+    """Last set value per label set; counter=True renders it as a monotonic counter.
+
+    A label set can instead track() a function, called each time the gauge is read.
+    """
+
+    def __init__(self, name, description, label_names, counter=False):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.kind = "counter" if counter else "gauge"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def track(self, function, *labels):
+        with self._lock:
+            self._values[labels] = function
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        with self._lock:
+            value = self._values.get(labels, 0)
+        return value() if callable(value) else value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            if callable(value):
+                value = value()
+            label_text = ",".join(f'{name}="{label}"' for name, label in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{label_text}}} {value}")
+        return "\n".join(lines)
+
+
+search_stage_seconds = Histogram(
+    "search_stage_seconds",
+    "Latency of each stage of a search in seconds",
+    ("stage", "search_type")
+)
+
+
+@contextmanager
+def stage(name, search_type):
+    """Time a block as one stage of a search"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        search_stage_seconds.observe(time.perf_counter() - start, name, search_type)
+
+
+def sampled_debug(logger, message, *args):
+    """Log a debug message for a sample of calls, so hot paths stay cheap"""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < settings.DEBUG_LOG_SAMPLE_RATE:
+        logger.debug(message, *args)
+
+
+index_sync_lag_seconds = Gauge(
+    "index_sync_lag_seconds",
+    "Seconds since the change feed last read every pending change of the table; keeps growing while polls fail or stall",
+    ("table",)
+)
+
+index_sync_rows = Gauge(
+    "index_sync_rows_total",
+    "Changed rows the change feed applied to the local indexes",
+    ("table",),
+    counter=True
+)
+
+
+def render_metrics():
+    """Every exported metric in Prometheus text format"""
+    metrics = (search_stage_seconds, index_sync_lag_seconds, index_sync_rows)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
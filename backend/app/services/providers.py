@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+from app.services.vectors import EMBEDDING_DIM, as_matrix, normalize_rows
+
+_gemini_configured = False
+
+
+def configure_gemini():
+    """Configure the Gemini SDK once, on first use rather than at import time"""
+    global _gemini_configured
+    import google.generativeai as genai
+
+    if not _gemini_configured:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        _gemini_configured = True
+    return genai
+
+
+class EmbeddingProvider:
+    """Interface for embedding backends.
+
+    Implementations return a float32 matrix of shape (len(texts), dim).
+    model_name is part of the embedding cache key, so two providers never
+    share cached vectors.
+    """
+
+    model_name = None
+    dim = EMBEDDING_DIM
+
+    def embed(self, texts, task_type):
+        raise NotImplementedError
+
+    async def aembed(self, texts, task_type):
+        return self.embed(texts, task_type)
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """Gemini text-embedding-004 through the SDK's batch embedding call"""
+
+    model_name = "models/text-embedding-004"
+
+    def __init__(self, ai_client):
+        self.ai_client = ai_client
+        self.genai = configure_gemini()
+
+    def _request(self, texts, task_type):
+        request = {"model": self.model_name, "content": list(texts), "task_type": task_type}
+        # Titles are only accepted for document embeddings
+        if task_type == "retrieval_document":
+            request["title"] = "Embedding of text"
+        return request
+
+    def embed(self, texts, task_type):
+        result = self.genai.embed_content(**self._request(texts, task_type))
+        return as_matrix(result['embedding'])
+
+    async def aembed(self, texts, task_type):
+        result = await self.ai_client.embed_content(**self._request(texts, task_type))
+        return as_matrix(result['embedding'])
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic offline embedder using signed feature hashing.
+
+    Words and character trigrams are hashed into a fixed number of
+    dimensions, so texts that share vocabulary get similar vectors. It needs
+    no network or API key, which makes it suitable for tests and load tests.
+    """
+
+    model_name = "local/feature-hashing-768"
+    _token_pattern = re.compile(r"\w+")
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text):
+        words = self._token_pattern.findall(text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts, task_type):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(
+                    hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"
+                )
+                sign = 1.0 if digest & 1 else -1.0
+                matrix[row, (digest >> 1) % self.dim] += sign
+        return normalize_rows(matrix)
+
+
+def get_embedding_provider(name, ai_client=None):
+    """Create the embedding provider selected in settings"""
+    if name == "gemini":
+        return GeminiEmbeddingProvider(ai_client)
+    if name == "hashing":
+        return HashingEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider: {name}")
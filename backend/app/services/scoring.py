@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def field_scores(vectors, queries):
+    """Cosine similarity of every record field against every query in one matmul.
+
+    vectors is a (n, fields, dim) float32 array of normalized field vectors and
+    queries a (q, dim) array; the result has shape (n, fields, q).
+    """
+    n, fields, dim = vectors.shape
+    queries = np.asarray(queries, dtype=np.float32).reshape(-1, dim)
+    return (vectors.reshape(n * fields, dim) @ queries.T).reshape(n, fields, len(queries))
+
+
+def weight_vector(fields, weights):
+    """Weights dict -> float32 vector aligned with the field order"""
+    return np.array([weights.get(field, 0.0) for field in fields], dtype=np.float32)
+
+
+def combine(scores, weights):
+    """Weighted sum over the field axis of (n, fields, q) scores -> (n, q)"""
+    return np.einsum("nfq,f->nq", scores, weights)
+
+
+def field_query_scores(vectors, field_queries, weights):
+    """Score every record against a separate query vector per field -> (n,).
+
+    Computes sum_f w_f * (v_f . q_f) with one product per weighted field,
+    so fields with zero weight are never read.
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    scores = np.zeros(len(vectors), dtype=np.float32)
+    for field in np.flatnonzero(weights):
+        scores += weights[field] * (vectors[:, field] @ field_queries[field])
+    return scores
+
+
+def weighted_matrix(vectors, weights):
+    """Collapse field vectors into one (n, dim) matrix for a fixed weighting.
+
+    Because scoring is linear, sum_f w_f * (v_f . q) == (sum_f w_f * v_f) . q,
+    so precomputing this matrix scores the corpus for the default weights
+    with one dot product per record instead of one per field.
+    """
+    return np.einsum("nfd,f->nd", vectors, weights).astype(np.float32)
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores in descending order"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    # argpartition finds the top k in linear time; only those k get sorted
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
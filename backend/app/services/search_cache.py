@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.services.embedding_cache import normalize_query
+
+
+def search_cache_key(query):
+    """Normalized cache key for a SearchQuery"""
+    weights = query.field_weights or {}
+    return json.dumps([
+        query.search_type,
+        normalize_query(query.query),
+        query.num_results,
+        (query.role_filter or "").lower(),
+        query.profile_id,
+        query.hybrid,
+        sorted((field, weight) for field, weight in weights.items() if weight)
+    ])
+
+
+def search_corpus(search_type):
+    """Corpus whose writes change the results of a search type"""
+    return "company" if search_type == "company" else "profile"
+
+
+class SearchResultCache:
+    """LRU cache of search responses invalidated by corpus generation.
+
+    Every write to a corpus bumps its generation, and entries computed
+    against an older generation are treated as misses. With a path, the
+    generations live in a SQLite file shared by every process on the host,
+    so a write or background job in one worker invalidates all of them.
+    Each process re-reads that file at most every refresh_seconds, so
+    writes made elsewhere take up to that long to invalidate its entries;
+    its own writes take effect at once.
+
+    A change every worker applies by itself, such as one read from the
+    change feed, is invalidated with broadcast=False: it bumps only this
+    process's own generation, so one write does not flush every worker's
+    cache once per worker.
+    """
+
+    def __init__(self, path=None, size=1000, ttl_seconds=300, refresh_seconds=0.25):
+        self.path = path
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        # corpus -> (generation, monotonic time it was read from the file)
+        self._known = {}
+        self._lock = threading.Lock()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS generations (corpus TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+                )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def generation(self, corpus):
+        """Current (shared, local) generation of a corpus.
+
+        The shared part is re-read from the file at most every refresh_seconds.
+        """
+        return self._shared_generation(corpus), self._generations.get(corpus, 0)
+
+    def _shared_generation(self, corpus):
+        if not self.path:
+            return 0
+        known = self._known.get(corpus)
+        if known is not None and time.monotonic() - known[1] < self.refresh_seconds:
+            return known[0]
+        db = self._connect()
+        try:
+            generation = self._read_generation(db, corpus)
+        finally:
+            db.close()
+        with self._lock:
+            self._remember(corpus, generation)
+        return generation
+
+    def _read_generation(self, db, corpus):
+        row = db.execute("SELECT generation FROM generations WHERE corpus = ?", (corpus,)).fetchone()
+        return row[0] if row else 0
+
+    def _remember(self, corpus, generation):
+        # Never step back to an older value read concurrently with a local write
+        known = self._known.get(corpus)
+        if known is None or generation >= known[0]:
+            self._known[corpus] = (generation, time.monotonic())
+
+    def invalidate(self, corpus, broadcast=True):
+        """Mark cached results for a corpus as stale, in every process sharing the file unless broadcast is False"""
+        with self._lock:
+            if self.path and broadcast:
+                db = self._connect()
+                try:
+                    with db:
+                        db.execute(
+                            """
+                            INSERT INTO generations (corpus, generation) VALUES (?, 1)
+                            ON CONFLICT (corpus) DO UPDATE SET generation = generation + 1
+                            """,
+                            (corpus,),
+                        )
+                        generation = self._read_generation(db, corpus)
+                finally:
+                    db.close()
+                self._remember(corpus, generation)
+            else:
+                self._generations[corpus] = self._generations.get(corpus, 0) + 1
+            # Local entries can go right away; other processes see the new generation
+            for key in [key for key in self._entries if key[0] == corpus]:
+                del self._entries[key]
+
+    def get(self, corpus, key):
+        """Return (value, generation); value is None on a miss.
+
+        Store a freshly computed value with the returned generation so a
+        write that lands while it is computed leaves it stale.
+        """
+        generation = self.generation(corpus)
+        with self._lock:
+            entry = self._entries.get((corpus, key))
+            if entry is not None:
+                entry_generation, expires_at, value = entry
+                if entry_generation == generation and expires_at >= time.monotonic():
+                    self._entries.move_to_end((corpus, key))
+                    self.hits += 1
+                    return value, generation
+                del self._entries[(corpus, key)]
+            self.misses += 1
+        return None, generation
+
+    def put(self, corpus, key, generation, value):
+        with self._lock:
+            self._entries[(corpus, key)] = (generation, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end((corpus, key))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters and the number of cached responses"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+search_cache = SearchResultCache(
+    settings.SEARCH_CACHE_GENERATIONS_PATH or None,
+    size=settings.SEARCH_CACHE_SIZE,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    refresh_seconds=settings.SEARCH_CACHE_GENERATION_REFRESH_SECONDS
+)
@@ -0,0 +1,655 @@
+import math
+import threading
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.backfill import iter_pages
+from app.services.scoring import combine, field_scores, top_k, weight_vector, weighted_matrix
+from app.services.vectors import EMBEDDING_DIM, from_wire
+
+PROFILE_FIELDS = ("role", "bio", "interests", "education", "ai_bio")
+PROFILE_RECORD_COLUMNS = ("id", "name", "role", "education", "bio", "ai_bio", "interests", "image_url")
+COMPANY_FIELDS = ("description", "industry", "location")
+COMPANY_RECORD_COLUMNS = ("id", "name", "description", "industry", "location", "website", "founded_year", "image_url")
+
+# Below this many rows an exact scan is as fast as any ANN structure
+MIN_ANN_ROWS = 1000
+
+# Stands in for the previous partition of a record that did not exist yet
+_NEW_RECORD = object()
+
+# Rebuild the ANN structures once this share of rows is new or changed since the last build
+REBUILD_FRACTION = 0.1
+
+# Modes whose first stage scores compressed codes and needs an exact re-rank
+QUANTIZED_MODES = ("int8", "pq")
+
+
+class IndexState:
+    """Snapshot of an index, swapped in atomically on every change.
+
+    partitions maps each partition key to the positions of its records.
+    ann maps partition keys to (faiss_index, positions) for partitions
+    large enough to have an ANN structure, where positions translates FAISS
+    labels back to rows. Rows no ANN structure covers, and rows in stale
+    whose vectors or partition changed after the build, are listed in
+    unindexed and scored exactly on every search until the next rebuild.
+    removed holds the positions of deleted records: they stay in the
+    arrays, so no other position moves, but are in no partition, are
+    missing from positions and are never returned.
+    layout changes whenever existing records may have moved to new
+    positions; upserts and removals keep it, since they never move a row.
+    """
+
+    def __init__(self, ids, positions, records, vectors, combined, partitions, ann, stale, layout=0, removed=frozenset()):
+        self.ids = ids
+        self.positions = positions
+        self.records = records
+        self.vectors = vectors
+        self.combined = combined
+        self.partitions = partitions
+        self.ann = ann
+        self.stale = stale
+        self.layout = layout
+        self.removed = removed
+        self.removed_positions = np.array(sorted(removed), dtype=np.int64)
+        covered = np.zeros(len(ids), dtype=bool)
+        for _, ann_positions in ann.values():
+            covered[ann_positions] = True
+        if stale:
+            covered[list(stale)] = False
+        covered[self.removed_positions] = True
+        self.unindexed = np.flatnonzero(~covered)
+
+
+class VectorIndex:
+    """In-process multi-field vector index answering weighted similarity searches.
+
+    Each record keeps one normalized vector per field in a (n, fields, dim)
+    float32 array; missing fields are zero. combined_similarity is
+    sum(weight * cosine similarity), as the match_*_weighted RPCs return.
+
+    With partition_by set (role for profiles), records are partitioned by
+    the lowercased value of that column. A filtered search scores only its
+    partition, and an unfiltered one merges the results of every partition.
+
+    In "exact" mode, and for small partitions, records are scored with
+    NumPy matrix products (see app.services.scoring). The ANN modes keep one
+    FAISS structure per partition, storing the fields concatenated, and
+    query with the field weights times the query vector repeated per field,
+    so the inner product FAISS ranks by is the same weighted sum.
+
+    The quantized modes score every row of a partition from compact codes,
+    int8 per dimension ("int8") or product quantization ("pq", pq_m bytes
+    per row), fetch rerank times k candidates and re-rank them exactly
+    against the float vectors.
+
+    Records can be upserted while the index serves searches. Vectors live in
+    buffers with spare capacity so appends do not copy the whole table.
+    """
+
+    def __init__(
+        self,
+        table,
+        fields,
+        weights,
+        record_columns,
+        partition_by=None,
+        mode="exact",
+        hnsw_m=32,
+        ef_search=128,
+        ivf_nlist=None,
+        nprobe=16,
+        rerank=4,
+        pq_m=96
+    ):
+        self.table = table
+        self.fields = tuple(fields)
+        self.weights = dict(weights)
+        self.record_columns = tuple(record_columns)
+        self.partition_by = partition_by
+        self.mode = mode
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.ivf_nlist = ivf_nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.pq_m = pq_m
+        self._state = None
+        self._build_lock = threading.Lock()
+        self._vector_buffer = None
+        self._combined_buffer = None
+        # Positions upserted while a background rebuild runs, or None when idle
+        self._rebuild_dirty = None
+
+    @property
+    def ready(self):
+        return self._state is not None
+
+    @property
+    def state(self):
+        """Current immutable IndexState"""
+        return self._state
+
+    def __len__(self):
+        return len(self._state.positions) if self._state else 0
+
+    def records(self):
+        """Records of every row the index holds, deleted ones excluded"""
+        state = self._state
+        return [state.records[position] for position in state.positions.values()]
+
+    def partition_sizes(self):
+        """Number of records in each partition"""
+        return {key: len(positions) for key, positions in self._state.partitions.items()}
+
+    def select_columns(self):
+        """Columns to read from Supabase to build the index"""
+        return ", ".join(self.record_columns + tuple(f"{field}_vector" for field in self.fields))
+
+    def load(self, client, page_size=1000):
+        """Page the whole table from Supabase and build the index from it"""
+        records, vectors = self.fetch(client, page_size)
+        self._install(records, vectors)
+        print(f"Loaded {len(records)} {self.table} rows into the {self.mode} index")
+
+    def fetch(self, client, page_size=1000):
+        """Page the whole table from Supabase into (records, vectors)"""
+        records = []
+        blocks = []
+        for rows in iter_pages(client, self.table, self.select_columns(), page_size):
+            page_records, page_vectors = self._parse_rows(rows)
+            records.extend(page_records)
+            blocks.append(page_vectors)
+        vectors = np.concatenate(blocks) if blocks else np.zeros((0, len(self.fields), EMBEDDING_DIM), dtype=np.float32)
+        return records, vectors
+
+    def combine_fields(self, vectors):
+        """Collapse (n, fields, dim) vectors with the index's default weights"""
+        return weighted_matrix(vectors, self._weight_vector())
+
+    def install_generation(self, generation):
+        """Serve a generation mapped from the shared vector store.
+
+        The mapped buffers are used in place, so processes mapping the same
+        generation share its pages. Saved ANN structures are used when they
+        were built in this index's mode, and rebuilt otherwise.
+        """
+        ann = generation.ann if generation.mode == self.mode else None
+        stale = generation.stale if ann is not None else ()
+        self._install(generation.records, generation.vectors, generation.combined, ann, stale, generation.removed)
+
+    def build(self, rows):
+        """Build the index from already-fetched rows"""
+        records, vectors = self._parse_rows(rows)
+        self._install(records, vectors)
+
+    def upsert(self, rows):
+        """Insert or replace records from database rows without rebuilding the index"""
+        records, vectors = self._parse_rows(rows)
+        weights = self._weight_vector()
+        with self._build_lock:
+            state = self._state
+            ids = list(state.ids)
+            positions = dict(state.positions)
+            all_records = list(state.records)
+            partitions = dict(state.partitions)
+            stale = set(state.stale)
+            new_ids = {str(record["id"]) for record in records} - set(positions)
+            self._reserve(len(ids) + len(new_ids))
+            for record, vector in zip(records, vectors):
+                record_id = str(record["id"])
+                key = self._partition_key(record)
+                position = positions.get(record_id)
+                if position is None:
+                    position = len(ids)
+                    positions[record_id] = position
+                    ids.append(record_id)
+                    all_records.append(record)
+                    old_key = _NEW_RECORD
+                else:
+                    old_key = self._partition_key(all_records[position])
+                    all_records[position] = record
+                    stale.add(position)
+                    if self._rebuild_dirty is not None:
+                        self._rebuild_dirty.add(position)
+                if old_key != key:
+                    if old_key is not _NEW_RECORD:
+                        remaining = partitions[old_key][partitions[old_key] != position]
+                        if len(remaining):
+                            partitions[old_key] = remaining
+                        else:
+                            del partitions[old_key]
+                    partitions[key] = np.append(partitions.get(key, np.empty(0, dtype=np.int64)), position)
+                # Written in place: a search running concurrently may see the
+                # new vector a moment before the new state is published
+                self._vector_buffer[position] = vector
+                self._combined_buffer[position] = weighted_matrix(vector[np.newaxis], weights)[0]
+            n = len(ids)
+            self._state = IndexState(
+                ids,
+                positions,
+                all_records,
+                self._vector_buffer[:n],
+                self._combined_buffer[:n],
+                partitions,
+                state.ann,
+                stale,
+                state.layout,
+                state.removed
+            )
+        self._maybe_rebuild()
+
+    def remove(self, record_ids):
+        """Drop deleted records; return how many the index held.
+
+        Their rows are tombstoned rather than compacted away, so positions
+        held by ANN structures and the cofounder graph stay valid. ANN
+        structures keep their vectors until the next rebuild, and searches
+        skip them.
+        """
+        with self._build_lock:
+            state = self._state
+            positions = dict(state.positions)
+            partitions = dict(state.partitions)
+            removed = set(state.removed)
+            for record_id in record_ids:
+                position = positions.pop(str(record_id), None)
+                if position is None:
+                    continue
+                removed.add(position)
+                key = self._partition_key(state.records[position])
+                remaining = partitions[key][partitions[key] != position]
+                if len(remaining):
+                    partitions[key] = remaining
+                else:
+                    del partitions[key]
+            count = len(removed) - len(state.removed)
+            if count:
+                self._state = IndexState(
+                    state.ids,
+                    positions,
+                    state.records,
+                    state.vectors,
+                    state.combined,
+                    partitions,
+                    state.ann,
+                    state.stale,
+                    state.layout,
+                    frozenset(removed)
+                )
+        return count
+
+    def search(self, query, k, weights=None, role_filter=None):
+        """Return the top-k records by weighted multi-field similarity to the query.
+
+        weights overrides the index's field weights for this search; fields
+        it leaves out get no weight.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        return self.search_many(query[np.newaxis], k, weights, role_filter)[0]
+
+    def search_many(self, queries, k, weights=None, role_filter=None):
+        """Return the top-k records for each row of a (q, dim) query matrix.
+
+        All queries are scored together, as one query matrix against the
+        corpus matrix.
+        """
+        state = self._state
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        if len(state.ids) == 0 or k <= 0:
+            return [[] for _ in queries]
+        weights = self._check_weights(weights)
+        partition = self._filter_key(role_filter) if role_filter else None
+
+        if not state.ann:
+            matches = self._exact(state, queries, weights, k, partition)
+        else:
+            matches = self._approximate(state, queries, weights, k, partition)
+
+        return [
+            [self._result(state, position, score, query) for position, score in query_matches]
+            for query, query_matches in zip(queries, matches)
+        ]
+
+    def _approximate(self, state, queries, weights, k, partition):
+        keys = [partition] if partition is not None else list(state.partitions)
+        weighted_queries = (
+            self._weight_vector(weights)[np.newaxis, :, np.newaxis] * queries[:, np.newaxis, :]
+        ).reshape(len(queries), -1)
+
+        quantized = self.mode in QUANTIZED_MODES
+        candidates = k * self.rerank if quantized else k
+        matches = [[] for _ in queries]
+        for key in keys:
+            if key not in state.ann:
+                continue
+            index, ann_positions = state.ann[key]
+            # Over-fetch a little so dropping stale and removed rows still leaves k
+            fetch = min(len(ann_positions), candidates + min(len(state.stale) + len(state.removed), k))
+            scores, labels = index.search(weighted_queries, fetch)
+            for j in range(len(queries)):
+                matches[j].extend(
+                    (int(ann_positions[label]), float(score))
+                    for score, label in zip(scores[j], labels[j])
+                    if label >= 0
+                    and int(ann_positions[label]) not in state.stale
+                    and int(ann_positions[label]) not in state.removed
+                )
+
+        # Rows no ANN structure covers are scored exactly and merged in
+        extra = state.unindexed
+        if partition is not None:
+            extra = extra[np.isin(extra, state.partitions.get(partition, []))]
+        if len(extra):
+            extra_scores = self._score(state, queries, weights, extra)
+            for j in range(len(queries)):
+                matches[j].extend(zip(extra.tolist(), extra_scores[:, j].tolist()))
+
+        available = sum(len(state.partitions.get(key, [])) for key in keys)
+        for j, query in enumerate(queries):
+            if quantized and matches[j]:
+                # Scores from codes are approximate; re-rank the candidates exactly
+                positions = np.array([position for position, _ in matches[j]], dtype=np.int64)
+                exact_scores = self._score(state, query, weights, positions)[:, 0]
+                matches[j] = list(zip(positions.tolist(), exact_scores.tolist()))
+            matches[j].sort(key=lambda match: -match[1])
+            matches[j] = matches[j][:k]
+            # An IVF probe can come back short; rescan exactly if so
+            if len(matches[j]) < min(k, available):
+                matches[j] = self._exact(state, query[np.newaxis], weights, k, partition)[0]
+        return matches
+
+    def recall_at_k(self, queries, k, weights=None, role_filter=None):
+        """Mean share of the exact top-k that search_many returns for each query"""
+        state = self._state
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        weights = self._check_weights(weights)
+        partition = self._filter_key(role_filter) if role_filter else None
+        exact = self._exact(state, queries, weights, k, partition)
+        found = self.search_many(queries, k, weights, role_filter)
+        recalls = []
+        for expected, results in zip(exact, found):
+            if expected:
+                expected_ids = {state.ids[position] for position, _ in expected}
+                returned_ids = {str(result["id"]) for result in results}
+                recalls.append(len(expected_ids & returned_ids) / len(expected_ids))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+    def lookup(self, record_ids, query, weights=None):
+        """Score specific records against a query, skipping ids the index does not hold"""
+        state = self._state
+        positions = np.array(
+            [state.positions[str(record_id)] for record_id in record_ids if str(record_id) in state.positions],
+            dtype=np.int64
+        )
+        if not len(positions):
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        scores = self._score(state, query, self._check_weights(weights), positions)[:, 0]
+        return [self._result(state, int(position), float(score), query) for position, score in zip(positions, scores)]
+
+    def changed(self, rows):
+        """The rows whose record or vectors differ from what the index holds"""
+        state = self._state
+        records, vectors = self._parse_rows(rows)
+        changed = []
+        for row, record, vector in zip(rows, records, vectors):
+            position = state.positions.get(str(record["id"]))
+            if position is None or state.records[position] != record or not np.array_equal(state.vectors[position], vector):
+                changed.append(row)
+        return changed
+
+    def score(self, queries, weights=None, positions=None):
+        """Weighted scores of each record (or of the given positions) for each query -> (n, q)"""
+        return self._score(self._state, queries, self._check_weights(weights), positions)
+
+    def _score(self, state, queries, weights=None, positions=None):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        if weights is None:
+            combined = state.combined if positions is None else state.combined[positions]
+            return combined @ queries.T
+        vectors = state.vectors if positions is None else state.vectors[positions]
+        return combine(field_scores(vectors, queries), self._weight_vector(weights))
+
+    def _exact(self, state, queries, weights, k, partition):
+        positions = None
+        if partition is not None:
+            positions = state.partitions.get(partition)
+            if positions is None:
+                return [[] for _ in queries]
+        scores = self._score(state, queries, weights, positions)
+        if positions is None and len(state.removed_positions):
+            scores[state.removed_positions] = -np.inf
+        matches = []
+        for column in scores.T:
+            top = top_k(column, k)
+            labels = top if positions is None else positions[top]
+            matches.append([(int(label), float(column[i])) for label, i in zip(labels, top) if np.isfinite(column[i])])
+        return matches
+
+    def _parse_rows(self, rows):
+        vectors = np.zeros((len(rows), len(self.fields), EMBEDDING_DIM), dtype=np.float32)
+        records = []
+        for i, row in enumerate(rows):
+            records.append({column: row.get(column) for column in self.record_columns})
+            for j, field in enumerate(self.fields):
+                vector = from_wire(row.get(f"{field}_vector"))
+                if vector is not None and vector.shape[0] == EMBEDDING_DIM:
+                    vectors[i, j] = vector
+        return records, vectors
+
+    def _install(self, records, vector_buffer, combined_buffer=None, ann=None, stale=(), removed=()):
+        # The buffers may have spare rows past the records
+        n = len(records)
+        vectors = vector_buffer[:n]
+        if combined_buffer is None:
+            combined_buffer = self.combine_fields(vectors)
+        combined = combined_buffer[:n]
+        with self._build_lock:
+            ids = [str(record["id"]) for record in records]
+            removed = frozenset(removed)
+            positions = {
+                record_id: position for position, record_id in enumerate(ids) if position not in removed
+            }
+            grouped = {}
+            for position in positions.values():
+                grouped.setdefault(self._partition_key(records[position]), []).append(position)
+            partitions = {key: np.array(members, dtype=np.int64) for key, members in grouped.items()}
+            if ann is None:
+                ann = self._build_ann({
+                    key: (members, vectors[members])
+                    for key, members in partitions.items()
+                    if self._wants_ann(members)
+                })
+            self._vector_buffer = vector_buffer
+            self._combined_buffer = combined_buffer
+            layout = self._state.layout + 1 if self._state else 0
+            self._state = IndexState(ids, positions, records, vectors, combined, partitions, ann, set(stale), layout, removed)
+
+    def _reserve(self, capacity):
+        # Grow geometrically so a stream of inserts copies the table O(log n) times
+        if capacity <= len(self._vector_buffer):
+            return
+        n = len(self._state.ids)
+        size = max(capacity, 2 * len(self._vector_buffer), 64)
+        vector_buffer = np.zeros((size,) + self._vector_buffer.shape[1:], dtype=np.float32)
+        vector_buffer[:n] = self._vector_buffer[:n]
+        combined_buffer = np.zeros((size, self._combined_buffer.shape[1]), dtype=np.float32)
+        combined_buffer[:n] = self._combined_buffer[:n]
+        self._vector_buffer = vector_buffer
+        self._combined_buffer = combined_buffer
+
+    def _wants_ann(self, positions):
+        return self.mode not in ("exact", "flat") and len(positions) >= MIN_ANN_ROWS
+
+    def _maybe_rebuild(self):
+        with self._build_lock:
+            state = self._state
+            if self._rebuild_dirty is not None:
+                return
+            eligible = 0
+            pending = len(state.stale)
+            for key, members in state.partitions.items():
+                if self._wants_ann(members):
+                    eligible += len(members)
+                    covered = len(state.ann[key][1]) if key in state.ann else 0
+                    pending += max(0, len(members) - covered)
+            if not eligible or pending < max(1, int(eligible * REBUILD_FRACTION)):
+                return
+            self._rebuild_dirty = set()
+        threading.Thread(target=self._rebuild, name=f"{self.table}-index-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            with self._build_lock:
+                state = self._state
+                snapshot = {
+                    key: (members, state.vectors[members])
+                    for key, members in state.partitions.items()
+                    if self._wants_ann(members)
+                }
+                self._rebuild_dirty = set()
+            ann = self._build_ann(snapshot)
+            with self._build_lock:
+                state = self._state
+                # Rows upserted during the build stay exact until the next one
+                self._state = IndexState(
+                    state.ids,
+                    state.positions,
+                    state.records,
+                    state.vectors,
+                    state.combined,
+                    state.partitions,
+                    ann,
+                    self._rebuild_dirty,
+                    state.layout,
+                    state.removed
+                )
+            print(f"Rebuilt the {self.mode} index over {sum(len(p) for p, _ in snapshot.values())} {self.table} rows")
+        except Exception as e:
+            print(f"Error rebuilding {self.table} index: {str(e)}")
+        finally:
+            self._rebuild_dirty = None
+
+    def _build_ann(self, partitions):
+        """Build one FAISS structure per partition from {key: (positions, vectors)}"""
+        return {
+            key: (self._build_faiss(vectors), positions)
+            for key, (positions, vectors) in partitions.items()
+        }
+
+    def _build_faiss(self, vectors):
+        n = len(vectors)
+        flat = np.ascontiguousarray(vectors.reshape(n, -1))
+        dim = flat.shape[1]
+        if self.mode == "ivf":
+            # FAISS wants roughly 39 training points per centroid
+            nlist = self.ivf_nlist or max(1, min(int(math.sqrt(n)), n // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(flat)
+            index.nprobe = self.nprobe
+        elif self.mode == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = self.ef_search
+        elif self.mode == "int8":
+            # One byte per dimension, scaled by each dimension's trained range
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+            index.train(flat)
+        elif self.mode == "pq":
+            if dim % self.pq_m:
+                raise ValueError(f"pq_m={self.pq_m} does not divide the {dim} concatenated dimensions")
+            index = faiss.IndexPQ(dim, self.pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+            index.train(flat)
+        else:
+            raise ValueError(f"Unknown index mode: {self.mode}")
+        index.add(flat)
+        return index
+
+    def _check_weights(self, weights):
+        if not weights:
+            return None
+        unknown = set(weights) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown {self.table} fields in weights: {', '.join(sorted(unknown))}")
+        return weights
+
+    def _weight_vector(self, weights=None):
+        return weight_vector(self.fields, weights or self.weights)
+
+    def _partition_key(self, record):
+        if self.partition_by is None:
+            return None
+        return (record.get(self.partition_by) or "").lower()
+
+    def _filter_key(self, value):
+        if self.partition_by is None:
+            raise ValueError(f"{self.table} searches cannot be filtered by role")
+        return value.lower()
+
+    def _result(self, state, position, score, query):
+        field_scores = state.vectors[position] @ query
+        result = dict(state.records[position])
+        result["combined_similarity"] = score
+        for field, field_score in zip(self.fields, field_scores):
+            result[f"{field}_similarity"] = float(field_score)
+        return result
+
+
+profile_index = VectorIndex(
+    "personalprofile",
+    PROFILE_FIELDS,
+    settings.PROFILE_FIELD_WEIGHTS,
+    PROFILE_RECORD_COLUMNS,
+    partition_by="role",
+    mode=settings.SEARCH_INDEX_MODE,
+    hnsw_m=settings.SEARCH_INDEX_HNSW_M,
+    ef_search=settings.SEARCH_INDEX_EF_SEARCH,
+    nprobe=settings.SEARCH_INDEX_NPROBE,
+    rerank=settings.SEARCH_INDEX_RERANK,
+    pq_m=settings.SEARCH_INDEX_PQ_M
+)
+
+company_index = VectorIndex(
+    "companyprofile",
+    COMPANY_FIELDS,
+    settings.COMPANY_FIELD_WEIGHTS,
+    COMPANY_RECORD_COLUMNS,
+    mode=settings.SEARCH_INDEX_MODE,
+    hnsw_m=settings.SEARCH_INDEX_HNSW_M,
+    ef_search=settings.SEARCH_INDEX_EF_SEARCH,
+    nprobe=settings.SEARCH_INDEX_NPROBE,
+    rerank=settings.SEARCH_INDEX_RERANK,
+    pq_m=settings.SEARCH_INDEX_PQ_M
+)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.services.db import supabase
+
+    parser = argparse.ArgumentParser(description="Measure recall@k of an index mode against exact search")
+    parser.add_argument("--table", choices=["profiles", "companies"], default="profiles")
+    parser.add_argument("--mode", choices=["hnsw", "ivf", "int8", "pq"], default=settings.SEARCH_INDEX_MODE)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index = profile_index if args.table == "profiles" else company_index
+    index.mode = args.mode
+    index.load(supabase)
+    state = index.state
+    # Stored field vectors of random records stand in for query embeddings
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(state.ids), size=min(args.queries, len(state.ids)), replace=False)
+    queries = state.vectors[rows, rng.integers(len(index.fields), size=len(rows))]
+    queries = queries[np.any(queries, axis=1)]
+    code_size = sum(ann.sa_code_size() * len(positions) for ann, positions in state.ann.values())
+    covered = sum(len(positions) for _, positions in state.ann.values())
+    print(f"{args.mode}: recall@{args.k} = {index.recall_at_k(queries, args.k):.4f} over {len(queries)} queries")
+    if covered:
+        print(f"{code_size / covered:.0f} bytes per row in the ANN structures vs {state.vectors[0].nbytes} as float32")
@@ -0,0 +1,287 @@
+import fcntl
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.backfill import iter_changed, latest_watermark, watermark_position
+
+# Spare rows allocated past the published records, so upserts in a worker
+# touch a few private pages instead of copying the whole mapping
+SPARE_FRACTION = 0.125
+MIN_SPARE_ROWS = 64
+
+# Published generations kept on disk besides the current one
+KEEP_GENERATIONS = 1
+
+# Bump when the on-disk layout changes so older snapshots are rebuilt
+STORE_FORMAT = 2
+
+# Map the codes of saved flat-code indexes (int8, pq) read-only so workers
+# share their pages; FAISS builds without the flag read private copies
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+
+
+class StoreGeneration:
+    """One published generation of a table's vectors, mapped copy-on-write.
+
+    vectors and combined are np.memmap buffers with spare rows past the
+    first len(records) positions. Pages are shared between every process
+    mapping the generation until a process writes to them. ann holds the
+    FAISS structures saved with it, built in mode: the codes of int8 and pq
+    structures are mapped read-only and shared too, while hnsw and ivf ones
+    are read into private memory. stale lists the positions changed since
+    they were built, and removed the positions of deleted records, which
+    are kept as tombstones. watermark is the (updated_at, id) of the
+    newest row it contains, or None if it cannot be replayed.
+    """
+
+    def __init__(self, generation, records, vectors, combined, meta, ann):
+        self.generation = generation
+        self.records = records
+        self.vectors = vectors
+        self.combined = combined
+        self.published_at = meta["published_at"]
+        self.mode = meta.get("mode")
+        self.watermark = meta.get("watermark")
+        self.stale = set(meta.get("stale", []))
+        self.removed = set(meta.get("removed", []))
+        self.ann = ann
+
+
+class VectorStore:
+    """On-disk vector generations of one table, shared by every worker on the host.
+
+    Each generation directory holds vectors.f32 (rows x fields x dim
+    float32), combined.f32 (rows x dim weighted field sums), records.json
+    (the id table and record columns, in row order), meta.json, and one
+    saved FAISS structure plus its positions per ANN partition. The
+    CURRENT file names the live generation. A writer, serialized by an
+    exclusive lock on writer.lock, fills a temporary directory, renames it
+    into place and then replaces CURRENT, so readers only ever see whole
+    generations.
+    """
+
+    def __init__(self, root, table):
+        self.path = os.path.join(root, table)
+        os.makedirs(self.path, exist_ok=True)
+
+    @contextmanager
+    def writer_lock(self):
+        """Hold the table's exclusive writer lock"""
+        with open(os.path.join(self.path, "writer.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def current(self):
+        """Number of the live generation, or None before the first publish"""
+        try:
+            with open(os.path.join(self.path, "CURRENT")) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def age(self):
+        """Seconds since the live generation was published, or None"""
+        if self.current() is None:
+            return None
+        return time.time() - self.meta()["published_at"]
+
+    def publish(self, records, vectors, combined, extra=None, ann=None, stale=(), removed=()):
+        """Write a new generation and make it current; call under writer_lock()"""
+        n = len(records)
+        capacity = n + max(MIN_SPARE_ROWS, int(n * SPARE_FRACTION))
+        generation = (self.current() or 0) + 1
+        staging = os.path.join(self.path, f"staging-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        self._write_block(os.path.join(staging, "vectors.f32"), vectors, capacity)
+        self._write_block(os.path.join(staging, "combined.f32"), combined, capacity)
+        with open(os.path.join(staging, "records.json"), "w") as f:
+            json.dump(records, f, default=str)
+        ann_keys = []
+        for i, (key, (index, positions)) in enumerate((ann or {}).items()):
+            faiss.write_index(index, os.path.join(staging, f"ann-{i}.faiss"))
+            np.save(os.path.join(staging, f"ann-{i}.npy"), positions)
+            ann_keys.append(key)
+        meta = {
+            "format": STORE_FORMAT,
+            "generation": generation,
+            "rows": n,
+            "capacity": capacity,
+            "vector_shape": list(vectors.shape[1:]),
+            "combined_shape": list(combined.shape[1:]),
+            "published_at": time.time(),
+            "ann": ann_keys if ann is not None else None,
+            "stale": sorted(int(position) for position in stale),
+            "removed": sorted(int(position) for position in removed),
+            **(extra or {})
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(staging, self._generation_path(generation))
+        pointer = os.path.join(self.path, "CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(self.path, "CURRENT"))
+        self._prune(generation)
+        return generation
+
+    def open(self, generation=None):
+        """Map a generation (the live one by default), or return None if there is none"""
+        generation = generation or self.current()
+        if generation is None:
+            return None
+        path = self._generation_path(generation)
+        meta = self.meta(generation)
+        with open(os.path.join(path, "records.json")) as f:
+            records = json.load(f)
+        capacity = meta["capacity"]
+        # Copy-on-write: the file is never modified, and a worker's own
+        # upserts only copy the pages they touch
+        vectors = np.memmap(
+            os.path.join(path, "vectors.f32"), dtype=np.float32, mode="c",
+            shape=(capacity, *meta["vector_shape"])
+        )
+        combined = np.memmap(
+            os.path.join(path, "combined.f32"), dtype=np.float32, mode="c",
+            shape=(capacity, *meta["combined_shape"])
+        )
+        ann = None
+        if meta.get("ann") is not None:
+            ann = {
+                key: (
+                    faiss.read_index(os.path.join(path, f"ann-{i}.faiss"), MMAP_FLAGS),
+                    np.load(os.path.join(path, f"ann-{i}.npy"))
+                )
+                for i, key in enumerate(meta["ann"])
+            }
+        return StoreGeneration(generation, records, vectors, combined, meta, ann)
+
+    def meta(self, generation=None):
+        """meta.json of a generation (the live one by default)"""
+        generation = generation or self.current()
+        with open(os.path.join(self._generation_path(generation), "meta.json")) as f:
+            return json.load(f)
+
+    def _generation_path(self, generation):
+        return os.path.join(self.path, f"gen-{generation:08d}")
+
+    def _write_block(self, path, array, capacity):
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        row_bytes = array[0].nbytes if len(array) else int(np.prod(array.shape[1:])) * 4
+        with open(path, "wb") as f:
+            f.write(array.tobytes())
+            # The spare rows are left as a sparse hole of zeros
+            f.truncate(capacity * row_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _prune(self, generation):
+        # Processes still mapping a removed generation keep reading it until
+        # they unmap it; the files only disappear from the directory
+        for name in os.listdir(self.path):
+            if name.startswith("gen-") and int(name[4:]) < generation - KEEP_GENERATIONS:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+
+def publish_index(store, index, watermark):
+    """Publish an index's current state, ANN structures included, as a new generation"""
+    state = index.state
+    store.publish(
+        state.records,
+        state.vectors,
+        state.combined,
+        extra={**_layout(index), "mode": index.mode, "watermark": watermark},
+        ann=state.ann,
+        stale=state.stale,
+        removed=state.removed
+    )
+
+
+def replay_changes(index, client, watermark):
+    """Upsert rows modified after a watermark; return (new watermark, rows past the old one).
+
+    Rows in the SYNC_OVERLAP_SECONDS before the watermark are upserted
+    again too, which picks up rows committed after the snapshot with an
+    older updated_at; rows the snapshot already holds unchanged are skipped
+    so they are not marked stale, and only rows past the old watermark are
+    counted.
+    """
+    replayed = 0
+    start = watermark_position(watermark)
+    rows_iter = iter_changed(
+        client, index.table, index.select_columns(), watermark,
+        settings.BACKFILL_PAGE_SIZE, settings.SYNC_OVERLAP_SECONDS
+    )
+    for rows in rows_iter:
+        changed = index.changed(rows)
+        if changed:
+            index.upsert(changed)
+        replayed += sum(1 for row in rows if watermark_position(row) > start)
+        watermark = max(watermark, [rows[-1]["updated_at"], rows[-1]["id"]], key=watermark_position)
+    return watermark, replayed
+
+
+def load_index(index, client):
+    """Load an index from its on-disk snapshot, replaying rows changed since.
+
+    The first worker to take the writer lock fetches the whole table if
+    there is no usable snapshot, or else maps the snapshot and replays
+    only the rows modified after its watermark, and publishes the result.
+    Workers that follow map that generation, saved ANN structures
+    included, and find nothing left to replay. Returns the watermark the
+    index is now current to, or None if the table has no updated_at.
+    """
+    store = VectorStore(settings.VECTOR_STORE_PATH, index.table)
+    with store.writer_lock():
+        if not _reusable(store, index):
+            try:
+                watermark = latest_watermark(client, index.table)
+            except Exception as e:
+                # Without updated_at the snapshot is only reused by workers booting together
+                print(f"Error reading the {index.table} watermark, snapshot will not be replayable: {str(e)}")
+                watermark = None
+            index.load(client)
+            publish_index(store, index, watermark)
+        generation = store.open()
+        index.install_generation(generation)
+        print(f"Mapped generation {generation.generation} of the {index.table} vector store")
+        watermark = generation.watermark
+        if watermark is not None:
+            watermark, replayed = replay_changes(index, client, watermark)
+            if replayed:
+                publish_index(store, index, watermark)
+                print(f"Replayed {replayed} changed {index.table} rows onto the snapshot")
+    return watermark
+
+
+def _layout(index):
+    # combined.f32 bakes in the field weights, so changing them rebuilds the snapshot
+    return {"fields": list(index.fields), "weights": index.weights, "columns": list(index.record_columns)}
+
+
+def _reusable(store, index):
+    if store.current() is None:
+        return False
+    meta = store.meta()
+    if meta.get("format") != STORE_FORMAT or any(meta.get(key) != value for key, value in _layout(index).items()):
+        return False
+    age = time.time() - meta["published_at"]
+    if meta.get("watermark") is None:
+        return age <= settings.VECTOR_STORE_BOOT_WINDOW_SECONDS
+    # Replaying picks up inserts and updates and the change feed's id sweep
+    # drops deleted rows; a periodic full fetch compacts the tombstones away
+    return age <= settings.VECTOR_STORE_MAX_AGE_SECONDS
@@ -0,0 +1,44 @@
+import numpy as np
+
+EMBEDDING_DIM = 768
+
+
+def as_matrix(embeddings):
+    """Stack embeddings into a contiguous float32 matrix of shape (n, dim)"""
+    if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    if len(embeddings) == 0:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.ascontiguousarray(np.stack([np.asarray(e, dtype=np.float32) for e in embeddings]))
+
+
+def normalize_rows(matrix):
+    """L2-normalize every row of a float32 matrix in one vectorized pass"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    # Leave all-zero rows untouched instead of dividing by zero
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def to_wire(vector):
+    """Format a vector as a pgvector text literal for PostgREST"""
+    # 9 significant digits round-trip every float32 exactly
+    return "[" + ",".join(f"{x:.9g}" for x in np.asarray(vector, dtype=np.float32).tolist()) + "]"
+
+
+def to_wire_row(row):
+    """Convert every ndarray value of a row dict to its wire format"""
+    return {
+        column: to_wire(value) if isinstance(value, np.ndarray) else value
+        for column, value in row.items()
+    }
+
+
+def from_wire(value):
+    """Parse a vector read from PostgREST (text literal or JSON list) into float32"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return np.fromstring(value.strip("[]"), sep=",", dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
@@ -7,6 +7,7 @@ import uvicorn
 import os
 from dotenv import load_dotenv
 from app.services.embeddings import update_single_profile_embeddings, update_single_profile_ai_bio, get_embedding
+from app.services.vectors import to_wire
 
 # Load environment variables
 load_dotenv()
@@ -93,8 +94,8 @@ async def create_company(company: CompanyProfileBase):
         # Generate embedding for company description if available
         if company.description:
             description_embedding = get_embedding(company.description)
-            if description_embedding:
-                company_dict['description_vector'] = description_embedding
+            if description_embedding is not None:
+                company_dict['description_vector'] = to_wire(description_embedding)
         
         result = supabase.table("CompanyProfile").insert(company_dict).execute()
         return {"message": "Company created successfully", "data": result.data}
@@ -0,0 +1,14 @@
+-- Source-text hashes for every embedding column. The embedding updaters
+-- compare these against sha256(text) and only re-embed fields that changed.
+
+ALTER TABLE personalprofile
+    ADD COLUMN IF NOT EXISTS role_hash text,
+    ADD COLUMN IF NOT EXISTS bio_hash text,
+    ADD COLUMN IF NOT EXISTS interests_hash text,
+    ADD COLUMN IF NOT EXISTS education_hash text,
+    ADD COLUMN IF NOT EXISTS ai_bio_hash text;
+
+ALTER TABLE companyprofile
+    ADD COLUMN IF NOT EXISTS description_hash text,
+    ADD COLUMN IF NOT EXISTS industry_hash text,
+    ADD COLUMN IF NOT EXISTS location_hash text;
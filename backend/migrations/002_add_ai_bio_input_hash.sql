@@ -0,0 +1,5 @@
+-- Hash of the AI bio prompt inputs plus the prompt version. A profile is
+-- only sent for AI bio generation when this no longer matches.
+
+ALTER TABLE personalprofile
+    ADD COLUMN IF NOT EXISTS ai_bio_input_hash text;
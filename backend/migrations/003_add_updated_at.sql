@@ -0,0 +1,28 @@
+-- Last-modified time of every row. Index snapshots record the newest
+-- (updated_at, id) they contain and replay only rows past it at boot.
+
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE personalprofile
+    ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+ALTER TABLE companyprofile
+    ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+DROP TRIGGER IF EXISTS personalprofile_updated_at ON personalprofile;
+CREATE TRIGGER personalprofile_updated_at
+    BEFORE UPDATE ON personalprofile
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS companyprofile_updated_at ON companyprofile;
+CREATE TRIGGER companyprofile_updated_at
+    BEFORE UPDATE ON companyprofile
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE INDEX IF NOT EXISTS personalprofile_updated_at_id ON personalprofile (updated_at, id);
+CREATE INDEX IF NOT EXISTS companyprofile_updated_at_id ON companyprofile (updated_at, id);
@@ -0,0 +1,35 @@
+-- Bulk update of existing rows by id, used by the embedding backfills.
+-- Unlike an upsert it never inserts: a row deleted after the backfill read
+-- it stays deleted. Every row in one call must carry the same columns.
+
+CREATE OR REPLACE FUNCTION update_rows(target_table text, updates jsonb)
+RETURNS integer AS $$
+DECLARE
+    assignments text;
+    updated integer;
+BEGIN
+    IF target_table NOT IN ('personalprofile', 'companyprofile') THEN
+        RAISE EXCEPTION 'update_rows does not accept table %', target_table;
+    END IF;
+
+    SELECT string_agg(format('%I = source.%I', key, key), ', ')
+    INTO assignments
+    FROM jsonb_object_keys(updates -> 0) AS key
+    WHERE key <> 'id';
+
+    IF assignments IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    EXECUTE format(
+        'UPDATE %I AS target SET %s FROM jsonb_populate_recordset(NULL::%I, $1) AS source WHERE target.id = source.id',
+        target_table, assignments, target_table
+    ) USING updates;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the backend's service role may rewrite rows through this function
+REVOKE ALL ON FUNCTION update_rows(text, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION update_rows(text, jsonb) TO service_role;
@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+# Settings are read when app.core.config is imported, so the test
+# environment has to be in place before any app module loads: no network,
+# the offline embedder and throwaway state files.
+_state_dir = tempfile.mkdtemp(prefix="backend-tests-")
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("EMBEDDING_PROVIDER", "hashing")
+os.environ.setdefault("JOB_WORKERS", "0")
+for name, filename in (
+    ("EMBEDDING_CACHE_PATH", "embeddings.sqlite3"),
+    ("SEARCH_CACHE_GENERATIONS_PATH", "search_generations.sqlite3"),
+    ("JOB_QUEUE_PATH", "jobs.sqlite3"),
+    ("BACKFILL_CHECKPOINT_PATH", "backfill_checkpoint.json"),
+    ("WARM_QUERIES_PATH", "warm_queries.json"),
+    ("VECTOR_STORE_PATH", "vector_store"),
+):
+    os.environ.setdefault(name, os.path.join(_state_dir, filename))
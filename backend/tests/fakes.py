@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.backfill import shift_timestamp, watermark_position
+
+
+def vector_row(rng, record_id, fields, columns, **values):
+    """A database row with random unit vectors for every field"""
+    row = {column: None for column in columns}
+    row.update(id=record_id, **values)
+    for field in fields:
+        vector = rng.normal(size=768)
+        row[f"{field}_vector"] = (vector / np.linalg.norm(vector)).tolist()
+    return row
+
+
+class Table:
+    """Rows of one table, read the way the backfill helpers page Supabase"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.full_reads = 0
+
+    def iter_pages(self, client, table, columns, page_size=500, after_id=None):
+        self.full_reads += 1
+        rows = sorted(
+            (row for row in self.rows if after_id is None or row["id"] > after_id), key=lambda row: row["id"]
+        )
+        for start in range(0, len(rows), page_size):
+            yield rows[start:start + page_size]
+
+    def latest_watermark(self, client, table):
+        if not self.rows:
+            return None
+        row = max(self.rows, key=watermark_position)
+        return [row["updated_at"], row["id"]]
+
+    def iter_changed(self, client, table, columns, watermark, page_size=500, overlap_seconds=0):
+        start = watermark_position(watermark) if watermark is not None else (-np.inf, "")
+        if watermark is not None and overlap_seconds:
+            start = (watermark_position([shift_timestamp(watermark[0], -overlap_seconds), ""])[0], "")
+        rows = sorted((row for row in self.rows if watermark_position(row) > start), key=watermark_position)
+        for offset in range(0, len(rows), page_size):
+            yield rows[offset:offset + page_size]
+
+    def put(self, row):
+        self.rows = [existing for existing in self.rows if existing["id"] != row["id"]] + [row]
+
+    def delete(self, record_id):
+        self.rows = [row for row in self.rows if row["id"] != record_id]
+
+
+class Supabase:
+    """Records PostgREST requests; inserts and updates return the rows they wrote"""
+
+    def __init__(self):
+        self.requests = []
+
+    def table(self, name):
+        return Request(self, name)
+
+
+class Request:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.values = None
+        self.filters = {}
+
+    def insert(self, values):
+        self.operation, self.values = "insert", values
+        return self
+
+    def update(self, values):
+        self.operation, self.values = "update", values
+        return self
+
+    def select(self, columns):
+        self.operation = "select"
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        self.client.requests.append(self)
+        if self.operation == "insert":
+            return SimpleNamespace(data=[{"id": "new-profile", **self.values}])
+        if self.operation == "update":
+            return SimpleNamespace(data=[{**self.filters, **self.values}])
+        return SimpleNamespace(data=[])
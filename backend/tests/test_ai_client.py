@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services.ai_client import AsyncAIClient
+
+
+def flaky(failures, error=google_exceptions.ResourceExhausted("quota exceeded")):
+    """A call that raises error for its first failures attempts"""
+    calls = []
+
+    async def call(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    return call, calls
+
+
+def test_retryable_errors_are_retried():
+    call, calls = flaky(2)
+    client = AsyncAIClient(max_retries=2, backoff=0)
+    assert asyncio.run(client._call(call, text="hi")) == "ok"
+    assert len(calls) == 3
+
+
+def test_retries_give_up_after_max_retries():
+    call, calls = flaky(5)
+    client = AsyncAIClient(max_retries=2, backoff=0)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        asyncio.run(client._call(call))
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried():
+    call, calls = flaky(1, ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncAIClient(backoff=0)._call(call))
+    assert len(calls) == 1
+
+
+def test_hung_calls_time_out():
+    async def hang():
+        await asyncio.sleep(10)
+
+    client = AsyncAIClient(timeout=0.01, max_retries=1, backoff=0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client._call(hang))
+
+
+def test_in_flight_calls_are_capped():
+    client = AsyncAIClient(max_in_flight=2)
+    running = []
+    peak = []
+
+    async def call():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def run_many():
+        await asyncio.gather(*(client._call(call) for _ in range(6)))
+
+    asyncio.run(run_many())
+    assert max(peak) == 2
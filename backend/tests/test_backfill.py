@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from app.services import backfill
+from app.services.backfill import Checkpoint, run_backfill
+from tests.fakes import Table
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = Table({"id": f"{i:03d}", "text": f"row {i}"} for i in range(10))
+    table.written = []
+    monkeypatch.setattr(backfill, "iter_pages", table.iter_pages)
+    monkeypatch.setattr(backfill, "write_updates", lambda client, name, updates: table.written.extend(updates))
+    return table
+
+
+def double(rows):
+    return [{"id": row["id"], "text": row["text"] * 2} for row in rows]
+
+
+def backfill_rows(table, build_updates, path, **kwargs):
+    return run_backfill(
+        None, "things", "id, text", build_updates, page_size=4, batch_size=2, workers=2,
+        requests_per_minute=0, checkpoint_path=str(path), backoff=0, **kwargs
+    )
+
+
+def test_run_updates_every_row_and_clears_its_checkpoint(table, tmp_path):
+    path = tmp_path / "checkpoint.json"
+    stats = backfill_rows(table, double, path)
+    assert stats["processed"] == 10 and stats["updated"] == 10
+    assert sorted(update["id"] for update in table.written) == [row["id"] for row in table.rows]
+    assert Checkpoint(str(path)).get("things") == {}
+
+
+def test_failing_batches_are_retried(table, tmp_path):
+    failures = {"003": 2}
+
+    def flaky(rows):
+        for row in rows:
+            if failures.get(row["id"]):
+                failures[row["id"]] -= 1
+                raise Exception("quota exceeded")
+        return double(rows)
+
+    stats = backfill_rows(table, flaky, tmp_path / "checkpoint.json", retries=2)
+    assert stats["updated"] == 10
+    assert failures == {"003": 0}
+
+
+def test_a_batch_that_keeps_failing_stops_before_its_page_is_checkpointed(table, tmp_path):
+    path = tmp_path / "checkpoint.json"
+    outage = {"on": True}
+
+    def down_from_row_6(rows):
+        if outage["on"] and any(row["id"] >= "006" for row in rows):
+            raise Exception("provider unavailable")
+        return double(rows)
+
+    with pytest.raises(Exception, match="rerun to resume"):
+        backfill_rows(table, down_from_row_6, path, retries=1)
+    # The first page (rows 0-3) finished; the second wrote its good batch but is not checkpointed
+    assert Checkpoint(str(path)).get("things") == {"last_id": "003", "processed": 4}
+    assert sorted(update["id"] for update in table.written) == ["000", "001", "002", "003", "004", "005"]
+
+    outage["on"] = False
+    table.written.clear()
+    stats = backfill_rows(table, down_from_row_6, path)
+    assert stats["processed"] == 6
+    assert sorted(update["id"] for update in table.written) == [f"{i:03d}" for i in range(4, 10)]
+    assert json.loads(path.read_text()) == {}
+
+
+def test_embedding_builders_raise_when_the_provider_fails(monkeypatch):
+    from app.services import embeddings
+
+    def unavailable(texts, task_type):
+        raise Exception("429 quota exceeded")
+
+    monkeypatch.setattr(embeddings.embedding_provider, "embed", unavailable)
+    profiles = [{"id": "p1", "role": "founder", "bio": "backfill provider outage test"}]
+    with pytest.raises(Exception, match="Embedding provider failed"):
+        embeddings.build_profile_embedding_updates(profiles)
@@ -0,0 +1,160 @@
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.cofounders import NeighborGraph
+from app.services.vector_index import PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, VectorIndex
+from tests.fakes import vector_row
+
+K = 8
+
+
+def profile_row(rng, i):
+    role = "founder" if i % 3 else "investor"
+    return vector_row(rng, str(uuid.UUID(int=i)), PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, role=role)
+
+
+@pytest.fixture
+def graph():
+    rng = np.random.default_rng(1)
+    index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS,
+        partition_by="role", mode="exact"
+    )
+    index.build([profile_row(rng, i) for i in range(200)])
+    graph = NeighborGraph(index, settings.COFOUNDER_FIELD_WEIGHTS, k=K)
+    graph.build()
+    return graph
+
+
+def brute_force(graph, profile_id, k=K, role=None):
+    """The exact top-k list of a profile, scored pair by pair"""
+    state = graph.index.state
+    fields = [graph.index.fields.index(field) for field in graph.weights]
+    weights = np.array(list(graph.weights.values()), dtype=np.float32)
+    own = state.vectors[state.positions[profile_id], fields]
+    scored = []
+    for other_id, position in state.positions.items():
+        if other_id != profile_id and role in (None, state.records[position]["role"]):
+            score = float(np.sum(weights * np.einsum("fd,fd->f", own, state.vectors[position, fields])))
+            scored.append((score, other_id))
+    return [other_id for _, other_id in sorted(scored, key=lambda entry: -entry[0])[:k]]
+
+
+def listed(graph, profile_id):
+    return [neighbor_id for _, neighbor_id in graph.neighbors(profile_id)]
+
+
+def assert_consistent(graph):
+    # The reverse map and thresholds match the stored lists, and every
+    # list, stored or rescanned on use, is exact
+    state = graph.index.state
+    for owner_id, entries in graph._neighbors.items():
+        for _, neighbor_id in entries:
+            assert owner_id in graph._reverse[neighbor_id]
+        assert graph._thresholds[state.positions[owner_id]] == pytest.approx(entries[-1][0])
+    for neighbor_id, owners in graph._reverse.items():
+        for owner_id in owners:
+            assert neighbor_id in {entry[1] for entry in graph._neighbors[owner_id]}
+    for owner_id in state.positions:
+        assert listed(graph, owner_id) == brute_force(graph, owner_id)
+
+
+def test_removed_profiles_leave_every_list(graph):
+    state = graph.index.state
+    gone = state.ids[:3]
+    holders = set().union(*(graph._reverse.get(profile_id, set()) for profile_id in gone))
+    assert holders
+
+    graph.index.remove(gone)
+    graph.remove(gone)
+
+    for profile_id in gone:
+        assert profile_id not in graph._neighbors
+        assert profile_id not in graph._reverse
+    # Full lists that lost an entry were forgotten and are rescanned on use
+    assert not holders & set(graph._neighbors)
+    for owner_id in graph.index.state.positions:
+        assert not set(gone) & set(listed(graph, owner_id))
+    assert_consistent(graph)
+
+
+def moved(rng, graph, profile_id):
+    """Give a profile new vectors in the index; return its vectors from before"""
+    previous = graph.field_vectors([profile_id])[profile_id]
+    row = profile_row(rng, uuid.UUID(profile_id).int)
+    graph.index.upsert([row])
+    return previous
+
+
+def test_update_keeps_every_list_exact(graph):
+    rng = np.random.default_rng(5)
+    ids = graph.index.state.ids
+    for profile_id in ids[:10]:
+        graph.update(profile_id, moved(rng, graph, profile_id))
+    assert_consistent(graph)
+
+
+def test_update_drops_full_lists_a_profile_falls_out_of(graph):
+    state = graph.index.state
+    owner_id, entries = next(iter(graph._neighbors.items()))
+    profile_id = entries[0][1]
+    previous = graph.field_vectors([profile_id])[profile_id]
+    # Point its vectors away from everyone it was close to
+    row = {column: state.records[state.positions[profile_id]][column] for column in PROFILE_RECORD_COLUMNS}
+    for field in PROFILE_FIELDS:
+        row[f"{field}_vector"] = (-state.vectors[state.positions[owner_id], PROFILE_FIELDS.index(field)]).tolist()
+    graph.index.upsert([row])
+    graph.update(profile_id, previous)
+
+    assert owner_id not in graph._neighbors
+    assert owner_id not in graph._reverse.get(profile_id, set())
+    assert graph._thresholds[state.positions[owner_id]] == np.inf
+    assert profile_id not in listed(graph, owner_id)
+    assert_consistent(graph)
+
+
+def test_update_of_a_new_profile_enters_the_lists_it_beats(graph):
+    rng = np.random.default_rng(6)
+    newcomer = profile_row(rng, 10_000)
+    graph.index.upsert([newcomer])
+    graph.update(newcomer["id"])
+    assert_consistent(graph)
+    assert graph._reverse.get(newcomer["id"]) == {
+        owner_id for owner_id in graph.index.state.positions if newcomer["id"] in listed(graph, owner_id)
+    }
+
+
+def test_update_with_unchanged_vectors_skips_the_rescan(graph, monkeypatch):
+    profile_id = graph.index.state.ids[0]
+    previous = graph.field_vectors([profile_id])[profile_id]
+    monkeypatch.setattr(graph, "_scores", lambda state, profile_id: pytest.fail("rescanned"))
+    graph.update(profile_id, previous)
+
+
+def test_search_goes_past_the_stored_list_and_filters_by_role(graph):
+    profile_id = graph.index.state.ids[4]
+    assert [neighbor_id for _, neighbor_id in graph.search(profile_id, 30)] == brute_force(graph, profile_id, 30)
+    investors = [neighbor_id for _, neighbor_id in graph.search(profile_id, 20, "Investor")]
+    assert investors == brute_force(graph, profile_id, 20, role="investor")
+
+
+def test_cofounder_route_falls_back_to_an_exact_search(graph, monkeypatch):
+    from app.api.models.profile import SearchQuery
+    from app.api.routes import search
+
+    monkeypatch.setattr(search, "cofounder_graph", graph)
+    monkeypatch.setattr(search, "profile_index", graph.index)
+    profile_id = graph.index.state.ids[4]
+
+    def run(**fields):
+        query = SearchQuery(query="", search_type="cofounder", profile_id=profile_id, **fields)
+        response = asyncio.run(search.run_cofounder_search(query, explain=False))
+        return [result["profile"]["id"] for result in response["results"]]
+
+    assert run(num_results=5) == brute_force(graph, profile_id, 5)
+    assert run(num_results=20) == brute_force(graph, profile_id, 20)
+    assert run(num_results=6, role_filter="investor") == brute_force(graph, profile_id, 6, role="investor")
@@ -0,0 +1,139 @@
+import asyncio
+import sqlite3
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+
+
+def vector(seed):
+    return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+
+def last_used(path):
+    with sqlite3.connect(path) as db:
+        return dict(db.execute("SELECT key, last_used FROM embeddings"))
+
+
+def test_entries_persist_across_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path).put_many([("a", vector(1)), ("b", vector(2))])
+
+    cache = EmbeddingCache(path)
+    found = cache.get_many(["a", "missing", "b"])
+    assert np.array_equal(found[0], vector(1)) and found[1] is None and np.array_equal(found[2], vector(2))
+    cache.get_many(["a"])
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["disk_hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["disk_entries"] == 2
+
+
+def test_hits_refresh_last_used_only_once_it_is_old(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    EmbeddingCache(path).put_many([("a", vector(1))])
+    written = last_used(path)["a"]
+
+    EmbeddingCache(path, touch_seconds=3600).get_many(["a"])
+    assert last_used(path)["a"] == written
+
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE embeddings SET last_used = last_used - 7200")
+    EmbeddingCache(path, touch_seconds=3600).get_many(["a"])
+    assert last_used(path)["a"] >= written
+
+
+def test_replacing_entries_does_not_count_towards_the_bound(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, disk_size=10)
+    items = [(str(i), vector(i)) for i in range(10)]
+    for _ in range(3):
+        cache.put_many(items)
+    assert cache.stats()["disk_entries"] == 10
+    assert len(last_used(path)) == 10
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, memory_size=1, disk_size=10, touch_seconds=0)
+    cache.put_many([(str(i), vector(i)) for i in range(10)])
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE embeddings SET last_used = last_used - 100")
+    cache.get_many(["0", "1", "2"])
+
+    cache.put_many([("new", vector(99))])
+    keys = set(last_used(path))
+    assert len(keys) == 9
+    assert {"0", "1", "2", "new"} <= keys
+    assert cache.stats()["disk_entries"] == 9
+
+
+def test_disk_errors_are_misses_not_exceptions(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many([("a", vector(1))])
+    cache._memory.clear()
+    cache._db.close()
+    assert cache.get_many(["a"]) == [None]
+    cache.put_many([("b", vector(2))])
+    assert np.array_equal(cache.get_many(["b"])[0], vector(2))
+
+
+class QueryEmbedder:
+    """Records each batch of queries it embeds; fails while failing is set"""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        await asyncio.sleep(0.01)
+        if self.failing:
+            return None
+        return np.stack([vector(len(text)) for text in texts])
+
+
+def test_queries_are_cached_by_normalized_text():
+    cache = QueryEmbeddingCache()
+    embed = QueryEmbedder()
+    first = asyncio.run(cache.get_or_embed_many(["ML  Engineer", "designer", "ml engineer"], embed))
+    assert embed.batches == [["ml engineer", "designer"]]
+    assert np.array_equal(first[0], first[2])
+
+    second = asyncio.run(cache.get_or_embed_many([" ml ENGINEER ", "founder"], embed))
+    assert embed.batches[-1] == ["founder"]
+    assert np.array_equal(second[0], first[0])
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_concurrent_misses_share_one_embedding_call():
+    cache = QueryEmbeddingCache()
+    embed = QueryEmbedder()
+
+    async def concurrent():
+        return await asyncio.gather(*(cache.get_or_embed_many(["ml engineer"], embed) for _ in range(5)))
+
+    results = asyncio.run(concurrent())
+    assert embed.batches == [["ml engineer"]]
+    assert cache.stats()["coalesced"] == 4
+    assert all(np.array_equal(result[0], results[0][0]) for result in results)
+
+
+def test_failed_embeddings_are_not_cached():
+    cache = QueryEmbeddingCache()
+    embed = QueryEmbedder()
+    embed.failing = True
+    assert asyncio.run(cache.get_or_embed_many(["designer"], embed)) == [None]
+    embed.failing = False
+    assert asyncio.run(cache.get_or_embed_many(["designer"], embed))[0] is not None
+    assert len(embed.batches) == 2
+
+
+def test_query_entries_expire_and_evict():
+    cache = QueryEmbeddingCache(size=2, ttl_seconds=0)
+    cache.put("a", vector(1))
+    assert cache.get("a") is None
+    cache = QueryEmbeddingCache(size=2)
+    for text in ("a", "b", "c"):
+        cache.put(text, vector(len(text)))
+    assert cache.get("a") is None and cache.recent(5) == ["c", "b"]
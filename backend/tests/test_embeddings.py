@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from app.services import embeddings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embeddings import (
+    ai_bio_input_hash,
+    ai_bio_is_current,
+    build_profile_ai_bio_updates,
+    build_profile_embedding_updates,
+    embed_records
+)
+from app.services.providers import HashingEmbeddingProvider
+
+
+class CountingProvider(HashingEmbeddingProvider):
+    """Offline provider recording the texts of every call"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed(self, texts, task_type):
+        self.calls.append(list(texts))
+        return super().embed(texts, task_type)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(embeddings, "embedding_provider", provider)
+    monkeypatch.setattr(embeddings, "embedding_cache", EmbeddingCache())
+    return provider
+
+
+def test_every_field_of_every_record_is_embedded_in_one_call(provider):
+    records = [
+        {"role_vector": "founder", "bio_vector": "builds robots"},
+        {"role_vector": "investor", "interests_vector": "climate fintech"},
+    ]
+    embedded = embed_records(records)
+
+    assert provider.calls == [["founder", "builds robots", "investor", "climate fintech"]]
+    assert set(embedded[0]) == {"role_vector", "role_hash", "bio_vector", "bio_hash"}
+    expected = provider.embed(["builds robots"], "retrieval_document")[0]
+    assert np.allclose(embedded[0]["bio_vector"], expected)
+
+
+def test_repeated_and_cached_texts_are_not_sent_again(provider):
+    embed_records([{"role_vector": "founder"}, {"role_vector": "founder", "bio_vector": "ships"}])
+    assert provider.calls == [["founder", "ships"]]
+    embed_records([{"role_vector": "founder", "bio_vector": "hires"}])
+    assert provider.calls[-1] == ["hires"]
+
+
+def test_a_failed_call_leaves_every_record_without_vectors(provider, monkeypatch):
+    def unavailable(texts, task_type):
+        raise Exception("quota exceeded")
+
+    monkeypatch.setattr(provider, "embed", unavailable)
+    records = [{"role_vector": "founder"}, {"bio_vector": "builds robots"}]
+    assert embed_records(records) == [{}, {}]
+    with pytest.raises(Exception):
+        embed_records(records, required=True)
+
+
+def stored_profile(**fields):
+    """A profile row as left by a previous embedding run"""
+    profile = {"id": "p1", "role": "founder", "bio": "builds robots", "interests": ["ai"], "education": None, **fields}
+    update, = build_profile_embedding_updates([profile])
+    return {**profile, **{column: value for column, value in update.items() if column.endswith("_hash")}}
+
+
+def test_unchanged_profiles_are_not_re_embedded(provider):
+    profile = stored_profile()
+    provider.calls.clear()
+    assert build_profile_embedding_updates([profile]) == []
+    assert provider.calls == []
+
+
+def test_only_fields_whose_text_changed_are_re_embedded(provider):
+    profile = {**stored_profile(), "bio": "builds drones"}
+    update, = build_profile_embedding_updates([profile])
+    assert provider.calls[-1] == ["builds drones"]
+    assert set(update) == {"id", "bio_vector", "bio_hash"}
+
+
+def test_cleared_fields_drop_their_vector_and_hash(provider):
+    profile = {**stored_profile(), "interests": []}
+    update, = build_profile_embedding_updates([profile])
+    assert update == {"id": "p1", "interests_vector": None, "interests_hash": None}
+
+
+def test_force_re_embeds_every_field(provider):
+    profile = stored_profile()
+    update, = build_profile_embedding_updates([profile], force=True)
+    assert {"role_vector", "bio_vector", "interests_vector"} <= set(update)
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Record the profiles sent to batched AI bio generation"""
+    batches = []
+
+    def generate_ai_bios(profiles):
+        batches.append([profile["id"] for profile in profiles])
+        return {str(profile["id"]): f"{profile['name']} is a {profile['role']}" for profile in profiles}
+
+    monkeypatch.setattr(embeddings, "generate_ai_bios", generate_ai_bios)
+    return batches
+
+
+def bio_profile(profile_id, **fields):
+    return {
+        "id": profile_id, "name": f"Person {profile_id}", "role": "founder", "bio": None,
+        "education": None, "interests": None, "linkedin_url": None, **fields
+    }
+
+
+def test_ai_bio_hash_tracks_prompt_inputs_only():
+    profile = bio_profile("p1")
+    current = {**profile, "ai_bio_input_hash": ai_bio_input_hash(profile)}
+    assert ai_bio_is_current(current)
+    assert ai_bio_is_current({**current, "ai_bio": "edited", "bio_hash": "x"})
+    assert not ai_bio_is_current({**current, "bio": "now has a bio"})
+
+
+def test_only_stale_ai_bios_are_generated_in_one_batch(provider, generated):
+    fresh = bio_profile("p1")
+    fresh["ai_bio_input_hash"] = ai_bio_input_hash(fresh)
+    stale = [bio_profile("p2"), bio_profile("p3", ai_bio_input_hash="outdated")]
+    updates = build_profile_ai_bio_updates([fresh] + stale)
+
+    assert generated == [["p2", "p3"]]
+    assert [update["id"] for update in updates] == ["p2", "p3"]
+    assert updates[0]["ai_bio"] == "Person p2 is a founder"
+    assert updates[0]["ai_bio_input_hash"] == ai_bio_input_hash(stale[0])
+    assert provider.calls == [["Person p2 is a founder", "Person p3 is a founder"]]
+    assert build_profile_ai_bio_updates([fresh]) == [] and generated[-1] == []
+    assert len(build_profile_ai_bio_updates([fresh], force=True)) == 1
+
+
+def test_a_failed_generation_fails_the_batch(provider, monkeypatch):
+    monkeypatch.setattr(embeddings, "generate_ai_bios", lambda profiles: {})
+    with pytest.raises(Exception):
+        build_profile_ai_bio_updates([bio_profile("p1")])
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.hybrid import hybrid_search_many, reciprocal_rank_fusion
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_index import COMPANY_FIELDS, COMPANY_RECORD_COLUMNS, VectorIndex
+
+
+def bm25(records, partition_by=None, max_df=1.0):
+    index = LexicalIndex(("name", "description"), partition_by=partition_by, max_df=max_df)
+    index.build(records)
+    return index
+
+
+def test_rarer_terms_rank_first():
+    index = bm25([
+        {"id": "a", "description": "python developer"},
+        {"id": "b", "description": "python developer"},
+        {"id": "c", "description": "rust developer"},
+    ])
+    assert [record_id for record_id, _ in index.search("python rust", 3)] == ["c", "a", "b"]
+
+
+def test_term_frequency_and_length_normalization():
+    index = bm25([
+        {"id": "a", "description": "robotics robotics startup"},
+        {"id": "b", "description": "robotics startup"},
+        {"id": "c", "description": "robotics startup in the bay area with a long description"},
+        {"id": "d", "description": "fintech"},
+    ])
+    ranked = [record_id for record_id, _ in index.search("robotics", 3)]
+    assert ranked == ["a", "b", "c"]
+
+
+def test_ties_are_broken_by_id_and_partitions_filter():
+    index = bm25([
+        {"id": "b", "role": "Engineer", "description": "climate"},
+        {"id": "a", "role": "Designer", "description": "climate"},
+        {"id": "c", "role": "engineer", "description": "climate"},
+    ], partition_by="role")
+    assert [record_id for record_id, _ in index.search("climate", 3)] == ["a", "b", "c"]
+    assert [record_id for record_id, _ in index.search("climate", 3, partition="engineer")] == ["b", "c"]
+
+
+def test_upsert_replaces_indexed_text():
+    index = bm25([{"id": "a", "description": "payments"}, {"id": "b", "description": "logistics"}])
+    index.upsert([{"id": "a", "description": "healthcare"}])
+    assert index.search("payments", 5) == []
+    assert [record_id for record_id, _ in index.search("healthcare", 5)] == ["a"]
+    assert len(index) == 2
+
+
+def test_removed_records_no_longer_match():
+    index = bm25([{"id": "a", "description": "payments"}, {"id": "b", "description": "payments"}])
+    index.remove(["a", "missing"])
+    assert [record_id for record_id, _ in index.search("payments", 5)] == ["b"]
+    assert len(index) == 1
+
+
+def test_common_terms_still_match():
+    records = [{"id": str(i), "description": "stanford alumni"} for i in range(6)]
+    records += [
+        {"id": "x", "description": "stanford robotics"},
+        {"id": "y", "description": "robotics lab"},
+        {"id": "z", "description": "fintech"},
+    ]
+    index = LexicalIndex(("name", "description"))
+    index.build(records)
+    stanford = [record_id for record_id, _ in index.search("stanford", 10)]
+    assert sorted(stanford) == ["0", "1", "2", "3", "4", "5", "x"]
+    # The rarer term still dominates a mixed query
+    assert [record_id for record_id, _ in index.search("stanford robotics", 3)] == ["x", "y", "0"]
+
+
+def test_terms_in_most_documents_are_skipped():
+    records = [{"id": str(i), "description": "startup"} for i in range(10)]
+    records.append({"id": "x", "description": "startup biotech"})
+    index = bm25(records, max_df=0.25)
+    assert index.search("startup", 5) == []
+    assert [record_id for record_id, _ in index.search("startup biotech", 5)] == ["x"]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert fused["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused["b"] == pytest.approx(1 / 62)
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert sorted(fused, key=lambda record_id: -fused[record_id]) == ["a", "c", "b"]
+
+
+def company_row(record_id, similarity, axis, description):
+    # Every field vector has the given cosine similarity to the first axis
+    vector = np.zeros(768)
+    vector[0] = similarity
+    vector[axis] = math.sqrt(1 - similarity ** 2)
+    row = {column: None for column in COMPANY_RECORD_COLUMNS}
+    row.update(id=record_id, name=record_id.upper(), description=description)
+    for field in COMPANY_FIELDS:
+        row[f"{field}_vector"] = vector.tolist()
+    return row
+
+
+def test_hybrid_search_fuses_both_rankings(monkeypatch):
+    monkeypatch.setattr(settings, "HYBRID_DEPTH", 2)
+    rows = [
+        company_row("a", 0.9, 1, "analytics platform"),
+        company_row("b", 0.8, 2, "analytics tools"),
+        company_row("c", 0.7, 3, "consulting"),
+        company_row("d", 0.1, 4, "quantum sensors"),
+    ]
+    index = VectorIndex("companyprofile", COMPANY_FIELDS, settings.COMPANY_FIELD_WEIGHTS, COMPANY_RECORD_COLUMNS)
+    index.build(rows)
+    lexical_index = bm25(rows)
+    query = np.zeros(768, dtype=np.float32)
+    query[0] = 1
+
+    results = hybrid_search_many(index, lexical_index, ["quantum"], query[np.newaxis], k=2)[0]
+
+    # a tops the vector ranking and d the lexical one; both get 1 / 61 and
+    # tie on id, while b (second by vector only) drops to third
+    assert [result["id"] for result in results] == ["a", "d"]
+    assert results[0]["relevance_score"] == pytest.approx(1 / (settings.HYBRID_RRF_K + 1))
+    assert results[0]["lexical_score"] == 0.0
+    # d was beyond the vector depth, so its vector score is looked up exactly
+    assert results[1]["combined_similarity"] == pytest.approx(0.1 * sum(settings.COMPANY_FIELD_WEIGHTS.values()))
+    assert results[1]["lexical_score"] > 0
@@ -0,0 +1,200 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import index_sync
+from app.services.cofounders import NeighborGraph
+from app.services.index_sync import ChangeFeed
+from app.services.lexical_index import PROFILE_TEXT_FIELDS, LexicalIndex
+from app.services.vector_index import PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, VectorIndex
+from tests.fakes import Table, vector_row
+
+rng = np.random.default_rng(2)
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def profile_row(i, seconds=0):
+    return vector_row(
+        rng, str(uuid.UUID(int=i)), PROFILE_FIELDS, PROFILE_RECORD_COLUMNS,
+        role="founder", bio=f"builds product {i}", updated_at=(EPOCH + timedelta(seconds=seconds)).isoformat()
+    )
+
+
+def profile_index_for(rows):
+    index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS,
+        partition_by="role", mode="exact"
+    )
+    index.build(rows)
+    return index
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    """Fresh profile indexes behind index_sync, built from a fake table"""
+    table = Table(profile_row(i, i) for i in range(50))
+    index = profile_index_for(table.rows)
+    lexical_index = LexicalIndex(PROFILE_TEXT_FIELDS, partition_by="role")
+    lexical_index.build(index.records())
+    graph = NeighborGraph(index, settings.COFOUNDER_FIELD_WEIGHTS, k=5)
+    graph.build()
+    monkeypatch.setattr(index_sync, "profile_index", index)
+    monkeypatch.setattr(index_sync, "profile_lexical_index", lexical_index)
+    monkeypatch.setattr(index_sync, "cofounder_graph", graph)
+    monkeypatch.setattr(index_sync, "iter_pages", table.iter_pages)
+    monkeypatch.setattr(index_sync, "iter_changed", table.iter_changed)
+    monkeypatch.setattr(index_sync, "latest_watermark", table.latest_watermark)
+    return table, index, lexical_index, graph
+
+
+def test_webhook_delete_drops_the_record_everywhere(profiles, monkeypatch):
+    table, index, lexical_index, graph = profiles
+    monkeypatch.setattr(settings, "SYNC_WEBHOOK_SECRET", "secret")
+    gone = next(neighbor_id for neighbor_id, owners in graph._reverse.items() if owners)
+
+    response = TestClient(app).post(
+        "/sync/webhook",
+        json={"type": "DELETE", "table": "personalprofile", "record": None, "old_record": {"id": gone}},
+        headers={"x-webhook-secret": "secret"}
+    )
+
+    assert response.json() == {"status": "applied"}
+    assert gone not in index.state.positions
+    assert lexical_index.search(str(uuid.UUID(gone).int), 5) == []
+    assert len(lexical_index) == len(table.rows) - 1
+    assert gone not in graph._reverse and gone not in graph._neighbors
+    for owner_id in index.state.positions:
+        assert gone not in {neighbor_id for _, neighbor_id in graph.neighbors(owner_id)}
+
+
+def test_sweep_drops_rows_deleted_from_the_table(profiles):
+    table, index, _, _ = profiles
+    removed = []
+
+    def on_delete(record_ids):
+        removed.extend(record_ids)
+        index.remove(record_ids)
+
+    feed = ChangeFeed(page_size=7, sweep_seconds=300)
+    feed.watch(index, lambda record_ids, rows: index.upsert(rows), on_delete=on_delete)
+    table.delete(table.rows[3]["id"])
+    gone = str(uuid.UUID(int=3))
+
+    # The first poll sweeps, so rows deleted before the watch are dropped
+    feed.poll()
+    assert removed == [gone]
+    assert gone not in index.state.positions
+
+    # Later deletes wait for the next sweep
+    table.delete(table.rows[10]["id"])
+    feed.poll()
+    assert removed == [gone]
+    feed._tables["personalprofile"]["swept_at"] -= 300
+    feed.poll()
+    assert removed == [gone, str(uuid.UUID(int=11))]
+
+
+def test_sweep_keeps_records_indexed_while_it_reads(profiles, monkeypatch):
+    table, index, _, _ = profiles
+    late = profile_row(1000, 1000)
+    read_pages = table.iter_pages
+
+    def pages_with_a_concurrent_insert(*args, **kwargs):
+        for page_number, rows in enumerate(read_pages(*args, **kwargs)):
+            if page_number == 1:
+                # Inserted and indexed by a route after the sweep read past its id
+                index.upsert([late])
+            yield rows
+
+    removed = []
+    monkeypatch.setattr(index_sync, "iter_pages", pages_with_a_concurrent_insert)
+    feed = ChangeFeed(page_size=7)
+    feed.watch(index, lambda record_ids, rows: None, on_delete=removed.extend)
+    assert feed.sweep("personalprofile") == 0
+    assert removed == []
+
+
+def watched(index, overlap_seconds=5):
+    """A feed following the index from its table's newest row, recording applied ids"""
+    applied = []
+
+    def on_change(record_ids, rows):
+        applied.append(sorted(str(record_id) for record_id in record_ids))
+        index.upsert(rows)
+
+    feed = ChangeFeed(page_size=7, overlap_seconds=overlap_seconds, sweep_seconds=0)
+    feed.watch(index, on_change)
+    feed.poll()
+    applied.clear()
+    return feed, applied
+
+
+def test_poll_skips_rows_redelivered_inside_the_overlap_window(profiles):
+    table, index, _, _ = profiles
+    feed, applied = watched(index)
+    assert feed.poll() == 0
+
+    table.put(profile_row(100, 60))
+    assert feed.poll() == 1
+    assert applied == [[str(uuid.UUID(int=100))]]
+    # Read again through the overlap, but already applied
+    assert feed.poll() == 0
+
+    # A newer version of an applied row is applied again
+    table.put(profile_row(100, 61))
+    assert feed.poll() == 1
+
+
+def test_poll_applies_late_commits_without_moving_the_watermark_back(profiles):
+    table, index, _, _ = profiles
+    feed, applied = watched(index)
+    table.put(profile_row(100, 60))
+    feed.poll()
+    watermark = feed.watermark("personalprofile")
+
+    # Committed after row 100 but stamped before it, within the overlap
+    table.put(profile_row(101, 57))
+    assert feed.poll() == 1
+    assert applied[-1] == [str(uuid.UUID(int=101))]
+    assert str(uuid.UUID(int=101)) in index.state.positions
+    assert feed.watermark("personalprofile") == watermark
+
+    table.put(profile_row(102, 80))
+    feed.poll()
+    assert feed.watermark("personalprofile") == [profile_row(102, 80)["updated_at"], str(uuid.UUID(int=102))]
+
+
+def test_poll_prunes_applied_rows_older_than_the_overlap_window(profiles):
+    table, index, _, _ = profiles
+    feed, _ = watched(index)
+    table.put(profile_row(100, 60))
+    table.put(profile_row(101, 200))
+    feed.poll()
+    assert set(feed._tables["personalprofile"]["applied"]) == {str(uuid.UUID(int=101))}
+
+
+def test_lag_grows_while_polls_fail(profiles, monkeypatch):
+    table, index, _, _ = profiles
+    feed, _ = watched(index)
+    synced_at = feed._tables["personalprofile"]["synced_at"]
+    lag = feed.lag("personalprofile")
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("database unreachable")
+        yield
+
+    monkeypatch.setattr(index_sync, "iter_changed", unreachable)
+    with pytest.raises(ConnectionError):
+        feed.poll()
+    assert feed._tables["personalprofile"]["synced_at"] == synced_at
+    assert feed.lag("personalprofile") >= lag
+
+    monkeypatch.setattr(index_sync, "iter_changed", table.iter_changed)
+    feed.poll()
+    assert feed._tables["personalprofile"]["synced_at"] > synced_at
+    assert feed.lag("personalprofile") < 1
@@ -0,0 +1,98 @@
+import time
+
+from app.services.jobs import JobQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), workers=0, **kwargs)
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.2)
+    job_id = queue.enqueue("noop", {})
+
+    # A worker claims the job and dies without finishing it
+    job = queue._claim()
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert queue._claim() is None
+    assert queue.get(job_id)["status"] == "running"
+
+    time.sleep(0.3)
+    job = queue._claim()
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+
+def test_failed_job_is_retried_then_succeeds(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=3)
+    calls = []
+
+    def flaky(payload, report):
+        calls.append(payload)
+        report({"step": len(calls)})
+        if len(calls) == 1:
+            raise Exception("provider unavailable")
+        return {"value": payload["value"] * 2}
+
+    queue.register("flaky", flaky)
+    job_id = queue.enqueue("flaky", {"value": 21})
+
+    queue._run(queue._claim())
+    job = queue.get(job_id)
+    assert job["status"] == "queued"
+    assert job["error"] == "provider unavailable"
+
+    queue._run(queue._claim())
+    job = queue.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"value": 42}
+    assert job["progress"] == {"step": 2}
+    assert job["error"] is None
+    assert job["attempts"] == 2
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+
+    def broken(payload, report):
+        raise Exception("bad payload")
+
+    queue.register("broken", broken)
+    job_id = queue.enqueue("broken", {})
+    for _ in range(2):
+        queue._run(queue._claim())
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
+    assert queue._claim() is None
+
+
+def test_workers_run_queued_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), workers=2, poll_interval=0.05)
+    queue.register("echo", lambda payload, report: payload)
+    job_ids = [queue.enqueue("echo", {"n": n}) for n in range(5)]
+    queue.start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and any(queue.get(job_id)["status"] != "done" for job_id in job_ids):
+            time.sleep(0.02)
+    finally:
+        queue.stop()
+    assert [queue.get(job_id)["result"] for job_id in job_ids] == [{"n": n} for n in range(5)]
+
+
+def test_job_whose_lease_keeps_expiring_is_failed(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05, max_attempts=2)
+    job_id = queue.enqueue("poison", {})
+
+    # Each worker that claims it crashes before reporting back
+    for attempt in (1, 2):
+        assert queue._claim()["attempts"] == attempt
+        time.sleep(0.1)
+
+    assert queue._claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
+    assert "Lease expired" in job["error"]
@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.metrics import Gauge, Histogram, sampled_debug, search_stage_seconds, stage
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "embed")
+    assert histogram.snapshot() == {("embed",): ([1, 2], pytest.approx(5.55), 3)}
+    lines = histogram.render().splitlines()
+    assert 'latency_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="embed"} 3' in lines
+
+
+def test_stage_times_the_block_even_when_it_raises():
+    before = search_stage_seconds.snapshot().get(("test-stage", "profile"), ([], 0.0, 0))[2]
+    with stage("test-stage", "profile"):
+        pass
+    with pytest.raises(ValueError):
+        with stage("test-stage", "profile"):
+            raise ValueError("failed")
+    assert search_stage_seconds.snapshot()[("test-stage", "profile")][2] == before + 2
+
+
+def test_gauges_render_set_incremented_and_tracked_values():
+    gauge = Gauge("rows_total", "Rows", ("table",), counter=True)
+    gauge.inc(2, "a")
+    gauge.inc(3, "a")
+    lag = [1.5]
+    gauge.track(lambda: lag[0], "b")
+    lag[0] = 4.0
+    assert gauge.get("a") == 5 and gauge.get("b") == 4.0
+    assert gauge.render().splitlines() == [
+        "# HELP rows_total Rows", "# TYPE rows_total counter", 'rows_total{table="a"} 5', 'rows_total{table="b"} 4.0'
+    ]
+
+
+def test_debug_logs_are_sampled(monkeypatch, caplog):
+    logger = logging.getLogger("tests.metrics")
+    caplog.set_level(logging.DEBUG, logger="tests.metrics")
+    monkeypatch.setattr(settings, "DEBUG_LOG_SAMPLE_RATE", 0.0)
+    sampled_debug(logger, "dropped %d", 1)
+    monkeypatch.setattr(settings, "DEBUG_LOG_SAMPLE_RATE", 1.0)
+    sampled_debug(logger, "kept %d", 2)
+    assert [record.getMessage() for record in caplog.records] == ["kept 2"]
+
+
+def test_metrics_endpoint_exports_search_stages():
+    with stage("embed", "profile"):
+        pass
+    body = TestClient(app).get("/metrics").text
+    assert "# TYPE search_stage_seconds histogram" in body
+    assert 'search_stage_seconds_count{stage="embed",search_type="profile"}' in body
+    assert "# TYPE index_sync_rows_total counter" in body
@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import profiles
+from app.main import app
+from app.services import embeddings, jobs
+from tests.fakes import Supabase
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    client = Supabase()
+    monkeypatch.setattr(profiles, "supabase", client)
+    monkeypatch.setattr(embeddings, "supabase", client)
+    return client
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    payloads = []
+
+    def enqueue(job_type, payload):
+        payloads.append((job_type, payload))
+        return "job-1"
+
+    monkeypatch.setattr(profiles.job_queue, "enqueue", enqueue)
+    return payloads
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    """Rows handed to the indexes, by the route and by the job"""
+    rows = []
+
+    def record(profile_ids, changed=None, broadcast=True):
+        rows.extend(changed or [])
+
+    monkeypatch.setattr(profiles, "profiles_changed", record)
+    monkeypatch.setattr(jobs, "profiles_changed", record)
+    return rows
+
+
+def new_profile():
+    return {
+        "name": "Ada", "email": "ada@example.com", "phone": None, "bio": "Builds robots", "role": "founder",
+        "linkedin_url": None, "education": "MIT", "company_id": None, "interests": ["robotics", "ai"]
+    }
+
+
+def test_a_new_profile_is_written_with_its_vectors_in_one_insert(supabase, enqueued, applied):
+    response = TestClient(app).post("/profiles/", json=new_profile())
+    assert response.status_code == 200
+    assert response.json()["job_id"] == "job-1"
+
+    insert, = supabase.requests
+    assert insert.operation == "insert"
+    for field in ("role", "bio", "interests", "education"):
+        assert insert.values[f"{field}_vector"].startswith("[")
+        assert insert.values[f"{field}_hash"]
+    assert [row["id"] for row in applied] == ["new-profile"]
+
+    job_type, payload = enqueued[0]
+    assert job_type == "profile_enrichment"
+    assert payload["profile_id"] == "new-profile"
+    assert payload["profile"]["bio_hash"] == insert.values["bio_hash"]
+    assert not any(column.endswith("_vector") for column in payload["profile"])
+
+
+def test_enrichment_writes_the_ai_bio_in_one_update_without_reading_the_row(supabase, enqueued, applied, monkeypatch):
+    TestClient(app).post("/profiles/", json=new_profile())
+    _, payload = enqueued[0]
+    monkeypatch.setattr(embeddings, "generate_ai_bio", lambda profile: f"{profile['name']} builds robots.")
+    supabase.requests.clear()
+    applied.clear()
+
+    result = jobs.run_profile_enrichment(payload, lambda progress: None)
+
+    update, = supabase.requests
+    assert update.operation == "update" and update.filters == {"id": "new-profile"}
+    # The fields embedded at insert are not embedded again
+    assert set(update.values) == {"ai_bio", "ai_bio_input_hash", "ai_bio_vector", "ai_bio_hash"}
+    assert result == {"embeddings": ["ai_bio_hash", "ai_bio_vector"], "ai_bio": "Ada builds robots."}
+    assert applied[0]["ai_bio"] == "Ada builds robots."
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from app.services.providers import HashingEmbeddingProvider, get_embedding_provider
+from app.services.vectors import EMBEDDING_DIM
+
+
+def test_hashing_provider_is_deterministic_and_normalized():
+    texts = ["Machine learning founder", "climate investor", ""]
+    first = HashingEmbeddingProvider().embed(texts, "retrieval_document")
+    second = HashingEmbeddingProvider().embed(texts, "retrieval_query")
+    assert first.dtype == np.float32 and first.shape == (3, EMBEDDING_DIM)
+    assert np.array_equal(first, second)
+    assert np.allclose(np.linalg.norm(first[:2], axis=1), 1.0)
+    assert not first[2].any()
+
+
+def test_hashing_provider_scores_shared_vocabulary_higher():
+    provider = HashingEmbeddingProvider()
+    query, related, unrelated = provider.embed(
+        ["machine learning engineer", "engineer building machine learning systems", "pastry chef in lyon"],
+        "retrieval_document"
+    )
+    assert query @ related > query @ unrelated
+
+
+def test_unknown_providers_are_rejected():
+    assert isinstance(get_embedding_provider("hashing"), HashingEmbeddingProvider)
+    with pytest.raises(ValueError):
+        get_embedding_provider("word2vec")
@@ -0,0 +1,40 @@
+import numpy as np
+
+from app.services.scoring import combine, field_query_scores, field_scores, top_k, weight_vector, weighted_matrix
+
+rng = np.random.default_rng(4)
+FIELDS = ("role", "bio", "interests")
+
+
+def corpus(n=50, dim=16):
+    vectors = rng.normal(size=(n, len(FIELDS), dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def test_batched_scores_match_a_loop_over_records_fields_and_queries():
+    vectors = corpus()
+    queries = rng.normal(size=(4, 16)).astype(np.float32)
+    weights = weight_vector(FIELDS, {"bio": 0.6, "role": 0.4, "unknown": 1.0})
+    assert weights.tolist() == [np.float32(0.4), np.float32(0.6), 0.0]
+
+    expected = np.array([
+        [sum(weights[f] * float(vectors[n, f] @ query) for f in range(len(FIELDS))) for query in queries]
+        for n in range(len(vectors))
+    ])
+    assert np.allclose(combine(field_scores(vectors, queries), weights), expected, atol=1e-5)
+    assert np.allclose(weighted_matrix(vectors, weights) @ queries.T, expected, atol=1e-5)
+
+
+def test_field_query_scores_use_one_query_per_field():
+    vectors = corpus()
+    field_queries = rng.normal(size=(len(FIELDS), 16)).astype(np.float32)
+    weights = np.array([0.5, 0.0, 2.0], dtype=np.float32)
+    expected = 0.5 * vectors[:, 0] @ field_queries[0] + 2.0 * vectors[:, 2] @ field_queries[2]
+    assert np.allclose(field_query_scores(vectors, field_queries, weights), expected, atol=1e-5)
+
+
+def test_top_k_returns_the_highest_scores_in_order():
+    scores = np.array([0.1, 0.9, 0.4, 0.8, 0.7], dtype=np.float32)
+    assert top_k(scores, 3).tolist() == [1, 3, 4]
+    assert top_k(scores, 10).tolist() == [1, 3, 4, 2, 0]
+    assert top_k(scores, 0).tolist() == []
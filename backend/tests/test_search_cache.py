@@ -0,0 +1,125 @@
+import uuid
+from functools import partial
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import index_sync
+from app.services.cofounders import NeighborGraph
+from app.services.index_sync import ChangeFeed
+from app.services.lexical_index import COMPANY_TEXT_FIELDS, PROFILE_TEXT_FIELDS, LexicalIndex
+from app.services.search_cache import SearchResultCache
+from app.services.vector_index import (
+    COMPANY_FIELDS,
+    COMPANY_RECORD_COLUMNS,
+    PROFILE_FIELDS,
+    PROFILE_RECORD_COLUMNS,
+    VectorIndex
+)
+from tests.fakes import Table, vector_row
+
+rng = np.random.default_rng(3)
+
+
+def shared_caches(tmp_path, count=2):
+    path = str(tmp_path / "generations.sqlite3")
+    return [SearchResultCache(path, refresh_seconds=0) for _ in range(count)]
+
+
+def cached(cache, corpus, key="q"):
+    value, generation = cache.get(corpus, key)
+    if value is None:
+        cache.put(corpus, key, generation, f"{corpus} results")
+    return value
+
+
+def test_invalidation_reaches_every_process_sharing_the_file(tmp_path):
+    first, second = shared_caches(tmp_path)
+    for cache in (first, second):
+        cached(cache, "profile")
+        cached(cache, "company")
+    first.invalidate("profile")
+    assert cached(second, "profile") is None
+    assert cached(second, "company") == "company results"
+
+
+def test_local_invalidation_leaves_other_processes_alone(tmp_path):
+    first, second = shared_caches(tmp_path)
+    for cache in (first, second):
+        cached(cache, "profile")
+    first.invalidate("profile", broadcast=False)
+    assert cached(first, "profile") is None
+    assert cached(second, "profile") == "profile results"
+
+
+def test_results_computed_across_an_invalidation_are_not_served(tmp_path):
+    cache = shared_caches(tmp_path, 1)[0]
+    for broadcast in (True, False):
+        _, generation = cache.get("profile", "q")
+        cache.invalidate("profile", broadcast)
+        cache.put("profile", "q", generation, "computed from the old index")
+        assert cache.get("profile", "q")[0] is None
+
+
+@pytest.fixture
+def indexes(tmp_path, monkeypatch):
+    """Fresh indexes and result cache behind index_sync"""
+    profiles = Table(
+        vector_row(rng, str(uuid.UUID(int=i)), PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, role="founder",
+                   updated_at=f"2026-01-01T00:00:{i:02d}+00:00")
+        for i in range(20)
+    )
+    profile_index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS, partition_by="role"
+    )
+    profile_index.build(profiles.rows)
+    company_index = VectorIndex("companyprofile", COMPANY_FIELDS, settings.COMPANY_FIELD_WEIGHTS, COMPANY_RECORD_COLUMNS)
+    company_index.build([vector_row(rng, "c1", COMPANY_FIELDS, COMPANY_RECORD_COLUMNS)])
+    worker, other_worker = shared_caches(tmp_path)
+    monkeypatch.setattr(index_sync, "profile_index", profile_index)
+    monkeypatch.setattr(index_sync, "company_index", company_index)
+    monkeypatch.setattr(index_sync, "profile_lexical_index", LexicalIndex(PROFILE_TEXT_FIELDS))
+    monkeypatch.setattr(index_sync, "company_lexical_index", LexicalIndex(COMPANY_TEXT_FIELDS))
+    monkeypatch.setattr(index_sync, "cofounder_graph", NeighborGraph(profile_index, settings.COFOUNDER_FIELD_WEIGHTS, k=5))
+    monkeypatch.setattr(index_sync, "search_cache", worker)
+    monkeypatch.setattr(index_sync, "iter_changed", profiles.iter_changed)
+    monkeypatch.setattr(index_sync, "latest_watermark", profiles.latest_watermark)
+    return profiles, profile_index, worker, other_worker
+
+
+def test_profile_writes_invalidate_cached_profile_results(indexes):
+    profiles, _, worker, other_worker = indexes
+    for cache in (worker, other_worker):
+        cached(cache, "profile")
+        cached(cache, "company")
+    index_sync.profiles_changed([profiles.rows[0]["id"]], [profiles.rows[0]])
+    for cache in (worker, other_worker):
+        assert cached(cache, "profile") is None
+        assert cached(cache, "company") == "company results"
+
+
+def test_company_writes_invalidate_cached_company_results(indexes):
+    _, _, worker, _ = indexes
+    cached(worker, "profile")
+    cached(worker, "company")
+    index_sync.companies_changed(["c1"], [vector_row(rng, "c1", COMPANY_FIELDS, COMPANY_RECORD_COLUMNS)])
+    assert cached(worker, "company") is None
+    assert cached(worker, "profile") == "profile results"
+
+
+def test_changes_read_from_the_feed_bump_the_shared_generation_once_per_write(indexes):
+    profiles, profile_index, worker, other_worker = indexes
+    feed = ChangeFeed()
+    feed.watch(profile_index, partial(index_sync.profiles_changed, broadcast=False))
+    cached(worker, "profile")
+    cached(other_worker, "profile")
+    shared = worker.generation("profile")[0]
+
+    changed = dict(profiles.rows[4], updated_at="2026-01-01T00:01:00+00:00")
+    profiles.put(changed)
+    feed.poll()
+    # This worker dropped its own results; the other applies the change with its own feed
+    assert cached(worker, "profile") is None
+    assert cached(other_worker, "profile") == "profile results"
+    assert worker.generation("profile")[0] == shared
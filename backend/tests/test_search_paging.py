@@ -0,0 +1,68 @@
+from app.api.models.profile import SearchQuery
+from app.api.routes.search import paginate, rank_candidates
+
+
+def candidate(record_id, score):
+    return {"profile": {"id": record_id}, "relevance_score": score}
+
+
+def page(candidates, cursor=None, page_size=2):
+    query = SearchQuery(query="engineer", search_type="profile", page_size=page_size, cursor=cursor)
+    return paginate(rank_candidates(candidates), query)
+
+
+def ids(response):
+    return [result["profile"]["id"] for result in response["results"]]
+
+
+def test_pages_cover_every_candidate_once():
+    candidates = [candidate(f"p{i}", score) for i, score in enumerate([0.9, 0.7, 0.7, 0.7, 0.5, 0.3, 0.1])]
+    seen = []
+    cursor = None
+    while True:
+        response = page(candidates, cursor, page_size=3)
+        seen.extend(ids(response))
+        cursor = response["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["p0", "p1", "p2", "p3", "p4", "p5", "p6"]
+
+
+def test_ties_are_broken_by_id():
+    candidates = [candidate("c", 0.5), candidate("a", 0.5), candidate("b", 0.5)]
+    first = page(candidates)
+    assert ids(first) == ["a", "b"]
+    assert ids(page(candidates, first["next_cursor"])) == ["c"]
+
+
+def test_cursor_survives_a_recomputed_candidate_list():
+    candidates = [candidate(f"p{i}", score) for i, score in enumerate([0.9, 0.8, 0.7, 0.6, 0.5])]
+    first = page(candidates)
+    assert ids(first) == ["p0", "p1"]
+
+    # Between pages a record ranking above the cursor was added and one of
+    # the already-returned records dropped out of the results
+    recomputed = [c for c in candidates if c["profile"]["id"] != "p0"] + [candidate("new", 0.95)]
+    second = page(recomputed, first["next_cursor"])
+    assert ids(second) == ["p2", "p3"]
+
+    # A record inserted below the cursor is still served on a later page
+    recomputed.append(candidate("late", 0.55))
+    third = page(recomputed, second["next_cursor"])
+    assert ids(third) == ["late", "p4"]
+    assert third["next_cursor"] is None
+
+
+def test_cursor_past_a_removed_record_resumes_after_it():
+    candidates = [candidate(f"p{i}", score) for i, score in enumerate([0.9, 0.8, 0.7, 0.6])]
+    first = page(candidates)
+    recomputed = [c for c in candidates if c["profile"]["id"] != "p1"]
+    assert ids(page(recomputed, first["next_cursor"])) == ["p2", "p3"]
+
+
+def test_null_num_results_uses_the_default():
+    query = SearchQuery(query="engineer", search_type="profile", num_results=None)
+    assert query.num_results == 5
+    candidates = [candidate(f"p{i}", 1 - i / 10) for i in range(7)]
+    response = paginate(rank_candidates(candidates), query)
+    assert ids(response) == ["p0", "p1", "p2", "p3", "p4"]
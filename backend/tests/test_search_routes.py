@@ -0,0 +1,114 @@
+import json
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import search
+from app.core.config import settings
+from app.main import app
+from app.services import embeddings
+from app.services.embedding_cache import QueryEmbeddingCache
+from app.services.providers import HashingEmbeddingProvider
+from app.services.search_cache import SearchResultCache
+from app.services.vector_index import PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, VectorIndex
+from tests.fakes import vector_row
+
+rng = np.random.default_rng(5)
+ROLES = ("founder", "investor", "engineer")
+
+
+class CountingProvider(HashingEmbeddingProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed(self, texts, task_type):
+        self.calls.append((list(texts), task_type))
+        return super().embed(texts, task_type)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client searching a small exact profile index with offline embeddings"""
+    index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS,
+        partition_by="role", mode="exact"
+    )
+    index.build([
+        vector_row(
+            rng, str(uuid.UUID(int=i)), PROFILE_FIELDS, PROFILE_RECORD_COLUMNS,
+            name=f"Profile {i}", role=ROLES[i % 3], interests=[]
+        )
+        for i in range(60)
+    ])
+    provider = CountingProvider()
+    monkeypatch.setattr(search, "profile_index", index)
+    monkeypatch.setattr(search, "search_cache", SearchResultCache())
+    monkeypatch.setattr(search, "generate_match_explanation", lambda query, result: f"{query} / {result['id']}")
+    monkeypatch.setattr(settings, "SEARCH_HYBRID", False)
+    monkeypatch.setattr(embeddings, "embedding_provider", provider)
+    monkeypatch.setattr(embeddings, "query_embedding_cache", QueryEmbeddingCache())
+    client = TestClient(app)
+    client.provider = provider
+    return client
+
+
+def profile_query(text, **fields):
+    return {"query": text, "search_type": "profile", **fields}
+
+
+def result_ids(response):
+    return [result["profile"]["id"] for result in response["results"]]
+
+
+def test_batch_embeds_every_query_once_and_matches_single_searches(client):
+    queries = [
+        profile_query("robotics founder", num_results=4),
+        profile_query("climate investor", num_results=3, role_filter="investor"),
+        profile_query("robotics founder", num_results=4, field_weights={"bio": 1.0}),
+        profile_query("too many", num_results=settings.SEARCH_MAX_RESULTS + 1),
+    ]
+    batch = client.post("/search/batch", json=queries).json()["results"]
+    assert client.provider.calls == [(["robotics founder", "climate investor"], "retrieval_query")]
+
+    assert batch[3] == {"error": f"num_results cannot exceed {settings.SEARCH_MAX_RESULTS}"}
+    for query, response in zip(queries[:3], batch):
+        single = client.post("/search/", json=query).json()
+        assert result_ids(response) == result_ids(single)
+        assert [result["match_explanation"] for result in response["results"]] == \
+            [result["match_explanation"] for result in single["results"]]
+    assert len(batch[0]["results"]) == 4
+    assert {result["profile"]["role"] for result in batch[1]["results"]} == {"investor"}
+    assert result_ids(batch[0]) != result_ids(batch[2])
+
+
+def test_batch_size_is_capped(client, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_BATCH_MAX_QUERIES", 2)
+    response = client.post("/search/batch", json=[profile_query("a"), profile_query("b"), profile_query("c")])
+    assert response.status_code == 400
+
+
+def test_stream_sends_every_hit_before_any_explanation(client):
+    query = profile_query("robotics founder", page_size=3, num_results=10)
+    response = client.post("/search/stream", json=query)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [event["event"] for event in events] == ["hit"] * 3 + ["explanation"] * 3 + ["done"]
+    assert all("match_explanation" not in event["data"] for event in events[:3])
+    page = client.post("/search/", json=query).json()
+    assert [event["data"]["profile"]["id"] for event in events[:3]] == result_ids(page)
+    assert [event["data"]["match_explanation"] for event in events[3:6]] == \
+        [result["match_explanation"] for result in page["results"]]
+    assert events[-1]["data"] == {"next_cursor": page["next_cursor"], "total": page["total"]}
+
+
+def test_stream_frames_server_sent_events(client):
+    response = client.post("/search/stream?format=sse", json=profile_query("robotics", num_results=2))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = response.text.split("\n\n")[:-1]
+    assert [frame.splitlines()[0] for frame in frames] == ["event: hit"] * 2 + ["event: explanation"] * 2 + ["event: done"]
+    assert json.loads(frames[0].splitlines()[1][len("data: "):])["rank"] == 1
+    assert client.post("/search/stream?format=xml", json=profile_query("robotics")).status_code == 400
@@ -0,0 +1,184 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.vector_index import MIN_ANN_ROWS, PROFILE_FIELDS, PROFILE_RECORD_COLUMNS, VectorIndex
+
+rng = np.random.default_rng(0)
+
+
+def profile_row(i, role):
+    row = {column: None for column in PROFILE_RECORD_COLUMNS}
+    row.update(id=str(uuid.UUID(int=i)), name=f"Profile {i}", role=role, interests=[])
+    for field in PROFILE_FIELDS:
+        vector = rng.normal(size=768)
+        row[f"{field}_vector"] = (vector / np.linalg.norm(vector)).tolist()
+    return row
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return [profile_row(i, "engineer" if i % 2 else "designer") for i in range(2 * MIN_ANN_ROWS)]
+
+
+def build_index(rows, mode):
+    index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS,
+        partition_by="role", mode=mode
+    )
+    index.build(rows)
+    return index
+
+
+def search_ids(index, row, k=5, role_filter=None):
+    query = np.asarray(row["bio_vector"], dtype=np.float32)
+    return [result["id"] for result in index.search(query, k, role_filter=role_filter)]
+
+
+@pytest.mark.parametrize("mode", ["hnsw", "int8"])
+def test_upsert_moves_a_record_between_partitions(rows, mode):
+    index = build_index(rows, mode)
+    assert set(index.state.ann) == {"engineer", "designer"}
+    assert len(index.state.unindexed) == 0
+
+    moved = dict(rows[1], role="Designer")
+    position = index.state.positions[moved["id"]]
+    index.upsert([moved])
+    state = index.state
+
+    assert position in state.stale
+    assert position in state.unindexed
+    assert position not in state.partitions["engineer"]
+    assert position in state.partitions["designer"]
+    assert index.partition_sizes() == {"engineer": MIN_ANN_ROWS - 1, "designer": MIN_ANN_ROWS + 1}
+
+    # The engineer ANN structure still holds the old vectors; the stale
+    # row must not come back from it, and is found exactly in its new partition
+    assert moved["id"] not in search_ids(index, moved, role_filter="engineer")
+    assert search_ids(index, moved, role_filter="designer")[0] == moved["id"]
+    assert search_ids(index, moved).count(moved["id"]) == 1
+
+
+@pytest.mark.parametrize("mode", ["hnsw", "int8"])
+def test_changed_vectors_are_scored_exactly_until_rebuilt(rows, mode):
+    index = build_index(rows, mode)
+    changed = profile_row(10_000, "designer")
+    changed["id"] = rows[0]["id"]
+    added = profile_row(10_001, "designer")
+    index.upsert([changed, added])
+    state = index.state
+    assert state.positions[changed["id"]] in state.stale
+    assert set(state.unindexed.tolist()) == {state.positions[changed["id"]], state.positions[added["id"]]}
+    assert search_ids(index, changed, role_filter="designer")[0] == changed["id"]
+    assert search_ids(index, added, role_filter="designer")[0] == added["id"]
+
+    index._rebuild()
+    state = index.state
+    assert not state.stale
+    assert len(state.unindexed) == 0
+    assert search_ids(index, changed, role_filter="designer")[0] == changed["id"]
+    assert search_ids(index, added)[0] == added["id"]
+
+
+@pytest.mark.parametrize("mode", ["hnsw", "int8", "exact"])
+def test_removed_records_are_never_returned(rows, mode):
+    index = build_index(rows, mode)
+    gone = [rows[1], rows[2]]
+    assert index.remove([row["id"] for row in gone] + [str(uuid.UUID(int=99_999))]) == 2
+    assert index.remove([rows[1]["id"]]) == 0
+    assert len(index) == len(rows) - 2
+    assert index.partition_sizes() == {"engineer": MIN_ANN_ROWS - 1, "designer": MIN_ANN_ROWS - 1}
+    assert len(index.records()) == len(rows) - 2
+    if mode != "exact":
+        assert len(index.state.unindexed) == 0
+
+    def assert_gone():
+        for row in gone:
+            query = np.asarray(row["bio_vector"], dtype=np.float32)
+            assert row["id"] not in search_ids(index, row, k=20)
+            assert row["id"] not in search_ids(index, row, k=20, role_filter=row["role"])
+            assert index.lookup([row["id"]], query) == []
+
+    assert_gone()
+    if mode != "exact":
+        index._rebuild()
+        assert_gone()
+
+    # A deleted id written again comes back as a new record
+    index.upsert([gone[0]])
+    assert search_ids(index, gone[0], role_filter="engineer")[0] == gone[0]["id"]
+    assert len(index) == len(rows) - 1
+
+
+def test_searches_return_fewer_than_k_once_records_are_removed():
+    index = VectorIndex(
+        "personalprofile", PROFILE_FIELDS, settings.PROFILE_FIELD_WEIGHTS, PROFILE_RECORD_COLUMNS, mode="exact"
+    )
+    small = [profile_row(20_000 + i, "engineer") for i in range(3)]
+    index.build(small)
+    index.remove([small[0]["id"]])
+    assert sorted(search_ids(index, small[1], k=5)) == sorted(row["id"] for row in small[1:])
+
+
+def brute_force(rows, query, weights, k, role=None):
+    """Reference ranking: sum of weight * cosine similarity per field, computed row by row"""
+    scored = []
+    for row in rows:
+        if role is not None and row["role"] != role:
+            continue
+        score = sum(
+            weight * float(np.dot(np.asarray(row[f"{field}_vector"], dtype=np.float32), query))
+            for field, weight in weights.items()
+        )
+        scored.append((score, row["id"]))
+    scored.sort(key=lambda match: -match[0])
+    return scored[:k]
+
+
+@pytest.mark.parametrize("weights", [None, {"bio": 1.0, "role": 0.5}])
+def test_exact_search_matches_the_weighted_field_similarity(rows, weights):
+    index = build_index(rows[:300], "exact")
+    query = rng.normal(size=768).astype(np.float32)
+    query /= np.linalg.norm(query)
+    expected = brute_force(rows[:300], query, weights or settings.PROFILE_FIELD_WEIGHTS, 10)
+
+    results = index.search(query, 10, weights=weights)
+    assert [result["id"] for result in results] == [record_id for _, record_id in expected]
+    assert np.allclose([result["combined_similarity"] for result in results], [score for score, _ in expected], atol=1e-4)
+    bio = np.asarray(rows[:300][index.state.positions[results[0]["id"]]]["bio_vector"], dtype=np.float32)
+    assert results[0]["bio_similarity"] == pytest.approx(float(bio @ query), abs=1e-5)
+
+    filtered = index.search(query, 10, weights=weights, role_filter="Designer")
+    expected = brute_force(rows[:300], query, weights or settings.PROFILE_FIELD_WEIGHTS, 10, role="designer")
+    assert [result["id"] for result in filtered] == [record_id for _, record_id in expected]
+
+
+def test_lookup_scores_only_the_records_it_holds(rows):
+    index = build_index(rows[:10], "exact")
+    query = np.asarray(rows[3]["bio_vector"], dtype=np.float32)
+    results = index.lookup([rows[3]["id"], str(uuid.UUID(int=99_999))], query)
+    assert [result["id"] for result in results] == [rows[3]["id"]]
+    assert results[0]["combined_similarity"] == pytest.approx(index.search(query, 1)[0]["combined_similarity"])
+
+
+@pytest.mark.parametrize("mode", ["int8", "pq"])
+def test_quantized_candidates_are_re_ranked_exactly(rows, mode):
+    index = build_index(rows, mode)
+    exact = build_index(rows, "exact")
+    # Queries near stored records, as real searches have a clear best match
+    queries = np.stack([
+        np.asarray(row["bio_vector"], dtype=np.float32) + 0.5 * np.asarray(row["role_vector"], dtype=np.float32)
+        for row in rows[:20]
+    ])
+    assert index.recall_at_k(queries, 1) == 1.0
+    if mode == "int8":
+        # Random vectors have no cluster structure for PQ codes to keep beyond the best match
+        assert index.recall_at_k(queries, 10) >= 0.9
+    for query in queries[:5]:
+        results = index.search(query, 10)
+        expected = exact.lookup([result["id"] for result in results], query)
+        assert [result["combined_similarity"] for result in results] == \
+            pytest.approx([result["combined_similarity"] for result in expected], abs=1e-5)
+        assert results[0]["id"] == exact.search(query, 1)[0]["id"]
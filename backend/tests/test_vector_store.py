@@ -0,0 +1,162 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import vector_index, vector_store
+from app.services.backfill import watermark_position
+from app.services.embedding_cache import read_warm_queries, save_warm_queries
+from app.services.vector_index import COMPANY_FIELDS, COMPANY_RECORD_COLUMNS, MIN_ANN_ROWS, VectorIndex
+from app.services.vector_store import VectorStore, load_index, publish_index
+from tests.fakes import Table, vector_row
+
+rng = np.random.default_rng(0)
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def company_row(i, seconds):
+    updated_at = (EPOCH + timedelta(seconds=seconds)).isoformat()
+    return vector_row(
+        rng, str(uuid.UUID(int=i)), COMPANY_FIELDS, COMPANY_RECORD_COLUMNS, name=f"Company {i}", updated_at=updated_at
+    )
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    table = Table(company_row(i, i) for i in range(MIN_ANN_ROWS + 200))
+    monkeypatch.setattr(settings, "VECTOR_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(vector_index, "iter_pages", table.iter_pages)
+    monkeypatch.setattr(vector_store, "latest_watermark", table.latest_watermark)
+    monkeypatch.setattr(vector_store, "iter_changed", table.iter_changed)
+    return table
+
+
+@pytest.fixture
+def ann_builds(monkeypatch):
+    builds = []
+    build_faiss = VectorIndex._build_faiss
+
+    def counting(self, vectors):
+        builds.append(len(vectors))
+        return build_faiss(self, vectors)
+
+    monkeypatch.setattr(VectorIndex, "_build_faiss", counting)
+    return builds
+
+
+def new_index():
+    return VectorIndex(
+        "companyprofile", COMPANY_FIELDS, settings.COMPANY_FIELD_WEIGHTS, COMPANY_RECORD_COLUMNS, mode="int8"
+    )
+
+
+def search_ids(index, row, k=5):
+    return [result["id"] for result in index.search(np.asarray(row["description_vector"], dtype=np.float32), k)]
+
+
+def test_first_load_publishes_and_later_loads_map_it(table, ann_builds):
+    first = new_index()
+    watermark = load_index(first, None)
+    store = VectorStore(settings.VECTOR_STORE_PATH, "companyprofile")
+    assert watermark == table.latest_watermark(None, "companyprofile")
+    assert store.current() == 1
+    assert store.meta()["watermark"] == watermark
+    assert table.full_reads == 1
+    assert len(ann_builds) == 1
+
+    second = new_index()
+    assert load_index(second, None) == watermark
+    # Mapped from the snapshot: no table read, no ANN build, no new generation
+    assert table.full_reads == 1
+    assert len(ann_builds) == 1
+    assert store.current() == 1
+    assert len(second) == len(table.rows)
+    assert second.state.ann and len(second.state.unindexed) == 0
+    for row in table.rows[:20]:
+        assert search_ids(second, row) == search_ids(first, row)
+
+
+def test_rows_changed_since_the_snapshot_are_replayed(table, ann_builds):
+    load_index(new_index(), None)
+    count = len(table.rows)
+    last = table.latest_watermark(None, "companyprofile")
+
+    added = company_row(50_000, count + 10)
+    updated = company_row(50_001, count + 11)
+    updated["id"] = table.rows[3]["id"]
+    # Committed after the snapshot but stamped before its watermark
+    late = company_row(50_002, count - 5)
+    for row in (added, updated, late):
+        table.put(row)
+
+    replayed = new_index()
+    watermark = load_index(replayed, None)
+    store = VectorStore(settings.VECTOR_STORE_PATH, "companyprofile")
+    assert watermark == [updated["updated_at"], updated["id"]]
+    assert watermark_position(watermark) > watermark_position(last)
+    assert store.current() == 2
+    assert store.meta()["watermark"] == watermark
+    assert table.full_reads == 1
+    assert len(replayed) == count + 2
+    for row in (added, updated, late):
+        assert search_ids(replayed, row)[0] == row["id"]
+
+    # The replayed generation is what the next worker maps, stale rows included
+    following = new_index()
+    assert load_index(following, None) == watermark
+    assert store.current() == 2
+    assert len(following) == count + 2
+    assert following.state.positions[updated["id"]] in following.state.stale
+    assert search_ids(following, updated)[0] == updated["id"]
+    assert len(ann_builds) == 1
+
+
+def test_removed_records_stay_removed_in_published_generations(table, ann_builds):
+    first = new_index()
+    watermark = load_index(first, None)
+    gone = table.rows[5]
+    first.remove([gone["id"]])
+    store = VectorStore(settings.VECTOR_STORE_PATH, "companyprofile")
+    with store.writer_lock():
+        publish_index(store, first, watermark)
+
+    second = new_index()
+    second.install_generation(store.open())
+    assert len(second) == len(table.rows) - 1
+    assert gone["id"] not in second.state.positions
+    assert gone["id"] not in search_ids(second, gone, k=20)
+
+
+@pytest.mark.parametrize("change", ["weights", "age"])
+def test_snapshots_are_rebuilt_when_they_no_longer_fit(table, ann_builds, monkeypatch, change):
+    load_index(new_index(), None)
+    if change == "weights":
+        monkeypatch.setattr(settings, "COMPANY_FIELD_WEIGHTS", {**settings.COMPANY_FIELD_WEIGHTS, "description": 0.9})
+    else:
+        monkeypatch.setattr(settings, "VECTOR_STORE_MAX_AGE_SECONDS", -1)
+    load_index(new_index(), None)
+    assert table.full_reads == 2
+    assert len(ann_builds) == 2
+    assert VectorStore(settings.VECTOR_STORE_PATH, "companyprofile").current() == 2
+
+
+def test_snapshots_without_a_watermark_are_shared_only_within_the_boot_window(table, ann_builds, monkeypatch):
+    monkeypatch.setattr(vector_store, "latest_watermark", lambda client, table: None)
+    assert load_index(new_index(), None) is None
+    load_index(new_index(), None)
+    assert table.full_reads == 1
+    monkeypatch.setattr(settings, "VECTOR_STORE_BOOT_WINDOW_SECONDS", -1)
+    load_index(new_index(), None)
+    assert table.full_reads == 2
+
+
+def test_warm_queries_keep_the_newest_distinct_entries(tmp_path):
+    path = str(tmp_path / "warm" / "queries.json")
+    assert read_warm_queries(path) == []
+    save_warm_queries(path, ["ml engineer", "designer"], 3)
+    save_warm_queries(path, ["founder", "designer"], 3)
+    assert read_warm_queries(path) == ["founder", "designer", "ml engineer"]
+    (tmp_path / "warm" / "queries.json").write_text("{torn")
+    assert read_warm_queries(path) == []
@@ -0,0 +1,28 @@
+import numpy as np
+
+from app.services.vectors import EMBEDDING_DIM, as_matrix, from_wire, normalize_rows, to_wire, to_wire_row
+
+
+def test_as_matrix_stacks_lists_into_contiguous_float32():
+    matrix = as_matrix([[1, 2, 3], np.array([4, 5, 6], dtype=np.float64)])
+    assert matrix.dtype == np.float32 and matrix.shape == (2, 3)
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert as_matrix([]).shape == (0, EMBEDDING_DIM)
+
+
+def test_normalize_rows_leaves_zero_rows_alone():
+    normalized = normalize_rows(np.array([[3, 4], [0, 0]], dtype=np.float32))
+    assert np.allclose(normalized, [[0.6, 0.8], [0, 0]])
+    assert normalized.dtype == np.float32
+
+
+def test_wire_format_round_trips_float32_exactly():
+    vector = np.random.default_rng(0).normal(size=EMBEDDING_DIM).astype(np.float32)
+    assert np.array_equal(from_wire(to_wire(vector)), vector)
+    assert np.array_equal(from_wire(vector.tolist()), vector)
+    assert from_wire(None) is None
+
+
+def test_to_wire_row_converts_only_vectors():
+    row = to_wire_row({"bio_vector": np.array([0.5, 1], dtype=np.float32), "bio_hash": "abc", "role_vector": None})
+    assert row == {"bio_vector": "[0.5,1]", "bio_hash": "abc", "role_vector": None}